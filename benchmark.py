@@ -0,0 +1,463 @@
+"""
+Load benchmarks for the Loan Origination MCP Server
+
+Usage:
+    python benchmark.py get-lenders --url http://localhost:10000 --concurrency 1 50 200
+    python benchmark.py serialization
+    python benchmark.py eligibility-batch --rows 1000000
+    python benchmark.py metrics-overhead
+    python benchmark.py tax-id-validation --rows 1000000
+    python benchmark.py verification --url http://localhost:8081   # with verification_stub.py running
+    python benchmark.py fixtures --rows 1000000 --format jsonl --output fixtures.jsonl
+    VERIFICATION_FIXTURES_PATH=fixtures.jsonl python server.py --http   # mock provider serves the dataset
+
+To compare database drivers, run the server once per driver and benchmark each, with the
+in-memory lender catalog off so get-lenders actually reaches the database:
+    LENDER_CATALOG_ENABLED=false DB_DRIVER=psycopg2 python server.py --http   # pooled, in worker threads (previous code path)
+    LENDER_CATALOG_ENABLED=false DB_DRIVER=asyncpg  python server.py --http   # non-blocking
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import httpx
+
+
+async def run_load(url: str, payload: dict, concurrency: int, total: int) -> dict:
+    """POST payload to url `total` times with `concurrency` workers; return throughput and latency"""
+    latencies = []
+    errors = 0
+    remaining = total
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    response = await client.post(url, json=payload)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+async def bench_get_lenders(args):
+    url = args.url.rstrip("/") + "/api/get-lenders"
+    payload = {"filters": {"min_amount": 500000, "credit_score": 700}}
+
+    # Warm up connection pools on both sides
+    await run_load(url, payload, concurrency=4, total=50)
+
+    results = []
+    for concurrency in args.concurrency:
+        total = max(args.requests, concurrency * 5)
+        results.append(await run_load(url, payload, concurrency, total))
+    return results
+
+
+def serialization_payloads() -> dict:
+    """Representative response bodies per endpoint, with the types RealDictCursor rows carry"""
+    now = datetime.now()
+    lender = {
+        "id": 17, "name": "Lendingkart", "product_name": "Business Loan",
+        "interest_rate_min": Decimal("15.50"), "interest_rate_max": Decimal("24.00"),
+        "commission_structure": {"upfront": Decimal("1.5"), "trail": Decimal("0.25")},
+        "approval_rate_avg": Decimal("0.72"), "active": True,
+    }
+    eligibility = {
+        "decision": "APPROVED", "reason": "All eligibility criteria met", "approved_amount": 500000,
+        "max_eligible": 7244532.099, "risk_rating": "LOW", "approval_probability": 0.9,
+        "dti_ratio": 0.112, "credit_score": 750, "rules_version": "2024-06-default", "assessed_at": now.isoformat(),
+    }
+    gst = {
+        "gst_number": "09AADCF8429L1Z4", "business_name": "FINAGG TECHNOLOGIES PRIVATE LIMITED",
+        "trade_name": "FINAGG TECHNOLOGIES PRIVATE LIMITED", "constitution": "Private Limited",
+        "address": "C 1,SECTOR 16,Noida,Uttar Pradesh-201301", "date_of_registration": "2021-02-21",
+        "annual_turnover": 24148440.33, "filing_compliance": 0.84, "pan_number": "AADCF8429L",
+        "credit_score": "CMR-2", "existing_loans": 2710443, "verified": True,
+        "verification_date": now.isoformat(), "verification_method": "mock-api",
+    }
+    intent = {
+        "extracted": True,
+        "intent": {"loan_amount": 500000, "loan_purpose": "vehicle purchase", "urgency": "medium", "has_collateral": False},
+        "original_message": "I need 5 lakhs for a car", "extracted_at": now.isoformat(),
+        "extraction_method": "rules", "confidence": 0.95,
+    }
+    return {
+        "extract-intent": intent,
+        "verify-gst": gst,
+        "calculate-eligibility": eligibility,
+        "get-lenders": {"lenders": [lender] * 3},
+        "get-lenders (bulk 1k rows)": {"lenders": [dict(lender, id=i) for i in range(1000)]},
+        "calculate-eligibility (bulk 10k rows)": {"results": [eligibility] * 10000},
+    }
+
+
+async def bench_serialization(args):
+    server = import_server()
+
+    results = []
+    for endpoint, payload in serialization_payloads().items():
+        row = {"endpoint": endpoint}
+        for backend, dumps in server.JSON_ENCODERS.items():
+            body = dumps(payload)
+            iterations = max(10, int(args.budget / max(len(body), 1)))
+            started = time.perf_counter()
+            for _ in range(iterations):
+                dumps(payload)
+            row[f"{backend}_us"] = round((time.perf_counter() - started) / iterations * 1e6, 2)
+        row["bytes"] = len(body)
+        if "orjson_us" in row:
+            row["speedup"] = round(row["stdlib_us"] / row["orjson_us"], 1)
+        results.append(row)
+    return results
+
+
+def import_server():
+    os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+    os.environ.setdefault("DATABASE_URL", "postgresql://localhost/benchmark")
+    import server
+    return server
+
+
+async def bench_eligibility_batch(args):
+    server = import_server()
+    rng = random.Random(42)
+    rows = [
+        {
+            "annual_turnover": rng.choice([0, rng.randint(0, 10**8), rng.random() * 1e8]),
+            "existing_debt": rng.randint(0, 10**7),
+            "loan_amount": rng.choice([rng.randint(0, 10**7), rng.random() * 1e7]),
+            "credit_score_numeric": rng.randint(300, 900),
+        }
+        for _ in range(args.rows)
+    ]
+    assessed_at = datetime.now().isoformat()
+
+    started = time.perf_counter()
+    batch = server.assess_eligibility_batch(rows, assessed_at)
+    batch_seconds = time.perf_counter() - started
+
+    columns = {field: [row[field] for row in rows] for field in server.ELIGIBILITY_FIELDS}
+    started = time.perf_counter()
+    columnar = server.assess_eligibility_columns(columns, assessed_at)
+    columns_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scalar = [server.assess_eligibility(row, assessed_at) for row in rows]
+    scalar_seconds = time.perf_counter() - started
+
+    columnar_rows = [
+        dict(zip(server.ELIGIBILITY_RESULT_FIELDS, values), rules_version=columnar["rules_version"], assessed_at=assessed_at)
+        for values in zip(*(columnar[field] for field in server.ELIGIBILITY_RESULT_FIELDS))
+    ]
+    return [{
+        "rows": args.rows,
+        "scalar_s": round(scalar_seconds, 3),
+        "batch_rows_s": round(batch_seconds, 3),
+        "batch_columns_s": round(columns_seconds, 3),
+        "columns_rows_per_s": int(args.rows / columns_seconds),
+        "identical": batch == scalar == columnar_rows,
+    }]
+
+
+async def bench_metrics_overhead(args):
+    server = import_server()
+    body = json.dumps({"business_data": {"annual_turnover": 24148440.33, "existing_debt": 2710443, "loan_amount": 500000}}).encode()
+    routes = [server.Route("/api/calculate-eligibility", server.api_calculate_eligibility, methods=["POST"])]
+    apps = {
+        "plain": server.Starlette(routes=routes),
+        "instrumented": server.Starlette(routes=routes, middleware=[server.Middleware(server.MetricsMiddleware)]),
+    }
+    scope = {
+        "type": "http", "method": "POST", "path": "/api/calculate-eligibility", "root_path": "",
+        "query_string": b"", "headers": [(b"content-type", b"application/json")],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def per_request_us(app):
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            await app(dict(scope), receive, send)
+        return (time.perf_counter() - started) / args.requests * 1e6
+
+    # Interleave runs so both variants see the same machine state
+    timings = {name: [] for name in apps}
+    for _ in range(args.rounds):
+        for name, app in apps.items():
+            timings[name].append(await per_request_us(app))
+    plain, instrumented = min(timings["plain"]), min(timings["instrumented"])
+    return [{
+        "endpoint": "calculate-eligibility (in-process ASGI)",
+        "plain_us": round(plain, 2),
+        "instrumented_us": round(instrumented, 2),
+        "overhead_us": round(instrumented - plain, 2),
+    }]
+
+
+async def bench_verification(args):
+    """Round trip through the pooled HTTP provider vs a fresh connection per lookup"""
+    os.environ.setdefault("VERIFICATION_MAX_CONNECTIONS", str(max(args.concurrency)))
+    server = import_server()
+    base_url = args.url.rstrip("/")
+
+    async def pooled(provider):
+        await provider.verify_gst("09AADCF8429L1Z4")
+
+    async def fresh(_):
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            await client.get("/gst/09AADCF8429L1Z4")
+
+    async def measure(lookup, provider, concurrency: int) -> dict:
+        latencies = []
+        remaining = args.requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                await lookup(provider)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            "req_per_s": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(statistics.median(latencies) * 1000, 2),
+            "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        }
+
+    provider = server.HTTPVerificationProvider(base_url)
+    results = []
+    try:
+        await pooled(provider)  # warm the pool
+        for concurrency in args.concurrency:
+            for mode, lookup in (("pooled", pooled), ("fresh", fresh)):
+                row = {"mode": mode, "concurrency": concurrency}
+                row.update(await measure(lookup, provider, concurrency))
+                results.append(row)
+    finally:
+        await provider.aclose()
+    return results
+
+
+async def bench_tax_id_validation(args):
+    server = import_server()
+    rng = random.Random(42)
+    alphabet = server.GSTIN_CHARSET
+
+    def gstin():
+        body = "%02d%s%s%s%04d%s%sZ" % (
+            rng.randint(1, 38), "".join(rng.choices(alphabet[10:], k=3)), rng.choice("ABCFPX"),
+            rng.choice(alphabet[10:]), rng.randint(0, 9999), rng.choice(alphabet[10:]), rng.choice(alphabet[1:]),
+        )
+        # Most rows carry a correct check digit, the rest a random one
+        return body + (server.gstin_check_char(body) if rng.random() < 0.8 else rng.choice(alphabet))
+
+    values = [gstin() for _ in range(args.rows)]
+
+    started = time.perf_counter()
+    batch = server.validate_gstin_batch(values)
+    batch_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scalar = [server.validate_gstin(server.normalize_tax_id(v)) for v in values]
+    scalar_seconds = time.perf_counter() - started
+
+    return [{
+        "rows": args.rows,
+        "invalid": sum(1 for e in batch if e),
+        "scalar_us_per_id": round(scalar_seconds / args.rows * 1e6, 2),
+        "batch_us_per_id": round(batch_seconds / args.rows * 1e6, 3),
+        "identical": batch == scalar,
+    }]
+
+
+def write_fixtures(server, path: str, rows: int) -> list:
+    """Write `rows` valid synthetic GST registrations as JSONL or CSV; return their GSTINs"""
+    rng = random.Random(7)
+    letters = server.GSTIN_CHARSET[10:]
+    fields = ["gst_number", "pan_number", "business_name", "constitution", "address", "date_of_registration",
+              "annual_turnover", "filing_compliance", "credit_score", "existing_loans"]
+    gst_numbers = []
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f) if path.endswith(".csv") else None
+        if writer:
+            writer.writerow(fields)
+        for i in range(rows):
+            # Unique PAN per row: three letters and four digits from the row number
+            prefix = letters[i // 260000 % 26] + letters[i // 10000 % 26] + letters[i // 676 % 26]
+            pan = "%s%s%s%04d%s" % (prefix, rng.choice("CFP"), rng.choice(letters), i % 10000, rng.choice(letters))
+            body = "%02d%s1Z" % (rng.randint(1, 38), pan)
+            gst_number = body + server.gstin_check_char(body)
+            gst_numbers.append(gst_number)
+            row = [gst_number, pan, f"SYNTHETIC BUSINESS {i}", rng.choice(["Proprietorship", "Partnership", "Private Limited"]),
+                   "Synthetic address", "20%02d-%02d-%02d" % (rng.randint(10, 23), rng.randint(1, 12), rng.randint(1, 28)),
+                   round(rng.uniform(1e6, 1e8), 2), round(rng.uniform(0.5, 1.0), 2), f"CMR-{rng.randint(1, 5)}",
+                   rng.randint(0, 10**7)]
+            if writer:
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(dict(zip(fields, row))) + "\n")
+    return gst_numbers
+
+
+async def bench_fixtures(args):
+    server = import_server()
+    path = args.output or os.path.join(tempfile.gettempdir(), f"verification_fixtures.{args.format}")
+    if args.reuse and os.path.exists(path):
+        with open(path) as f:
+            gst_numbers = [json.loads(line)["gst_number"] for line in f] if args.format == "jsonl" else \
+                [row[0] for row in list(csv.reader(f))[1:]]
+    else:
+        gst_numbers = write_fixtures(server, path, args.rows)
+
+    for prefix in server.FixtureStore(path).index_prefixes():
+        if os.path.exists(f"{prefix}.index.json"):
+            os.remove(f"{prefix}.index.json")  # time a full index build
+    started = time.perf_counter()
+    server.FixtureStore(path).load()
+    build_seconds = time.perf_counter() - started
+
+    # What every later worker start costs: mapping the existing index
+    store = server.FixtureStore(path)
+    started = time.perf_counter()
+    store.load()
+    load_seconds = time.perf_counter() - started
+    index_mb = (store._gst_index.table.nbytes + store._pan_index.table.nbytes) / 2**20
+
+    sample = random.Random(1).choices(gst_numbers, k=args.lookups)
+    started = time.perf_counter()
+    hits = sum(store.gst(g) is not None for g in sample)
+    hit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    misses = sum(store.gst("99" + g[2:]) is None for g in sample)
+    miss_seconds = time.perf_counter() - started
+
+    # Whole mock verify_gst path against a cold cache: validation, provider lookup, caching
+    server.verification_fixtures = store
+    server.verification_cache = server.VerificationCache(
+        args.lookups, server.VERIFICATION_CACHE_TTL, server.VERIFICATION_CACHE_NEGATIVE_TTL, server.VERIFICATION_CACHE_STALE_TTL,
+    )
+    started = time.perf_counter()
+    for g in sample:
+        await server.verify_gst(g)
+    verify_seconds = time.perf_counter() - started
+
+    return [{
+        "rows": len(gst_numbers),
+        "format": args.format,
+        "file_mb": round(os.path.getsize(path) / 2**20, 1),
+        "build_seconds": round(build_seconds, 2),
+        "load_seconds": round(load_seconds, 3),
+        "index_mb": round(index_mb, 1),
+        "hit_us": round(hit_seconds / args.lookups * 1e6, 2),
+        "miss_us": round(miss_seconds / args.lookups * 1e6, 2),
+        "verify_gst_us": round(verify_seconds / args.lookups * 1e6, 1),
+        "all_found": hits == misses == args.lookups,
+    }]
+
+
+def print_table(results: list):
+    columns = list(results[0].keys())
+    widths = {c: max(len(c), *(len(str(row.get(c, ""))) for row in results)) for c in columns}
+    print("  ".join(f"{c:>{widths[c]}}" for c in columns))
+    for row in results:
+        print("  ".join(f"{row.get(c, ''):>{widths[c]}}" for c in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    lenders = subparsers.add_parser("get-lenders", help="req/s of /api/get-lenders at several concurrency levels")
+    lenders.add_argument("--url", default="http://localhost:10000")
+    lenders.add_argument("--concurrency", type=int, nargs="+", default=[1, 50, 200])
+    lenders.add_argument("--requests", type=int, default=2000, help="requests per concurrency level")
+    lenders.add_argument("--json", action="store_true", help="print raw JSON instead of a table")
+    lenders.set_defaults(handler=bench_get_lenders)
+
+    serialization = subparsers.add_parser("serialization", help="JSON encoding cost per endpoint payload and backend")
+    serialization.add_argument("--budget", type=int, default=20_000_000, help="bytes to encode per measurement")
+    serialization.add_argument("--json", action="store_true", help="print raw JSON instead of a table")
+    serialization.set_defaults(handler=bench_serialization)
+
+    eligibility = subparsers.add_parser("eligibility-batch", help="vectorized vs scalar eligibility scoring")
+    eligibility.add_argument("--rows", type=int, default=1_000_000)
+    eligibility.add_argument("--json", action="store_true", help="print raw JSON instead of a table")
+    eligibility.set_defaults(handler=bench_eligibility_batch)
+
+    verification = subparsers.add_parser("verification", help="pooled vs per-call connections to a verification provider")
+    verification.add_argument("--url", default="http://localhost:8081", help="a running verification_stub.py")
+    verification.add_argument("--concurrency", type=int, nargs="+", default=[1, 50])
+    verification.add_argument("--requests", type=int, default=500, help="lookups per mode and concurrency level")
+    verification.add_argument("--json", action="store_true", help="print raw JSON instead of a table")
+    verification.set_defaults(handler=bench_verification)
+
+    tax_ids = subparsers.add_parser("tax-id-validation", help="scalar vs vectorized GSTIN validation")
+    tax_ids.add_argument("--rows", type=int, default=1_000_000)
+    tax_ids.add_argument("--json", action="store_true", help="print raw JSON instead of a table")
+    tax_ids.set_defaults(handler=bench_tax_id_validation)
+
+    fixtures = subparsers.add_parser("fixtures", help="generate a GST/PAN fixture dataset and time indexed lookups")
+    fixtures.add_argument("--rows", type=int, default=1_000_000)
+    fixtures.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    fixtures.add_argument("--output", help="dataset path (default: a temp file); keep it for VERIFICATION_FIXTURES_PATH")
+    fixtures.add_argument("--reuse", action="store_true", help="benchmark an existing --output instead of regenerating it")
+    fixtures.add_argument("--lookups", type=int, default=100_000)
+    fixtures.add_argument("--json", action="store_true", help="print raw JSON instead of a table")
+    fixtures.set_defaults(handler=bench_fixtures)
+
+    metrics = subparsers.add_parser("metrics-overhead", help="per-request cost of the Prometheus middleware")
+    metrics.add_argument("--requests", type=int, default=20000, help="requests per round")
+    metrics.add_argument("--rounds", type=int, default=5)
+    metrics.add_argument("--json", action="store_true", help="print raw JSON instead of a table")
+    metrics.set_defaults(handler=bench_metrics_overhead)
+
+    args = parser.parse_args()
+    results = asyncio.run(args.handler(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
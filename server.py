@@ -4,60 +4,3001 @@ Version: Production with Real Claude API
 """
 
 import os
+import re
+import sys
+import csv
+import mmap
 import json
-from datetime import datetime
-from typing import Optional, Dict, Any
+import asyncio
+import hashlib
+import tempfile
+import inspect
+import time
+import threading
+from collections import deque, OrderedDict
+from contextlib import contextmanager, asynccontextmanager
+from datetime import datetime, date
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Optional, Dict, Any, List, Annotated
+from typing_extensions import TypedDict
+from pydantic import Field
+import asyncpg
+import httpx
+import numpy as np
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
-from fastmcp import FastMCP
-from anthropic import Anthropic
-from starlette.responses import JSONResponse
+from fastmcp import Context, FastMCP
+import anthropic
+from anthropic import AsyncAnthropic
+from starlette import responses as starlette_responses
+from starlette.responses import Response, StreamingResponse
 from starlette.requests import Request
+from opentelemetry import trace
+from opentelemetry.propagate import extract
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; fixture index builds are then not serialized across workers
+    fcntl = None
+
+@asynccontextmanager
+async def service_lifespan(server):
+    """
+    Background state every transport needs (lender catalog refresh, decision-table
+    hot reload, fixture index), started from the MCP server's lifespan so stdio
+    clients get it too; under HTTP it runs inside the app lifespan (create_app).
+    """
+    if LENDER_CATALOG_ENABLED:
+        await lender_catalog.start()
+    eligibility_rules.start()
+    if VERIFICATION_PROVIDER == "mock":
+        # Index the fixture dataset before serving rather than on the first lookup
+        await asyncio.to_thread(verification_fixtures.load)
+    try:
+        yield {}
+    finally:
+        await eligibility_rules.stop()
+        await lender_catalog.stop()
+        await close_verification_provider()
 
 # Initialize FastMCP server
-mcp = FastMCP("Loan Origination MCP Server")
+mcp = FastMCP("Loan Origination MCP Server", lifespan=service_lifespan)
+
+# ============================================================================
+# JSON RESPONSES
+# ============================================================================
+
+def json_default(obj):
+    """Encode the non-JSON types that show up in DB rows (Decimal, dates)"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, MappingProxyType):
+        return dict(obj)
+    if hasattr(obj, "tolist"):  # numpy arrays and scalars
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _dumps_stdlib(content) -> bytes:
+    return json.dumps(
+        content, default=json_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+def _dumps_orjson(content) -> bytes:
+    return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+JSON_ENCODERS = {"stdlib": _dumps_stdlib}
+if orjson is not None:
+    JSON_ENCODERS["orjson"] = _dumps_orjson
+
+# "orjson" (default when installed) or "stdlib"
+JSON_BACKEND = os.getenv("JSON_BACKEND", "orjson" if orjson is not None else "stdlib")
+dumps_json = JSON_ENCODERS[JSON_BACKEND]
+
+class JSONResponse(starlette_responses.JSONResponse):
+    """Starlette JSONResponse rendered with the configured JSON_BACKEND encoder"""
+
+    def render(self, content) -> bytes:
+        with tracer.start_as_current_span("response.serialize"):
+            return dumps_json(content)
+
+def loads_json(data):
+    """Parse a JSON document from bytes or str"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def is_ndjson(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "")
+    return content_type.startswith((NDJSON_MEDIA_TYPE, "application/jsonl", "application/ndjson"))
+
+def json_rows(data, field: str) -> list:
+    """Rows of a bulk JSON body: a JSON array, or an object holding the array under `field`"""
+    if isinstance(data, dict):
+        data = data.get(field)
+    if not isinstance(data, list):
+        raise ValueError(f"expected a JSON array or an object with a '{field}' array")
+    return data
+
+def ndjson_rows(body: bytes) -> list:
+    return [loads_json(line) for line in body.splitlines() if line.strip()]
+
+class NDJSONResponse(Response):
+    """Newline-delimited JSON, one row per line"""
+    media_type = NDJSON_MEDIA_TYPE
+
+    def render(self, content) -> bytes:
+        return b"".join(dumps_json(row) + b"\n" for row in content)
+
+# ============================================================================
+# NDJSON STREAMING
+# ============================================================================
+
+NDJSON_MAX_LINE_BYTES = int(os.getenv("NDJSON_MAX_LINE_BYTES", 1_048_576))
+# Lines per micro-batch for vectorized eligibility streaming; other streams write each result as it is produced
+NDJSON_STREAM_BATCH_SIZE = int(os.getenv("NDJSON_STREAM_BATCH_SIZE", 1000))
+
+async def iter_ndjson_lines(request: Request):
+    """
+    (line number, raw line) for each non-empty line of the request body as it arrives.
+    Memory is bounded by one network chunk plus NDJSON_MAX_LINE_BYTES; an oversized
+    line is dropped and reported with raw line None.
+    """
+    buffer = b""
+    line_no = 0
+    oversized = False
+    async for chunk in request.stream():
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            line_no += 1
+            if oversized or len(line) > NDJSON_MAX_LINE_BYTES:
+                oversized = False
+                yield line_no, None
+            elif line.strip():
+                yield line_no, line
+        if len(buffer) > NDJSON_MAX_LINE_BYTES:
+            oversized = True
+            buffer = b""
+    if oversized:
+        yield line_no + 1, None
+    elif buffer.strip():
+        yield line_no + 1, buffer
+
+def per_item(fn):
+    """Lift a per-item function (sync or async) into a batch processor for stream_ndjson"""
+    async def process(items: list) -> list:
+        results = []
+        for item in items:
+            try:
+                result = fn(item)
+                if inspect.isawaitable(result):
+                    result = await result
+            except Exception as e:
+                result = e
+            results.append(result)
+        return results
+    return process
+
+async def _process_ndjson_batch(batch: list, process) -> bytes:
+    output = [None] * len(batch)
+    parsed = []
+    for i, (line_no, raw) in enumerate(batch):
+        if raw is None:
+            output[i] = {"line": line_no, "error": f"Line exceeds {NDJSON_MAX_LINE_BYTES} bytes"}
+            continue
+        try:
+            parsed.append((i, loads_json(raw)))
+        except ValueError as e:
+            output[i] = {"line": batch[i][0], "error": f"Invalid JSON: {str(e)}"}
+
+    if parsed:
+        try:
+            results = await process([item for _, item in parsed])
+        except Exception as e:
+            results = [e] * len(parsed)
+        for (i, _), result in zip(parsed, results):
+            if isinstance(result, Exception):
+                result = {"line": batch[i][0], "error": str(result)}
+            output[i] = result
+
+    return b"".join(dumps_json(row) + b"\n" for row in output)
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for handlers that keep reading the request body while responding.
+    Under ASGI spec < 2.4 (e.g. uvicorn HTTP) Starlette runs a disconnect listener that
+    would consume the body messages; here the body reader sees the disconnect instead.
+    Everything else is Starlette's own handling.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        spec_version = tuple(map(int, scope.get("asgi", {}).get("spec_version", "2.0").split(".")))
+        if scope["type"] != "http" or spec_version >= (2, 4):
+            await super().__call__(scope, receive, send)
+            return
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+def stream_ndjson(request: Request, process, batch_size: int = 1) -> StreamingResponse:
+    """
+    Stream an NDJSON request through process(items) -> results (an Exception for a
+    failed item), writing one NDJSON result per non-empty input line, in order.
+    Per-line failures become {"line": n, "error": ...} instead of failing the stream.
+    Results are written every batch_size lines; only vectorized processors batch.
+    """
+    async def generate():
+        batch = []
+        async for line in iter_ndjson_lines(request):
+            batch.append(line)
+            if len(batch) >= batch_size:
+                yield await _process_ndjson_batch(batch, process)
+                batch = []
+        if batch:
+            yield await _process_ndjson_batch(batch, process)
+
+    return DuplexStreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+# ============================================================================
+# METRICS
+# ============================================================================
+# Prometheus metrics, served at /metrics. Labels are bounded (route templates,
+# endpoint, query and operation names), and a request costs a handful of counter/histogram
+# updates, a few microseconds against request times in the milliseconds.
+# With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR so a scrape sees
+# all of them instead of whichever worker answered.
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Own registry rather than the global one: `python server.py --http` with one worker
+# imports this file a second time as `server`, and the copies must not collide
+METRICS_REGISTRY = CollectorRegistry()
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route, method and status", ["route", "method", "status"],
+    registry=METRICS_REGISTRY,
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ["route", "method"],
+    registry=METRICS_REGISTRY,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served",
+    multiprocess_mode="livesum", registry=METRICS_REGISTRY,
+)
+ANTHROPIC_DURATION = Histogram(
+    "anthropic_request_duration_seconds", "Claude API call latency by endpoint", ["endpoint"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60), registry=METRICS_REGISTRY,
+)
+ANTHROPIC_TOKENS = Counter(
+    "anthropic_tokens_total", "Claude tokens by endpoint and type (input, output, cache_read, cache_creation)",
+    ["endpoint", "type"], registry=METRICS_REGISTRY,
+)
+ANTHROPIC_ERRORS = Counter(
+    "anthropic_errors_total", "Failed Claude API calls by endpoint and error type", ["endpoint", "error"],
+    registry=METRICS_REGISTRY,
+)
+ANTHROPIC_IN_FLIGHT = Gauge(
+    "anthropic_requests_in_flight", "Claude API calls currently outstanding",
+    multiprocess_mode="livesum", registry=METRICS_REGISTRY,
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Database query latency by query", ["query"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5), registry=METRICS_REGISTRY,
+)
+DB_QUERY_ROWS = Histogram(
+    "db_query_rows", "Rows returned by query", ["query"],
+    buckets=(0, 1, 3, 10, 100, 1000, 10000, 100000), registry=METRICS_REGISTRY,
+)
+SINGLE_FLIGHT_IN_FLIGHT = Gauge(
+    "single_flight_in_flight_keys", "Distinct keys with a shared call outstanding, by operation", ["operation"],
+    multiprocess_mode="livesum", registry=METRICS_REGISTRY,
+)
+SINGLE_FLIGHT_WAITERS = Gauge(
+    "single_flight_waiters", "Callers awaiting a shared call, by operation", ["operation"],
+    multiprocess_mode="livesum", registry=METRICS_REGISTRY,
+)
+SINGLE_FLIGHT_CALLS = Counter(
+    "single_flight_calls_total", "Calls that started a shared call, by operation", ["operation"],
+    registry=METRICS_REGISTRY,
+)
+SINGLE_FLIGHT_COALESCED = Counter(
+    "single_flight_coalesced_total", "Calls that joined an outstanding shared call instead, by operation", ["operation"],
+    registry=METRICS_REGISTRY,
+)
+
+def observe_claude_call(endpoint: str, started: float, response=None, error: Optional[Exception] = None):
+    """Record one Claude call: latency, and token usage or the error type"""
+    ANTHROPIC_DURATION.labels(endpoint).observe(time.perf_counter() - started)
+    if error is not None:
+        ANTHROPIC_ERRORS.labels(endpoint, type(error).__name__).inc()
+        return
+    usage = response.usage
+    ANTHROPIC_TOKENS.labels(endpoint, "input").inc(usage.input_tokens)
+    ANTHROPIC_TOKENS.labels(endpoint, "output").inc(usage.output_tokens)
+    ANTHROPIC_TOKENS.labels(endpoint, "cache_read").inc(getattr(usage, "cache_read_input_tokens", None) or 0)
+    ANTHROPIC_TOKENS.labels(endpoint, "cache_creation").inc(getattr(usage, "cache_creation_input_tokens", None) or 0)
+
+def observe_db_query(query: str, started: float, rows: int):
+    """Record one database query's latency and row count"""
+    DB_QUERY_DURATION.labels(query).observe(time.perf_counter() - started)
+    DB_QUERY_ROWS.labels(query).observe(rows)
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request counts, latency and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+        # (route, method, status) -> bound children; labels() costs more than the update itself
+        self._children = {}
+        # In-flight requests are a plain counter read at scrape time, avoiding two locked
+        # gauge updates per request; multiprocess mode needs real gauge writes instead
+        self.in_flight = 0
+        if not PROMETHEUS_MULTIPROC_DIR:
+            HTTP_IN_FLIGHT.set_function(lambda: self.in_flight)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        self.in_flight += 1
+        if PROMETHEUS_MULTIPROC_DIR:
+            HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.in_flight -= 1
+            if PROMETHEUS_MULTIPROC_DIR:
+                HTTP_IN_FLIGHT.dec()
+            elapsed = time.perf_counter() - started
+            # The router stores the matched route in the scope; label by its template, never the raw path.
+            # Paths that only reached the catch-all MCP mount are "unmatched".
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            key = (route, scope["method"], status)
+            children = self._children.get(key)
+            if children is None:
+                children = self._children[key] = (
+                    HTTP_REQUEST_DURATION.labels(route, scope["method"]),
+                    HTTP_REQUESTS.labels(route, scope["method"], str(status)),
+                )
+            children[0].observe(elapsed)
+            children[1].inc()
+
+async def metrics_endpoint(request: Request):
+    """Prometheus scrape endpoint"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = METRICS_REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+# ============================================================================
+# TRACING
+# ============================================================================
+# OpenTelemetry spans for each request, Claude call, database query and
+# verification lookup. Incoming W3C traceparent/tracestate headers continue
+# the caller's trace. Without an exporter configured the API's no-op tracer
+# is used and spans cost next to nothing.
+#
+# OTEL_TRACES_EXPORTER: "otlp" (OTLP/HTTP to OTEL_EXPORTER_OTLP_ENDPOINT,
+# default http://localhost:4318; see otel-collector.yaml), "console", or "none"
+
+OTEL_TRACES_EXPORTER = os.getenv("OTEL_TRACES_EXPORTER", "none").lower()
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "loan-origination-mcp")
+
+tracer = trace.get_tracer("loan-origination-mcp")
+
+def configure_tracing():
+    """Install the SDK tracer provider and exporter; once per process, before serving"""
+    if OTEL_TRACES_EXPORTER == "none" or isinstance(trace.get_tracer_provider(), TracerProvider):
+        return
+    if OTEL_TRACES_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        processor = BatchSpanProcessor(OTLPSpanExporter())  # reads OTEL_EXPORTER_OTLP_* settings
+    elif OTEL_TRACES_EXPORTER == "console":
+        # stderr, so spans never interleave with the MCP stdio protocol on stdout
+        processor = SimpleSpanProcessor(ConsoleSpanExporter(out=sys.stderr))
+    else:
+        raise ValueError(f"Unsupported OTEL_TRACES_EXPORTER: {OTEL_TRACES_EXPORTER}")
+    provider = TracerProvider(resource=Resource.create({"service.name": OTEL_SERVICE_NAME}))
+    provider.add_span_processor(processor)
+    trace.set_tracer_provider(provider)
+
+def shutdown_tracing():
+    """Flush spans still queued in the batch processor"""
+    provider = trace.get_tracer_provider()
+    if isinstance(provider, TracerProvider):
+        provider.shutdown()
+
+@contextmanager
+def db_query_span(name: str):
+    """Client span around one database query; the caller sets db.response.returned_rows"""
+    with tracer.start_as_current_span(
+        f"db {name}",
+        kind=trace.SpanKind.CLIENT,
+        attributes={"db.system.name": "postgresql", "db.query.summary": name, "db.driver": DB_DRIVER},
+    ) as span:
+        yield span
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per request, continuing any incoming W3C trace context"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        carrier = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        method = scope["method"]
+        with tracer.start_as_current_span(
+            method,
+            context=extract(carrier),
+            kind=trace.SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as span:
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(trace.StatusCode.ERROR)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    span.update_name(f"{method} {route}")
+                    span.set_attribute("http.route", route)
 
 # Initialize Anthropic client
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 if not ANTHROPIC_API_KEY:
     raise ValueError("ANTHROPIC_API_KEY environment variable is required")
 
-anthropic_client = Anthropic(api_key=ANTHROPIC_API_KEY)
+# Retries are bounded here; per-endpoint deadlines and the circuit breaker do the rest
+ANTHROPIC_MAX_RETRIES = int(os.getenv("ANTHROPIC_MAX_RETRIES", 1))
+
+anthropic_client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY, max_retries=ANTHROPIC_MAX_RETRIES)
+
+# Cap on concurrent in-flight Claude calls per worker
+ANTHROPIC_MAX_CONCURRENCY = int(os.getenv("ANTHROPIC_MAX_CONCURRENCY", 32))
+anthropic_semaphore = asyncio.Semaphore(ANTHROPIC_MAX_CONCURRENCY)
+
+async def create_message(**kwargs):
+    """Call Claude without blocking the event loop, bounded by ANTHROPIC_MAX_CONCURRENCY"""
+    with tracer.start_as_current_span("anthropic.queue"):
+        await anthropic_semaphore.acquire()
+    try:
+        with tracer.start_as_current_span(
+            "anthropic.messages.create",
+            kind=trace.SpanKind.CLIENT,
+            attributes={"gen_ai.system": "anthropic", "gen_ai.request.model": kwargs.get("model", "")},
+        ) as span:
+            response = await anthropic_client.messages.create(**kwargs)
+            span.set_attribute("gen_ai.usage.input_tokens", response.usage.input_tokens)
+            span.set_attribute("gen_ai.usage.output_tokens", response.usage.output_tokens)
+            return response
+    finally:
+        anthropic_semaphore.release()
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto one shared task.
+    The task is shielded, so a disconnecting caller does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> {"task": Task, "label": str, "waiters": int}
+        self.calls_total = 0
+        self.coalesced_total = 0
+
+    async def do(self, key: str, label: str, fn):
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.get_running_loop().create_task(fn())
+            call = {"task": task, "label": label, "waiters": 0}
+            self._calls[key] = call
+            self.calls_total += 1
+            SINGLE_FLIGHT_CALLS.labels(label).inc()
+            SINGLE_FLIGHT_IN_FLIGHT.labels(label).inc()
+
+            def done(t, key=key):
+                SINGLE_FLIGHT_IN_FLIGHT.labels(label).dec()
+                if self._calls.get(key, {}).get("task") is t:
+                    del self._calls[key]
+                if not t.cancelled():
+                    t.exception()  # mark retrieved even if every waiter went away
+
+            task.add_done_callback(done)
+        else:
+            self.coalesced_total += 1
+            SINGLE_FLIGHT_COALESCED.labels(call["label"]).inc()
+
+        call["waiters"] += 1
+        SINGLE_FLIGHT_WAITERS.labels(call["label"]).inc()
+        try:
+            return await asyncio.shield(call["task"])
+        finally:
+            call["waiters"] -= 1
+            SINGLE_FLIGHT_WAITERS.labels(call["label"]).dec()
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "calls_total": self.calls_total,
+            "coalesced_total": self.coalesced_total,
+            "waiters": {f"{c['label']}:{key[:12]}": c["waiters"] for key, c in self._calls.items()},
+        }
+
+claude_single_flight = SingleFlight()
+
+# Per-endpoint deadlines (seconds) for a Claude call, including time queued for a slot
+CLAUDE_DEADLINES = {
+    "extract-intent": float(os.getenv("CLAUDE_DEADLINE_EXTRACT_INTENT", 8)),
+    "explain-decision": float(os.getenv("CLAUDE_DEADLINE_EXPLAIN_DECISION", 20)),
+}
+
+# Circuit breaker thresholds, evaluated over the last BREAKER_WINDOW upstream calls
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", 20))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", 10))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", 0.5))
+BREAKER_SLOW_CALL_RATE = float(os.getenv("BREAKER_SLOW_CALL_RATE", 0.5))
+BREAKER_SLOW_CALL_FRACTION = float(os.getenv("BREAKER_SLOW_CALL_FRACTION", 0.75))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", 30))
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+class CircuitBreaker:
+    """
+    Closed -> open when the error rate or slow-call rate over the recent window crosses
+    its threshold; open -> half-open after the cooldown, where a single trial call
+    decides between closing again and re-opening.
+    """
+
+    def __init__(self, name: str, slow_call_seconds: float, window: int = 20, min_calls: int = 10,
+                 error_rate: float = 0.5, slow_call_rate: float = 0.5, cooldown: float = 30):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_rate = slow_call_rate
+        self.cooldown = cooldown
+        self.state = "closed"
+        self._outcomes = deque(maxlen=window)  # (ok, slow)
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.rejected_total = 0
+        self.opened_total = 0
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.cooldown:
+                self.rejected_total += 1
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._trial_in_flight:
+                self.rejected_total += 1
+                return False
+            self._trial_in_flight = True
+        return True
+
+    def record(self, ok: bool, latency: float):
+        slow = latency >= self.slow_call_seconds
+        if self.state == "half_open":
+            self._trial_in_flight = False
+            if ok and not slow:
+                self.state = "closed"
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+
+        self._outcomes.append((ok, slow))
+        if len(self._outcomes) < self.min_calls:
+            return
+        errors = sum(1 for o, _ in self._outcomes if not o)
+        slows = sum(1 for _, sl in self._outcomes if sl)
+        if errors / len(self._outcomes) >= self.error_rate or slows / len(self._outcomes) >= self.slow_call_rate:
+            self._open()
+
+    def release(self):
+        """Give up a half-open trial without a verdict (the call was cancelled)"""
+        if self.state == "half_open":
+            self._trial_in_flight = False
+
+    def _open(self):
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.opened_total += 1
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "window_calls": len(self._outcomes),
+            "window_errors": sum(1 for o, _ in self._outcomes if not o),
+            "slow_call_seconds": self.slow_call_seconds,
+            "opened_total": self.opened_total,
+            "rejected_total": self.rejected_total,
+        }
+
+claude_breakers = {
+    endpoint: CircuitBreaker(
+        endpoint,
+        slow_call_seconds=deadline * BREAKER_SLOW_CALL_FRACTION,
+        window=BREAKER_WINDOW,
+        min_calls=BREAKER_MIN_CALLS,
+        error_rate=BREAKER_ERROR_RATE,
+        slow_call_rate=BREAKER_SLOW_CALL_RATE,
+        cooldown=BREAKER_COOLDOWN,
+    )
+    for endpoint, deadline in CLAUDE_DEADLINES.items()
+}
+
+def is_upstream_failure(e: BaseException) -> bool:
+    """Errors that say Anthropic is unhealthy (as opposed to a bad request from us)"""
+    if isinstance(e, (asyncio.TimeoutError, CircuitOpenError, anthropic.APIConnectionError)):
+        return True
+    if isinstance(e, anthropic.APIStatusError):
+        return e.status_code == 429 or e.status_code >= 500
+    return False
+
+async def call_claude(endpoint: str, **kwargs):
+    """
+    Guarded Claude call for an endpoint: fails fast with CircuitOpenError while the
+    endpoint's breaker is open, enforces its deadline, and shares one upstream call
+    between identical concurrent requests.
+    """
+    breaker = claude_breakers[endpoint]
+    if not breaker.allow():
+        raise CircuitOpenError(f"Claude circuit for {endpoint} is open")
+    deadline = CLAUDE_DEADLINES[endpoint]
+
+    async def upstream():
+        started = time.monotonic()
+        metrics_started = time.perf_counter()
+        ANTHROPIC_IN_FLIGHT.inc()
+        healthy = None  # stays None only if cancelled
+        try:
+            response = await asyncio.wait_for(create_message(timeout=deadline, **kwargs), deadline)
+            healthy = True
+        except Exception as e:
+            observe_claude_call(endpoint, metrics_started, error=e)
+            # A rejected request (e.g. 400) still means Anthropic answered
+            healthy = not is_upstream_failure(e)
+            raise
+        finally:
+            ANTHROPIC_IN_FLIGHT.dec()
+            # Always settle, so a half-open trial can never stay in flight
+            if healthy is None:
+                breaker.release()
+            else:
+                breaker.record(healthy, time.monotonic() - started)
+        observe_claude_call(endpoint, metrics_started, response)
+        return response
+
+    key = hashlib.sha256(json.dumps([endpoint, kwargs], sort_keys=True, default=str).encode()).hexdigest()
+    return await claude_single_flight.do(key, endpoint, upstream)
+
+# Model and prompt versions (bump the prompt version whenever a prompt changes)
+CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-sonnet-4-20250514")
+EXTRACT_INTENT_PROMPT_VERSION = "v4"
+
+# Exact-match cache for extract-intent results
+INTENT_CACHE_MAX_SIZE = int(os.getenv("INTENT_CACHE_MAX_SIZE", 10000))
+INTENT_CACHE_TTL = float(os.getenv("INTENT_CACHE_TTL", 3600))
+
+class TTLCache:
+    """Bounded LRU cache with per-entry expiry and hit/miss/eviction counters"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+intent_cache = TTLCache(INTENT_CACHE_MAX_SIZE, INTENT_CACHE_TTL)
+
+def normalize_message(message: str) -> str:
+    """Collapse whitespace and fold case so trivially different messages share a cache entry"""
+    return " ".join(message.split()).casefold()
+
+def intent_cache_key(message: str) -> tuple:
+    return (normalize_message(message), EXTRACT_INTENT_PROMPT_VERSION, CLAUDE_MODEL)
+
+# Rule-based extraction results at or above this confidence skip Claude
+INTENT_RULES_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_RULES_CONFIDENCE_THRESHOLD", 0.9))
+
+# Database connection
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    raise ValueError("DATABASE_URL environment variable is required")
+
+# Connection pool sizing and recycling, for both drivers: connections older than
+# MAX_LIFETIME are replaced on checkout, and ones idle for HEALTH_CHECK_IDLE are
+# pinged first. With asyncpg, a connection idle in the pool for IDLE_TIMEOUT is
+# also closed (the psycopg2 pool keeps its idle connections open).
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5.0))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", 1800))
+DB_POOL_HEALTH_CHECK_IDLE = float(os.getenv("DB_POOL_HEALTH_CHECK_IDLE", 30))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", 300))
+
+# Driver for the lender query: "asyncpg" (non-blocking) or "psycopg2" (blocking, pooled)
+DB_DRIVER = os.getenv("DB_DRIVER", "asyncpg")
+# Set to 0 when DATABASE_URL points at a transaction-mode pgbouncer (Supabase pooler on 6543)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+
+# In-memory lender catalog (see LenderCatalog)
+LENDER_CATALOG_ENABLED = os.getenv("LENDER_CATALOG_ENABLED", "true").lower() == "true"
+LENDER_CATALOG_POLL_INTERVAL = float(os.getenv("LENDER_CATALOG_POLL_INTERVAL", 30))
+LENDER_CATALOG_CHANNEL = os.getenv("LENDER_CATALOG_CHANNEL", "lenders_changed")
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool.
+    Connections are health-checked on checkout and recycled after max_lifetime seconds.
+    """
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10,
+                 timeout: float = 5.0, max_lifetime: float = 1800,
+                 health_check_idle: float = 30):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_idle = health_check_idle
+
+        self._cond = threading.Condition()
+        self._idle = deque()        # (conn, created_at, returned_at)
+        self._created = {}          # id(conn) -> created_at
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+
+        # Metrics
+        self._checkouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._opened_total = 0
+        self._recycled_total = 0
+        self._failed_checks_total = 0
+
+        for _ in range(min_size):
+            self._size += 1
+            self._idle.append(self._open())
+
+    def _open(self):
+        """Open a new connection for a slot the caller has already reserved in _size"""
+        conn = psycopg2.connect(self.dsn, cursor_factory=RealDictCursor)
+        now = time.monotonic()
+        with self._cond:
+            self._created[id(conn)] = now
+            self._opened_total += 1
+        return conn, now, now
+
+    def _discard(self, conn):
+        """Close a connection and release its slot (caller holds the lock)"""
+        self._created.pop(id(conn), None)
+        self._size -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, conn, created_at: float, returned_at: float) -> bool:
+        """Cheap checks first; only ping the server if the connection sat idle for a while"""
+        now = time.monotonic()
+        if conn.closed:
+            return False
+        if now - created_at > self.max_lifetime:
+            self._recycled_total += 1
+            return False
+        if now - returned_at > self.health_check_idle:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except Exception:
+                self._failed_checks_total += 1
+                return False
+        return True
+
+    def getconn(self, timeout: Optional[float] = None):
+        """Check out a healthy connection, waiting up to timeout seconds"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            entry = None
+            with self._cond:
+                self._waiting += 1
+                try:
+                    while True:
+                        if self._closed:
+                            raise PoolTimeout("connection pool is closed")
+                        if self._idle:
+                            entry = self._idle.pop()
+                            break
+                        if self._size < self.max_size:
+                            self._size += 1  # reserve a slot, connect outside the lock
+                            break
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise PoolTimeout(
+                                f"no database connection available after {timeout:.1f}s "
+                                f"(max_size={self.max_size})"
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            if entry is None:
+                try:
+                    conn, _, _ = self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                break
+
+            conn, created_at, returned_at = entry
+            if self._is_usable(conn, created_at, returned_at):
+                break
+            with self._cond:
+                self._discard(conn)
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._checkouts += 1
+            self._wait_time_total += waited
+            self._wait_time_max = max(self._wait_time_max, waited)
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection to the pool, rolling back any open transaction"""
+        with self._cond:
+            if id(conn) not in self._created:
+                return
+            if not discard and not conn.closed and not self._closed:
+                try:
+                    if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                except Exception:
+                    discard = True
+            else:
+                discard = True
+
+            if discard:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, self._created[id(conn)], time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and always returns it"""
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, discard=broken)
+
+    def stats(self) -> dict:
+        """Pool metrics snapshot"""
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "checkouts": self._checkouts,
+                "wait_time_avg_ms": round(self._wait_time_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "wait_time_max_ms": round(self._wait_time_max * 1000, 3),
+                "opened_total": self._opened_total,
+                "recycled_total": self._recycled_total,
+                "failed_health_checks": self._failed_checks_total,
+            }
+
+    def close(self):
+        """Close all idle connections and reject further checkouts"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+_db_pool: Optional[ConnectionPool] = None
+_db_pool_lock = threading.Lock()
+
+def get_db_pool() -> ConnectionPool:
+    """Process-wide connection pool, created on first use"""
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = ConnectionPool(
+                    DATABASE_URL,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    max_lifetime=DB_POOL_MAX_LIFETIME,
+                    health_check_idle=DB_POOL_HEALTH_CHECK_IDLE,
+                )
+    return _db_pool
+
+def get_db_connection():
+    """Get a pooled database connection (use as a context manager)"""
+    return get_db_pool().connection()
+
+# ----------------------------------------------------------------------------
+# Async (asyncpg) data access
+# ----------------------------------------------------------------------------
+
+_async_db_pool: Optional[asyncpg.Pool] = None
+_async_db_pool_lock = asyncio.Lock()
+_async_db_metrics = {
+    "waiting": 0, "acquires": 0, "wait_time_total": 0.0, "wait_time_max": 0.0,
+    "opened": 0, "recycled": 0, "failed_checks": 0,
+}
+
+class PooledConnection(asyncpg.Connection):
+    """asyncpg connection that remembers when it was opened and last returned to the pool"""
+
+    __slots__ = ("opened_at", "released_at")
+
+    # Methods rather than attribute writes, so they also work through the pool's proxy
+    def mark_opened(self):
+        self.opened_at = self.released_at = time.monotonic()
+
+    def mark_released(self):
+        self.released_at = time.monotonic()
+
+async def _init_async_connection(conn):
+    """Decode json/jsonb to Python objects, matching psycopg2's RealDictCursor rows"""
+    conn.mark_opened()
+    _async_db_metrics["opened"] += 1
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(typename, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+async def get_async_db_pool() -> asyncpg.Pool:
+    """Process-wide asyncpg pool, created on first use"""
+    global _async_db_pool
+    if _async_db_pool is None:
+        async with _async_db_pool_lock:
+            if _async_db_pool is None:
+                _async_db_pool = await asyncpg.create_pool(
+                    DATABASE_URL,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    max_inactive_connection_lifetime=DB_POOL_IDLE_TIMEOUT,
+                    statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+                    connection_class=PooledConnection,
+                    init=_init_async_connection,
+                )
+    return _async_db_pool
+
+@asynccontextmanager
+async def get_async_db_connection():
+    """
+    Acquire a healthy pooled asyncpg connection, recording checkout wait time.
+    Like ConnectionPool.getconn: connections past DB_POOL_MAX_LIFETIME are replaced
+    and ones idle longer than DB_POOL_HEALTH_CHECK_IDLE are pinged first.
+    """
+    pool = await get_async_db_pool()
+    started = time.monotonic()
+    deadline = started + DB_POOL_TIMEOUT
+    _async_db_metrics["waiting"] += 1
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"no healthy database connection after {DB_POOL_TIMEOUT:.1f}s")
+            conn = await pool.acquire(timeout=remaining)
+            if await _is_usable_async(conn):
+                break
+            # A terminated connection's slot is reopened by the pool on a later acquire
+            conn.terminate()
+            await pool.release(conn)
+    finally:
+        _async_db_metrics["waiting"] -= 1
+    waited = time.monotonic() - started
+    _async_db_metrics["acquires"] += 1
+    _async_db_metrics["wait_time_total"] += waited
+    _async_db_metrics["wait_time_max"] = max(_async_db_metrics["wait_time_max"], waited)
+    try:
+        yield conn
+    finally:
+        conn.mark_released()
+        await pool.release(conn)
+
+async def _is_usable_async(conn) -> bool:
+    """Cheap checks first; only ping the server if the connection sat idle for a while"""
+    now = time.monotonic()
+    if conn.is_closed():
+        return False
+    if now - conn.opened_at > DB_POOL_MAX_LIFETIME:
+        _async_db_metrics["recycled"] += 1
+        return False
+    if now - conn.released_at > DB_POOL_HEALTH_CHECK_IDLE:
+        try:
+            await conn.execute("SELECT 1", timeout=DB_POOL_TIMEOUT)
+        except Exception:
+            _async_db_metrics["failed_checks"] += 1
+            return False
+    return True
+
+def async_db_pool_stats() -> Optional[dict]:
+    """asyncpg pool metrics snapshot, in the same shape as ConnectionPool.stats()"""
+    if _async_db_pool is None:
+        return None
+    size = _async_db_pool.get_size()
+    idle = _async_db_pool.get_idle_size()
+    acquires = _async_db_metrics["acquires"]
+    return {
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+        "waiting": _async_db_metrics["waiting"],
+        "min_size": _async_db_pool.get_min_size(),
+        "max_size": _async_db_pool.get_max_size(),
+        "checkouts": acquires,
+        "wait_time_avg_ms": round(_async_db_metrics["wait_time_total"] / acquires * 1000, 3) if acquires else 0.0,
+        "wait_time_max_ms": round(_async_db_metrics["wait_time_max"] * 1000, 3),
+        "opened_total": _async_db_metrics["opened"],
+        "recycled_total": _async_db_metrics["recycled"],
+        "failed_health_checks": _async_db_metrics["failed_checks"],
+    }
+
+# ----------------------------------------------------------------------------
+# Lender queries
+# ----------------------------------------------------------------------------
+
+def build_lender_query(filters: Optional[dict], paramstyle: str = "format"):
+    """
+    Build the active-lender query and its parameters.
+    paramstyle is "format" (%s, psycopg2) or "numeric" ($1, asyncpg).
+    """
+    query = """
+        SELECT DISTINCT ON (name) 
+            id, name, product_name, interest_rate_min, interest_rate_max,
+            commission_structure, approval_rate_avg, active
+        FROM lenders
+        WHERE active = true
+    """
+    params = []
+
+    def placeholder():
+        return "%s" if paramstyle == "format" else f"${len(params)}::numeric"
+
+    if filters:
+        if filters.get("min_amount"):
+            params.append(filters["min_amount"])
+            query += f" AND loan_amount_min <= {placeholder()}"
+
+        if filters.get("credit_score"):
+            params.append(filters["credit_score"])
+            query += f" AND min_credit_score <= {placeholder()}"
+
+    query += " ORDER BY name, id LIMIT 3"
+    return query, params
+
+async def fetch_lenders(filters: Optional[dict]) -> list:
+    """Return matching lenders from the in-memory catalog, or query the database when it is disabled"""
+    if LENDER_CATALOG_ENABLED:
+        snapshot = await lender_catalog.get()
+        return snapshot.query(filters)
+    return await query_lenders(filters)
+
+async def query_lenders(filters: Optional[dict]) -> list:
+    """Run the lender query on the configured driver and return plain dict rows"""
+    if DB_DRIVER == "asyncpg":
+        query, params = build_lender_query(filters, paramstyle="numeric")
+        async with get_async_db_connection() as conn:
+            with db_query_span("lenders") as span:
+                started = time.perf_counter()
+                rows = await conn.fetch(query, *params)
+                observe_db_query("lenders", started, len(rows))
+                span.set_attribute("db.response.returned_rows", len(rows))
+        return [dict(r) for r in rows]
+
+    query, params = build_lender_query(filters)
+
+    # Checkout can wait up to DB_POOL_TIMEOUT and the query blocks; keep both off the event loop
+    def run():
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor, db_query_span("lenders") as span:
+                started = time.perf_counter()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+                observe_db_query("lenders", started, len(rows))
+                span.set_attribute("db.response.returned_rows", len(rows))
+                return [dict(r) for r in rows]
+
+    return await asyncio.to_thread(run)
+
+async def db_fetch_all(query: str, name: str) -> list:
+    """Run a parameterless query on the configured driver and return plain dict rows; name labels its metrics"""
+    if DB_DRIVER == "asyncpg":
+        async with get_async_db_connection() as conn:
+            with db_query_span(name) as span:
+                started = time.perf_counter()
+                rows = await conn.fetch(query)
+                observe_db_query(name, started, len(rows))
+                span.set_attribute("db.response.returned_rows", len(rows))
+        return [dict(r) for r in rows]
+
+    def run():
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor, db_query_span(name) as span:
+                started = time.perf_counter()
+                cursor.execute(query)
+                rows = cursor.fetchall()
+                observe_db_query(name, started, len(rows))
+                span.set_attribute("db.response.returned_rows", len(rows))
+                return [dict(r) for r in rows]
+
+    return await asyncio.to_thread(run)
+
+# ----------------------------------------------------------------------------
+# Lender catalog snapshot
+#
+# The active lender catalog is small and changes a few times a day, so it is
+# held in memory as an immutable snapshot and filtered there. It is refreshed
+# when the table fingerprint changes (polled every LENDER_CATALOG_POLL_INTERVAL
+# seconds) and immediately on NOTIFY when this trigger is installed:
+#
+#   CREATE OR REPLACE FUNCTION notify_lenders_changed() RETURNS trigger AS $$
+#   BEGIN PERFORM pg_notify('lenders_changed', ''); RETURN NULL; END;
+#   $$ LANGUAGE plpgsql;
+#
+#   CREATE TRIGGER lenders_changed AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE
+#   ON lenders FOR EACH STATEMENT EXECUTE FUNCTION notify_lenders_changed();
+# ----------------------------------------------------------------------------
+
+LENDER_CATALOG_QUERY = """
+    SELECT id, name, product_name, interest_rate_min, interest_rate_max,
+        commission_structure, approval_rate_avg, active,
+        loan_amount_min, min_credit_score
+    FROM lenders
+    WHERE active = true
+    ORDER BY name, id
+"""
+
+LENDER_FINGERPRINT_QUERY = """
+    SELECT md5(coalesce(string_agg(l::text, ',' ORDER BY l.id), '')) AS fingerprint
+    FROM lenders l
+"""
+
+class LenderSnapshot:
+    """
+    Immutable view of the active lenders, in the database's (name, id) order.
+    query() reproduces the SQL in build_lender_query without a round trip.
+    """
+
+    __slots__ = ("version", "loaded_at", "rows")
+
+    def __init__(self, version: str, rows: list):
+        self.version = version
+        self.loaded_at = datetime.now()
+        # (public fields, loan_amount_min, min_credit_score)
+        self.rows = tuple(
+            (
+                MappingProxyType({k: v for k, v in row.items() if k not in ("loan_amount_min", "min_credit_score")}),
+                row.get("loan_amount_min"),
+                row.get("min_credit_score"),
+            )
+            for row in rows
+        )
+
+    def query(self, filters: Optional[dict], limit: int = 3) -> list:
+        min_amount = credit_score = None
+        if filters:
+            if filters.get("min_amount"):
+                min_amount = float(filters["min_amount"])
+            if filters.get("credit_score"):
+                credit_score = float(filters["credit_score"])
+
+        results = []
+        last_name = None
+        for fields, loan_amount_min, min_credit_score in self.rows:
+            # DISTINCT ON (name): keep only the first matching row per name
+            if fields["name"] == last_name:
+                continue
+            # NULL comparisons are never true in SQL
+            if min_amount is not None and (loan_amount_min is None or loan_amount_min > min_amount):
+                continue
+            if credit_score is not None and (min_credit_score is None or min_credit_score > credit_score):
+                continue
+            last_name = fields["name"]
+            results.append(dict(fields))
+            if len(results) == limit:
+                break
+        return results
+
+class LenderCatalog:
+    """Holds the current LenderSnapshot and keeps it fresh in the background"""
+
+    def __init__(self):
+        self.snapshot: Optional[LenderSnapshot] = None
+        self.refreshes = 0
+        self.last_error: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._listener = None
+        self._pending = set()
+
+    async def get(self) -> LenderSnapshot:
+        """Current snapshot, loading it on first use"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            # force=False so callers queued behind the first load don't reload again
+            await self.refresh(force=False)
+            snapshot = self.snapshot
+        return snapshot
+
+    async def refresh(self, force: bool = True):
+        """Reload the snapshot; with force=False only when the table fingerprint changed"""
+        async with self._lock:
+            fingerprint = (await db_fetch_all(LENDER_FINGERPRINT_QUERY, "lender_fingerprint"))[0]["fingerprint"]
+            if not force and self.snapshot is not None and fingerprint == self.snapshot.version:
+                return
+            rows = await db_fetch_all(LENDER_CATALOG_QUERY, "lender_catalog")
+            # Single reference swap: readers see either the old or the new snapshot
+            self.snapshot = LenderSnapshot(fingerprint, rows)
+            self.refreshes += 1
+
+    def _on_notify(self, *args):
+        task = asyncio.get_running_loop().create_task(self.refresh(force=False))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def _on_listener_closed(self, *args):
+        self._listener = None
+
+    async def _listen(self):
+        """Dedicated (unpooled) connection, since LISTEN is bound to the session"""
+        conn = await asyncpg.connect(DATABASE_URL)
+        conn.add_termination_listener(self._on_listener_closed)
+        await conn.add_listener(LENDER_CATALOG_CHANNEL, self._on_notify)
+        self._listener = conn
+
+    async def _run(self):
+        while True:
+            try:
+                if DB_DRIVER == "asyncpg" and self._listener is None:
+                    await self._listen()
+                await asyncio.sleep(LENDER_CATALOG_POLL_INTERVAL)
+                await self.refresh(force=False)
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Lender catalog refresh failed: {self.last_error}", file=sys.stderr)
+                await asyncio.sleep(LENDER_CATALOG_POLL_INTERVAL)
+
+    async def start(self):
+        """Load the snapshot and start background refresh (a failed load is retried lazily)"""
+        try:
+            await self.refresh()
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Lender catalog initial load failed: {self.last_error}", file=sys.stderr)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+    def stats(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            "enabled": LENDER_CATALOG_ENABLED,
+            "lenders": len(snapshot.rows) if snapshot else 0,
+            "version": snapshot.version if snapshot else None,
+            "loaded_at": snapshot.loaded_at.isoformat() if snapshot else None,
+            "refreshes": self.refreshes,
+            "listening": self._listener is not None,
+            "last_error": self.last_error,
+        }
+
+lender_catalog = LenderCatalog()
+
+# ============================================================================
+# HEALTH CHECK
+# ============================================================================
+
+@mcp.tool()
+async def health_check() -> dict:
+    """Check server health and dependencies"""
+    try:
+        if DB_DRIVER == "asyncpg":
+            async with get_async_db_connection() as conn:
+                await conn.fetchval("SELECT 1")
+        else:
+            def ping():
+                with get_db_connection():
+                    pass
+            await asyncio.to_thread(ping)
+        db_status = "connected"
+    except Exception as e:
+        db_status = f"error: {str(e)}"
+    
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "database": db_status,
+        "db_driver": DB_DRIVER,
+        "lender_catalog": lender_catalog.stats(),
+        "intent_cache": intent_cache.stats(),
+        "claude_single_flight": claude_single_flight.stats(),
+        "claude_circuit_breakers": {name: b.stats() for name, b in claude_breakers.items()},
+        "eligibility_rules": eligibility_rules.stats(),
+        "verification_provider": _verification_provider.stats() if _verification_provider else VERIFICATION_PROVIDER,
+        "verification_cache": verification_cache.stats(),
+        "verification_fixtures": verification_fixtures.stats(),
+        "verification_rate_limit": verification_rate_limiter.stats(),
+        "db_pool": async_db_pool_stats() if DB_DRIVER == "asyncpg" else (_db_pool.stats() if _db_pool else None),
+        "anthropic_key": "configured" if ANTHROPIC_API_KEY else "missing",
+        "version": "production-claude-api"
+    }
+
+# ============================================================================
+# CLAUDE PROMPTS
+# ============================================================================
+# Static instructions live in the system prompt, marked with cache_control, so
+# Anthropic can reuse the processed prefix across requests; only the small
+# per-request payload goes in the user turn. A prefix shorter than the model's
+# minimum cacheable length (1024 tokens for Sonnet) is silently not cached, so
+# each prompt carries the full guidelines and worked examples, which keeps its
+# prefix (tools + system) above it; tests/test_prompts.py checks the length.
+
+EXTRACT_INTENT_SYSTEM_PROMPT = """You extract structured loan intent from messages that small and medium business owners in India send to a lending marketplace. Each user turn contains exactly one customer message. Record what the customer is asking for by calling the record_loan_intent tool once; do not answer the customer or add commentary.
+
+The messages reaching you are the ones a keyword-based extractor could not resolve with confidence, so expect mixed languages (English, Hindi and Hinglish), several numbers in one message, vague purposes, and spelling mistakes. Read the whole message before deciding.
+
+Fields:
+- loan_amount: the amount the customer wants to borrow now, as a number of rupees.
+- loan_purpose: a short description of what the money is for.
+- urgency: "low", "medium" or "high".
+- has_collateral: whether the customer says they can offer security for the loan.
+
+Loan amount:
+- Convert Indian units: 1 lakh (lac, L) = 100000 and 1 crore (cr) = 10000000, so "5 lakhs" is 500000, "2.5 cr" is 25000000 and "75 lac" is 7500000. "k" or "thousand" is 1000, "million" or "mn" is 1000000.
+- Digits may use Indian grouping ("5,00,000" is 500000, "1,20,00,000" is 12000000) or Western grouping ("500,000"). Currency markers such as "Rs", "Rs.", "INR" and "₹" may come before the number.
+- Many messages mention other figures: annual turnover, monthly sales, existing loans, EMIs, the number of employees, branches or vehicles, years in business. None of these is the loan amount. "Our turnover is 3 crore and we need 40 lakhs for stock" is a request for 4000000.
+- If the customer gives a range ("10-15 lakhs", "between 10 and 15 lakhs"), use the upper bound. If they name alternatives ("5 or maybe 10 lakhs"), use the larger one.
+- If the customer asks for a multiple of something they describe ("two trucks at 12 lakhs each"), use the total, 2400000.
+- If no amount is stated at all, use 0. Never invent an amount from the purpose.
+
+Loan purpose: prefer one of these labels when it fits, otherwise write a brief phrase of two to four words.
+- "vehicle purchase": cars, trucks, tempos, vans, tractors, two-wheelers, delivery fleets.
+- "business expansion": new branches, outlets, stores, cities, factories or production lines; hiring to grow.
+- "inventory": stock, raw materials, goods for a festive season, purchase orders from customers.
+- "equipment": machines, machinery, tools, computers, laptops, kitchen or medical equipment.
+- "working capital": salaries and payroll, rent, cash-flow gaps, paying suppliers, operating expenses, GST payments.
+- "debt refinancing": closing or consolidating existing loans or credit card dues.
+When a message names several purposes, pick the one the largest share of the money is for; if that is unclear, pick the first one mentioned.
+
+Urgency:
+- "high" for explicit time pressure: urgent, urgently, asap, immediately, today, tomorrow, this week, a deadline within about two weeks, or a supplier or customer order that must be paid now.
+- "low" for plans and exploration: planning, next year, eventually, future, just checking eligibility, comparing offers, no rush.
+- "medium" otherwise, including when no timing is mentioned.
+
+Collateral:
+- true when the customer offers or mentions owning something they can pledge: property, house, land, shop, factory premises, gold, fixed deposits, machinery they own outright, or says the loan can be secured.
+- false when they say they have no collateral, want an unsecured loan, or do not mention security at all. Negations matter: "no property to offer" and "without any security" are false.
+
+Examples (customer message -> tool input):
+"I need 5 lakhs for a car" -> {"loan_amount": 500000, "loan_purpose": "vehicle purchase", "urgency": "medium", "has_collateral": false}
+"Urgent! Need 2 crores for expanding to 3 new cities" -> {"loan_amount": 20000000, "loan_purpose": "business expansion", "urgency": "high", "has_collateral": false}
+"Turnover 1.2 cr, existing loan 15L. Want 30 lakh for Diwali stock, can keep my shop as security" -> {"loan_amount": 3000000, "loan_purpose": "inventory", "urgency": "medium", "has_collateral": true}
+"bhai 10-12 lakh chahiye machine ke liye, jaldi" -> {"loan_amount": 1200000, "loan_purpose": "equipment", "urgency": "high", "has_collateral": false}
+"Planning to buy 2 tempos next year, around 8 lakhs each. No collateral." -> {"loan_amount": 1600000, "loan_purpose": "vehicle purchase", "urgency": "low", "has_collateral": false}
+"Need money to pay salaries this month, we have 25 employees" -> {"loan_amount": 0, "loan_purpose": "working capital", "urgency": "high", "has_collateral": false}
+"Want to close my 2 personal loans and credit card dues, total ₹6,50,000; I have an FD of 3 lakhs" -> {"loan_amount": 650000, "loan_purpose": "debt refinancing", "urgency": "medium", "has_collateral": true}"""
+
+EXPLAIN_DECISION_SYSTEM_PROMPT = """You write the explanation a small or medium business owner in India reads after applying for a business loan on a lending marketplace. Each user turn contains an eligibility assessment and a recommended lender, both as JSON. Reply with the explanation text only: no headings, no JSON, no greeting line such as "Dear customer", and no sign-off.
+
+The assessment fields:
+- decision: "APPROVED", "CONDITIONAL" or "DECLINED".
+- reason: the policy reason for the decision, already phrased for a customer.
+- approved_amount: the amount offered in rupees; 0 when declined. For a conditional decision it is below the requested amount.
+- max_eligible: the largest amount the policy allows for this business's turnover.
+- risk_rating and approval_probability: the internal risk tier and the likelihood a lender approves.
+- dti_ratio: existing debt divided by annual turnover.
+- credit_score: the numeric credit score used.
+
+The recommendation fields: name (the lender, absent when no lender matched), product_name, interest_rate_min and interest_rate_max (percent per year), approval_rate_avg and commission_structure.
+
+What to cover, in this order:
+1. The decision and amount. For APPROVED, say the loan is approved for the approved amount. For CONDITIONAL, say it is conditionally approved for the approved amount and explain, using the reason, why that is less than requested. For DECLINED, say plainly that the application cannot be approved right now and give the reason.
+2. The lender. When a lender is present and the decision is not DECLINED, name it, give the interest rate range, and say in one sentence why it suits the business (for example its approval rate or its product). When no lender is present, say a relationship manager will share matching lenders.
+3. Next steps. For APPROVED and CONDITIONAL: upload KYC documents and the last six months of bank statements, after which the team contacts the customer to complete disbursal. For DECLINED: one or two concrete ways to improve, drawn from the assessment (reducing existing debt when dti_ratio is high, improving the credit score when it is low, applying for a smaller amount up to max_eligible), and that they can apply again.
+
+Tone by decision:
+- APPROVED: warm and congratulatory, but factual; the customer should finish reading knowing exactly how much they can borrow, from whom, and what to do next.
+- CONDITIONAL: positive about what is offered, and clear that it is less than requested and why, so the customer can decide whether to accept the lower amount.
+- DECLINED: respectful and encouraging. Many business owners read a rejection as a judgement of their business; explain that it reflects the current numbers only, and that the steps you suggest can change the outcome.
+
+Style:
+- Write in plain, friendly English, in the second person, in three short paragraphs and under 150 words.
+- Format amounts in rupees with Indian digit grouping (₹5,00,000) or in lakhs and crores (₹5 lakh, ₹1.2 crore); never as raw numbers like 500000.0.
+- Round rates to at most two decimals.
+- Do not mention risk_rating, approval_probability, dti_ratio or internal scores by name; describe them in everyday words ("your existing loans are high compared with your turnover").
+- Never promise final approval, disbursal timelines, or rates outside the lender's range; the lender makes the final credit decision.
+- Never invent fees, lenders, products or figures that are not in the JSON.
+- The reason field may contain amounts formatted by the policy engine (for example "₹3,000,000"); restate them in Indian grouping or in lakhs and crores.
+- If a field you need is missing or null, leave that detail out rather than guessing; an explanation with fewer details is better than a wrong one.
+- Do not use exclamation marks except for the opening of an APPROVED explanation, and never for CONDITIONAL or DECLINED ones.
+
+Example for an APPROVED assessment with a lender:
+Good news! Your business loan is approved for ₹5,00,000.
+
+We recommend FastCredit Finance, with interest rates from 12% to 16% a year. It approves most applications from businesses with your profile, which makes it a strong match.
+
+Next steps: upload your KYC documents and the last six months of bank statements, and our team will contact you to complete the disbursal.
+
+Example for a CONDITIONAL assessment with a lender, where ₹50 lakh was requested:
+Your loan application is conditionally approved for ₹30 lakh. Based on your annual turnover, the most we can offer right now is ₹30 lakh, which is less than the ₹50 lakh you asked for.
+
+We recommend GrowthBank Business Credit, with interest rates from 11.5% to 15% a year. Its business loans suit companies with a steady turnover and a good repayment record like yours.
+
+Next steps: upload your KYC documents and the last six months of bank statements, and our team will contact you to complete the disbursal. If you need more later, a higher turnover in your next returns can raise your limit.
+
+Example for an APPROVED assessment without a lender:
+Good news! Your business loan is approved for ₹8,00,000.
+
+We are still matching your application with lenders, and a relationship manager will share the best options and their interest rates with you shortly.
+
+Next steps: upload your KYC documents and the last six months of bank statements, and our team will contact you to complete the disbursal.
+
+Example for a DECLINED assessment:
+We're sorry, we can't approve your loan application right now, because your existing loans are high compared with your annual turnover.
+
+You can improve your chances by paying down some of your current debt, or by applying for a smaller amount of up to ₹12 lakh.
+
+You're welcome to apply again once your situation changes, and our team is happy to help you plan."""
+
+EXTRACT_INTENT_TOOL = {
+    "name": "record_loan_intent",
+    "description": "Record the loan intent extracted from a customer message.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "loan_amount": {"type": "number", "description": "Requested amount in rupees"},
+            "loan_purpose": {"type": "string", "description": "Brief purpose, e.g. \"vehicle purchase\""},
+            "urgency": {"type": "string", "enum": ["low", "medium", "high"]},
+            "has_collateral": {"type": "boolean"},
+        },
+        "required": ["loan_amount", "loan_purpose", "urgency", "has_collateral"],
+        "additionalProperties": False,
+    },
+}
+
+def tool_input(response, tool_name: str) -> Optional[dict]:
+    """Arguments of the first call to tool_name in a Claude response"""
+    for block in response.content:
+        if block.type == "tool_use" and block.name == tool_name:
+            return dict(block.input)
+    return None
+
+def cached_system_prompt(text: str) -> list:
+    """System prompt block marked as a prompt-cache breakpoint"""
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+def usage_dict(response) -> dict:
+    """Token usage of a Claude response, including prompt-cache reads and writes"""
+    usage = response.usage
+    return {
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", None) or 0,
+    }
+
+def template_explanation(assessment: dict, recommendation: dict) -> str:
+    """Plain templated explanation, used when Claude is unavailable"""
+    decision = str(assessment.get("decision", "")).upper()
+    amount = assessment.get("approved_amount") or assessment.get("loan_amount")
+    amount_text = f"₹{amount:,.0f}" if isinstance(amount, (int, float)) and amount else "your requested amount"
+    lender = recommendation.get("name") or recommendation.get("lender_name")
+
+    if decision == "DECLINED":
+        reason = assessment.get("reason") or "It does not meet the current eligibility criteria"
+        return (
+            f"We're unable to approve your loan application at this time because {reason[0].lower() + reason[1:]}. "
+            "You can improve your eligibility by reducing existing debt or applying for a smaller amount, "
+            "and our team is happy to help you review your options."
+        )
+
+    parts = []
+    if decision == "CONDITIONAL":
+        parts.append(f"Your loan application is conditionally approved for {amount_text}.")
+        if assessment.get("reason"):
+            parts.append(f"{assessment['reason']}.")
+    else:
+        parts.append(f"Good news! Your loan application is approved for {amount_text}.")
+
+    if lender:
+        rate_min = recommendation.get("interest_rate_min")
+        rate_max = recommendation.get("interest_rate_max")
+        rates = f" with interest rates from {rate_min}% to {rate_max}%" if rate_min and rate_max else ""
+        parts.append(f"We recommend {lender}{rates}, based on your business profile and credit assessment.")
+
+    parts.append(
+        "Next steps: upload your KYC and recent bank statements, and our team will "
+        "contact you to complete the disbursal."
+    )
+    return " ".join(parts)
+
+# ============================================================================
+# RULE-BASED INTENT EXTRACTION
+# ============================================================================
+
+AMOUNT_UNITS = {
+    "crore": 10_000_000, "crores": 10_000_000, "cr": 10_000_000, "crs": 10_000_000,
+    "lakh": 100_000, "lakhs": 100_000, "lac": 100_000, "lacs": 100_000, "l": 100_000,
+    "million": 1_000_000, "mn": 1_000_000,
+    "thousand": 1_000, "k": 1_000,
+}
+
+AMOUNT_PATTERN = re.compile(
+    r"(?P<currency>₹|\brs\.?|\binr)?\s*"
+    r"(?P<number>\d[\d,]*(?:\.\d+)?)\s*"
+    r"(?P<unit>crores?|crs?|lakhs?|lacs?|l|million|mn|thousand|k)?\b",
+    re.IGNORECASE,
+)
+
+# Bare numbers below this (e.g. "3 new cities") are not treated as amounts
+MIN_BARE_AMOUNT = 10_000
+
+PURPOSE_KEYWORDS = {
+    "vehicle purchase": r"car|cars|vehicle|vehicles|truck|trucks|tempo|bike|scooter|van|tractor",
+    "business expansion": r"expand|expanding|expansion|new branch|new branches|new cities|new city|new store|new outlet|new location|scale up",
+    "inventory": r"inventory|stock|stocks|raw material|raw materials|goods",
+    "equipment": r"equipment|machine|machines|machinery|tools|computers|laptops",
+    "working capital": r"working capital|cash flow|cashflow|salaries|salary|payroll|rent|operating expenses",
+}
+PURPOSE_PATTERNS = {
+    purpose: re.compile(rf"\b(?:{words})\b", re.IGNORECASE)
+    for purpose, words in PURPOSE_KEYWORDS.items()
+}
+
+HIGH_URGENCY_PATTERN = re.compile(
+    r"\b(?:urgent|urgently|asap|immediately|immediate|right away|today|tomorrow|quickly|at the earliest)\b",
+    re.IGNORECASE,
+)
+LOW_URGENCY_PATTERN = re.compile(
+    r"\b(?:planning|plan to|future|next year|eventually|someday|no rush|exploring)\b",
+    re.IGNORECASE,
+)
+COLLATERAL_PATTERN = re.compile(
+    r"\b(?:collateral|security|secured|property|mortgage|gold|house|land|fixed deposit|fd)\b",
+    re.IGNORECASE,
+)
+NO_COLLATERAL_PATTERN = re.compile(
+    r"\b(?:no|without|not|don't have|do not have|unsecured)\s+(?:any\s+)?(?:collateral|security|property)\b",
+    re.IGNORECASE,
+)
+
+def parse_amounts(message: str) -> list:
+    """All rupee amounts in Indian notation ("5 lakhs", "2.5 cr", "₹5,00,000")"""
+    amounts = []
+    for match in AMOUNT_PATTERN.finditer(message):
+        number = float(match.group("number").replace(",", ""))
+        unit = match.group("unit")
+        if unit:
+            number *= AMOUNT_UNITS[unit.lower()]
+        elif not match.group("currency") and number < MIN_BARE_AMOUNT:
+            continue
+        number = round(number, 2)
+        amounts.append(int(number) if number == int(number) else number)
+    return amounts
+
+def extract_intent_rules(message: str) -> dict:
+    """
+    Deterministic intent extraction for the common "<n> lakhs for <purpose>" messages.
+    Returns the intent in the same shape as the Claude extractor plus a confidence score.
+    """
+    amounts = parse_amounts(message)
+    purposes = [p for p, pattern in PURPOSE_PATTERNS.items() if pattern.search(message)]
+
+    if HIGH_URGENCY_PATTERN.search(message):
+        urgency = "high"
+    elif LOW_URGENCY_PATTERN.search(message):
+        urgency = "low"
+    else:
+        urgency = "medium"
+
+    has_collateral = bool(COLLATERAL_PATTERN.search(message)) and not NO_COLLATERAL_PATTERN.search(message)
+
+    # Amount and purpose carry the decision; urgency and collateral have safe defaults
+    confidence = 0.1
+    if len(set(amounts)) == 1:
+        confidence += 0.5
+    elif amounts:
+        confidence += 0.2
+    if len(purposes) == 1:
+        confidence += 0.4
+    elif purposes:
+        confidence += 0.1
+
+    return {
+        "intent": {
+            "loan_amount": amounts[0] if amounts else None,
+            "loan_purpose": purposes[0] if purposes else None,
+            "urgency": urgency,
+            "has_collateral": has_collateral,
+        },
+        "confidence": round(min(confidence, 0.95), 2),
+    }
+
+# ============================================================================
+# GSTIN / PAN VALIDATION
+# ============================================================================
+# Offline structural checks, run before any provider lookup so malformed IDs
+# never cost an external call.
+#   PAN:   AAAAA9999A, 4th letter is the holder type (P person, C company, ...)
+#   GSTIN: 2-digit state code + PAN + entity number (1-9, A-Z) + a letter
+#          (Z for regular taxpayers) + a mod-36 check character
+
+GSTIN_CHARSET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+# 01-38 states and union territories, 97 other territory, 99 centre jurisdiction
+GST_STATE_CODES = frozenset(list(range(1, 39)) + [97, 99])
+# Association of persons, Body of individuals, Company, LLP, Firm, Government,
+# HUF, Artificial juridical person, Local authority, Person, Trust
+PAN_HOLDER_TYPES = "ABCEFGHJLPT"
+
+# Byte -> position in GSTIN_CHARSET (-1 for anything else), shared by the scalar and batch paths
+_CHAR_CODES = np.full(256, -1, dtype=np.int16)
+for _i, _c in enumerate(GSTIN_CHARSET):
+    _CHAR_CODES[ord(_c)] = _i
+_PAN_HOLDER = np.zeros(256, dtype=bool)
+_PAN_HOLDER[[ord(c) for c in PAN_HOLDER_TYPES]] = True
+_STATE_OK = np.zeros(100, dtype=bool)
+_STATE_OK[list(GST_STATE_CODES)] = True
+_CHECK_FACTORS = np.array([1, 2] * 7, dtype=np.int32)
+
+PAN_PATTERN = re.compile(r"[A-Z]{5}[0-9]{4}[A-Z]")
+
+def normalize_tax_id(value: str) -> str:
+    # Non-strings (e.g. a JSON number) pass through for the validators to reject
+    return value.strip().upper() if isinstance(value, str) else value
+
+def gstin_check_char(gst_number: str) -> str:
+    """Mod-36 check character over the first 14 characters of a GSTIN"""
+    total = 0
+    for i, char in enumerate(gst_number[:14]):
+        product = GSTIN_CHARSET.index(char) * (2 if i % 2 else 1)
+        total += product // 36 + product % 36
+    return GSTIN_CHARSET[(36 - total % 36) % 36]
+
+def validate_pan(pan_number: str) -> Optional[str]:
+    """Reason a PAN is malformed, or None if it is well-formed"""
+    if not isinstance(pan_number, str) or not PAN_PATTERN.fullmatch(pan_number):
+        return "PAN must be 5 letters, 4 digits and a letter"
+    if pan_number[3] not in PAN_HOLDER_TYPES:
+        return f"Unknown PAN holder type '{pan_number[3]}'"
+    return None
+
+def validate_gstin(gst_number: str) -> Optional[str]:
+    """Reason a GSTIN is malformed, or None if it is well-formed"""
+    if not isinstance(gst_number, str) or len(gst_number) != 15 or not gst_number.isascii() or not gst_number.isalnum():
+        return "GSTIN must be 15 letters and digits"
+    if not gst_number[:2].isdigit() or int(gst_number[:2]) not in GST_STATE_CODES:
+        return f"Unknown state code '{gst_number[:2]}'"
+    pan_error = validate_pan(gst_number[2:12])
+    if pan_error:
+        return f"Embedded {pan_error}"
+    if gst_number[12] == "0":
+        return "Entity number must be 1-9 or A-Z"
+    if not gst_number[13].isalpha():
+        return "14th character must be a letter"
+    if gst_number[14] != gstin_check_char(gst_number):
+        return "Check digit mismatch"
+    return None
+
+def _id_matrix(values: list, width: int):
+    """Rows of same-width ASCII IDs as an (n, width) byte matrix, plus their indexes in values"""
+    rows = [i for i, v in enumerate(values) if isinstance(v, str) and len(v) == width and v.isascii()]
+    data = "".join(values[i] for i in rows).encode("ascii")
+    return np.frombuffer(data, dtype=np.uint8).reshape(len(rows), width), rows
+
+def _pan_checks(pan: np.ndarray, offset: int = 0, prefix: str = "") -> list:
+    """(bad row mask, reason) checks over an (n, 10) PAN byte matrix, in validate_pan order"""
+    codes = _CHAR_CODES[pan]
+    letters_ok = (codes[:, :5] >= 10).all(axis=1) & (codes[:, 9] >= 10)
+    digits_ok = ((codes[:, 5:9] >= 0) & (codes[:, 5:9] < 10)).all(axis=1)
+    holder = offset + 3
+    return [
+        (~(letters_ok & digits_ok), f"{prefix}PAN must be 5 letters, 4 digits and a letter"),
+        (~_PAN_HOLDER[pan[:, 3]], lambda v: f"{prefix}Unknown PAN holder type '{v[holder]}'"),
+    ]
+
+def _first_failures(values: list, rows: list, checks: list, errors: list):
+    """Write into errors the reason of the first failing check for each row"""
+    decided = np.zeros(len(rows), dtype=bool)
+    for bad, reason in checks:
+        for j in np.flatnonzero(bad & ~decided).tolist():
+            errors[rows[j]] = reason(values[rows[j]]) if callable(reason) else reason
+        decided |= bad
+
+def validate_pan_batch(values: list) -> list:
+    """Vectorized validate_pan: one reason (or None) per value, after normalize_tax_id"""
+    values = [normalize_tax_id(v) if isinstance(v, str) else v for v in values]
+    errors = ["PAN must be 5 letters, 4 digits and a letter"] * len(values)
+    pan, rows = _id_matrix(values, 10)
+    for i in rows:
+        errors[i] = None
+    if rows:
+        _first_failures(values, rows, _pan_checks(pan), errors)
+    return errors
+
+def validate_gstin_batch(values: list) -> list:
+    """
+    Vectorized validate_gstin for bulk uploads: one reason (or None) per value, after
+    normalize_tax_id. All checks, the check digit included, run as NumPy array operations.
+    """
+    values = [normalize_tax_id(v) if isinstance(v, str) else v for v in values]
+    errors = ["GSTIN must be 15 letters and digits"] * len(values)
+    gstin, rows = _id_matrix(values, 15)
+    for i in rows:
+        errors[i] = None
+    if not rows:
+        return errors
+
+    codes = _CHAR_CODES[gstin]
+    state_digits = ((codes[:, :2] >= 0) & (codes[:, :2] < 10)).all(axis=1)
+    state = np.where(state_digits, codes[:, 0] * 10 + codes[:, 1], 0)
+    products = np.maximum(codes[:, :14], 0) * _CHECK_FACTORS
+    check = (36 - (products // 36 + products % 36).sum(axis=1) % 36) % 36
+
+    checks = [
+        (~(codes >= 0).all(axis=1), "GSTIN must be 15 letters and digits"),
+        (~(state_digits & _STATE_OK[state]), lambda v: f"Unknown state code '{v[:2]}'"),
+        *_pan_checks(gstin[:, 2:12], offset=2, prefix="Embedded "),
+        (codes[:, 12] == 0, "Entity number must be 1-9 or A-Z"),
+        (codes[:, 13] < 10, "14th character must be a letter"),
+        (codes[:, 14] != check, "Check digit mismatch"),
+    ]
+    _first_failures(values, rows, checks, errors)
+    return errors
+
+# ============================================================================
+# GST / PAN VERIFICATION AND REPORT PARSING
+# ============================================================================
+
+# Mock-provider records (the FINAGG demo business from the FameScore report) plus,
+# optionally, a JSONL or CSV dataset of synthetic registrations for load tests.
+# The file and sorted GSTIN/PAN -> line offset indexes built beside it are memory-
+# mapped, so workers share one copy of both and a lookup parses a single row.
+# When the dataset's directory is read-only the indexes go to
+# VERIFICATION_FIXTURES_INDEX_DIR instead, and failing that stay in memory.
+VERIFICATION_FIXTURES_PATH = os.getenv("VERIFICATION_FIXTURES_PATH", "")
+VERIFICATION_FIXTURES_INDEX_DIR = os.getenv(
+    "VERIFICATION_FIXTURES_INDEX_DIR", os.path.join(tempfile.gettempdir(), "loan-mcp-fixture-index")
+)
+
+DEMO_GST_RECORDS = {
+    "09AADCF8429L1Z4": {
+        "business_name": "FINAGG TECHNOLOGIES PRIVATE LIMITED",
+        "trade_name": "FINAGG TECHNOLOGIES PRIVATE LIMITED",
+        "constitution": "Private Limited",
+        "address": "C 1,SECTOR 16,Noida,Uttar Pradesh-201301",
+        "date_of_registration": "2021-02-21",
+        "annual_turnover": 24148440.33,
+        "filing_compliance": 0.84,
+        "pan_number": "AADCF8429L",
+        "credit_score": "CMR-2",
+        "existing_loans": 2710443,
+    },
+}
+DEMO_PAN_RECORDS = {
+    "AADCF8429L": {"name": "FINAGG TECHNOLOGIES PRIVATE LIMITED", "status": "Active"},
+}
+
+# CSV cells are strings; these columns are typed like the JSON records
+FIXTURE_NUMERIC_FIELDS = {"annual_turnover": float, "filing_compliance": float, "existing_loans": int}
+
+class FixtureIndex:
+    """
+    Sorted key -> line offset table, usually a .npy file memory-mapped read-only so
+    every worker shares one copy through the page cache.
+
+    Lookups are an O(log n) binary search (about 20 probes for a million keys), not
+    an O(1) dict: a dict of a million str keys costs over 100 MB in every worker,
+    while this table is the key width plus 8 bytes a row, paid once per host.
+    """
+
+    def __init__(self, table: np.ndarray):
+        self.table = table
+        self.keys = table["key"]
+        self.offsets = table["offset"]
+        self.width = self.keys.dtype.itemsize
+
+    @classmethod
+    def open(cls, path: str) -> "FixtureIndex":
+        return cls(np.load(path, mmap_mode="r"))
+
+    @staticmethod
+    def build(keys: list, offsets: list) -> np.ndarray:
+        """Table sorted by key, keeping each key's first row"""
+        width = max((len(k) for k in keys), default=1)
+        table = np.empty(len(keys), dtype=[("key", f"S{width}"), ("offset", "<u8")])
+        table["key"] = keys
+        table["offset"] = offsets
+        table = table[np.argsort(table["key"], kind="stable")]
+        if len(table):
+            first = np.ones(len(table), dtype=bool)
+            first[1:] = table["key"][1:] != table["key"][:-1]
+            table = table[first]
+        return table
+
+    @staticmethod
+    def write(path: str, table: np.ndarray):
+        """Save atomically, so readers never map a partial file"""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, table)
+        os.replace(tmp, path)
+
+    def get(self, key: str) -> Optional[int]:
+        key = key.encode()
+        if len(key) > self.width:
+            return None
+        i = int(np.searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key:
+            return int(self.offsets[i])
+        return None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+class FixtureStore:
+    """
+    GST/PAN records keyed by normalized GSTIN and PAN. Each dataset row is a GST
+    registration with gst_number and usually pan_number (a row with only
+    pan_number is a PAN holder); a PAN resolves to its first row, named by `name`
+    or `business_name`. CSV needs a header row and no newlines inside cells.
+
+    The key indexes are built once per dataset version into sidecar files next to
+    it (<path>.gst.npy, <path>.pan.npy, <path>.index.json), under a file lock so
+    concurrently starting workers build them only once; later starts just map them.
+    If neither the dataset's directory nor VERIFICATION_FIXTURES_INDEX_DIR is
+    writable, each worker builds its own in memory.
+    """
+
+    INDEX_VERSION = 1
+
+    def __init__(self, path: str = "", gst_records: dict = None, pan_records: dict = None):
+        self.path = path
+        self.gst_records = dict(gst_records or {})
+        self.pan_records = dict(pan_records or {})
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._data = None
+        self._header = None
+        self._gst_index: Optional[FixtureIndex] = None
+        self._pan_index: Optional[FixtureIndex] = None
+        self._load_seconds = None
+        self._index_built = False
+        self._index_prefix: Optional[str] = None
+
+    def load(self):
+        """Map the dataset and its indexes, building them if stale; idempotent, and a no-op without a path"""
+        with self._lock:
+            if self._loaded:
+                return
+            if self.path:
+                started = time.perf_counter()
+                with open(self.path, "rb") as f:
+                    self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+                if self.path.endswith(".csv"):
+                    _, header = next(self._lines(), (0, b""))
+                    self._header = next(csv.reader([header.decode("utf-8-sig")]), [])
+                self._load_indexes()
+                self._load_seconds = time.perf_counter() - started
+                print(f"Loaded {len(self._gst_index)} GST / {len(self._pan_index)} PAN fixtures from {self.path} "
+                      f"in {self._load_seconds:.1f}s ({'built' if self._index_built else 'existing'} index)",
+                      file=sys.stderr)
+            self._loaded = True
+
+    def index_prefixes(self) -> list:
+        """Where the index files may live, in order of preference"""
+        path = os.path.abspath(self.path)
+        digest = hashlib.sha256(path.encode()).hexdigest()[:16]
+        return [path, os.path.join(VERIFICATION_FIXTURES_INDEX_DIR, f"{os.path.basename(path)}.{digest}")]
+
+    def _load_indexes(self):
+        stat = os.stat(self.path)
+        meta = {"version": self.INDEX_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        for prefix in self.index_prefixes():
+            try:
+                self._load_index_files(prefix, meta)
+            except OSError as e:
+                print(f"Fixture index unavailable at {prefix}: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            self._index_prefix = prefix
+            return
+        gst_table, pan_table = self._build_indexes()
+        self._gst_index, self._pan_index = FixtureIndex(gst_table), FixtureIndex(pan_table)
+        self._index_built = True
+
+    def _load_index_files(self, prefix: str, meta: dict):
+        os.makedirs(os.path.dirname(prefix), exist_ok=True)
+        meta_path = f"{prefix}.index.json"
+        with open(f"{prefix}.index.lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(meta_path) as f:
+                    current = json.load(f) == meta
+            except (OSError, ValueError):
+                current = False
+            if not current:
+                gst_table, pan_table = self._build_indexes()
+                FixtureIndex.write(f"{prefix}.gst.npy", gst_table)
+                FixtureIndex.write(f"{prefix}.pan.npy", pan_table)
+                # Written last: the indexes are complete once this matches the dataset
+                with open(meta_path, "w") as f:
+                    json.dump(meta, f)
+                self._index_built = True
+        self._gst_index = FixtureIndex.open(f"{prefix}.gst.npy")
+        self._pan_index = FixtureIndex.open(f"{prefix}.pan.npy")
+
+    def _build_indexes(self):
+        gst_keys, gst_offsets, pan_keys, pan_offsets = [], [], [], []
+        for offset, gst_number, pan_number in self._scan():
+            if gst_number:
+                gst_keys.append(normalize_tax_id(gst_number).encode())
+                gst_offsets.append(offset)
+            if pan_number:
+                pan_keys.append(normalize_tax_id(pan_number).encode())
+                pan_offsets.append(offset)
+        return FixtureIndex.build(gst_keys, gst_offsets), FixtureIndex.build(pan_keys, pan_offsets)
+
+    def _lines(self, start: int = 0):
+        data = self._data
+        offset = start
+        while offset < len(data):
+            end = data.find(b"\n", offset)
+            if end < 0:
+                end = len(data)
+            yield offset, data[offset:end].rstrip(b"\r")
+            offset = end + 1
+
+    def _scan(self):
+        """(offset, gst_number, pan_number) for each data row"""
+        lines = self._lines()
+        if self._header is None:
+            for offset, line in lines:
+                if line.strip():
+                    row = loads_json(line)
+                    yield offset, row.get("gst_number"), row.get("pan_number")
+            return
+        next(lines, None)
+        gst_col = self._header.index("gst_number") if "gst_number" in self._header else None
+        pan_col = self._header.index("pan_number") if "pan_number" in self._header else None
+        for offset, line in lines:
+            if line.strip():
+                cells = next(csv.reader([line.decode()]))
+                yield (
+                    offset,
+                    cells[gst_col] if gst_col is not None and gst_col < len(cells) else None,
+                    cells[pan_col] if pan_col is not None and pan_col < len(cells) else None,
+                )
+
+    def _row(self, offset: int) -> dict:
+        end = self._data.find(b"\n", offset)
+        line = self._data[offset:end if end >= 0 else len(self._data)].rstrip(b"\r")
+        if self._header is None:
+            return loads_json(line)
+        row = {}
+        for field, cell in zip(self._header, next(csv.reader([line.decode()]))):
+            if cell != "":
+                row[field] = FIXTURE_NUMERIC_FIELDS[field](cell) if field in FIXTURE_NUMERIC_FIELDS else cell
+        return row
+
+    def gst(self, gst_number: str) -> Optional[dict]:
+        self.load()
+        offset = self._gst_index.get(gst_number) if self._gst_index is not None else None
+        if offset is not None:
+            row = self._row(offset)
+            if row.get("gst_number"):
+                row.pop("gst_number")
+                return row
+        return self.gst_records.get(gst_number)
+
+    def pan(self, pan_number: str) -> Optional[dict]:
+        self.load()
+        offset = self._pan_index.get(pan_number) if self._pan_index is not None else None
+        if offset is not None:
+            row = self._row(offset)
+            return {
+                "name": row.get("name") or row.get("business_name", ""),
+                "status": row.get("pan_status") or row.get("status") or "Active",
+            }
+        return self.pan_records.get(pan_number)
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path or None,
+            "loaded": self._loaded,
+            "gst_records": len(self._gst_index or ()) + len(self.gst_records),
+            "pan_records": len(self._pan_index or ()) + len(self.pan_records),
+            "index_built": self._index_built,
+            "index_path": self._index_prefix or ("memory" if self._gst_index is not None else None),
+            "load_seconds": round(self._load_seconds, 3) if self._load_seconds is not None else None,
+        }
+
+verification_fixtures = FixtureStore(VERIFICATION_FIXTURES_PATH, DEMO_GST_RECORDS, DEMO_PAN_RECORDS)
+
+def lookup_gst_record(gst_number: str) -> dict:
+    """GST registration lookup - Mock for MVP, served from verification_fixtures"""
+    record = verification_fixtures.gst(gst_number)
+    if record is not None:
+        return {
+            "gst_number": gst_number,
+            **record,
+            "verified": True,
+            "verification_date": datetime.now().isoformat(),
+            "verification_method": "mock-api"
+        }
+    return {
+        "gst_number": gst_number,
+        "verified": False,
+        "error": "GST number not found. Use 09AADCF8429L1Z4 for demo.",
+        "verification_date": datetime.now().isoformat()
+    }
+
+def lookup_pan_record(pan_number: str) -> dict:
+    """PAN lookup - Mock for MVP, served from verification_fixtures"""
+    record = verification_fixtures.pan(pan_number)
+    if record is not None:
+        return {
+            "pan_number": pan_number,
+            **record,
+            "verified": True,
+            "verification_date": datetime.now().isoformat()
+        }
+    return {
+        "pan_number": pan_number,
+        "verified": False,
+        "error": "PAN not found. Use AADCF8429L for demo.",
+        "verification_date": datetime.now().isoformat()
+    }
+
+# Credit score mapping
+CREDIT_SCORE_MAP = {
+    "CMR-1": 850,
+    "CMR-2": 750,
+    "CMR-3": 650,
+    "CMR-4": 550,
+    "CMR-5": 450
+}
+
+def parse_gst_report(report: dict) -> dict:
+    """Normalize a GST/credit report into the fields eligibility scoring uses"""
+    return {
+        "business_name": report.get("business_name", ""),
+        "gst_number": report.get("gst_number", ""),
+        "pan_number": report.get("pan_number", ""),
+        "annual_turnover": report.get("annual_turnover", 0),
+        "filing_compliance": report.get("filing_compliance", 0),
+        "credit_score_text": report.get("credit_score", "CMR-2"),
+        "credit_score_numeric": CREDIT_SCORE_MAP.get(report.get("credit_score", "CMR-2"), 750),
+        "existing_debt": report.get("existing_loans", 0),
+        "constitution": report.get("constitution", ""),
+        "address": report.get("address", ""),
+        "parsed_at": datetime.now().isoformat()
+    }
+
+# ============================================================================
+# VERIFICATION PROVIDERS
+# ============================================================================
+# GST/PAN lookups go through a provider: "mock" answers from the in-process demo
+# records, "http" calls a GSTN/NSDL aggregator (or verification_stub.py) over a
+# pooled, keep-alive httpx client. Failed calls are retried with backoff, but
+# only while the retry budget allows, so an outage doesn't multiply upstream load.
+
+VERIFICATION_PROVIDER = os.getenv("VERIFICATION_PROVIDER", "mock")
+VERIFICATION_PROVIDER_URL = os.getenv("VERIFICATION_PROVIDER_URL", "http://localhost:8081")
+VERIFICATION_API_KEY = os.getenv("VERIFICATION_API_KEY")
+VERIFICATION_MAX_CONNECTIONS = int(os.getenv("VERIFICATION_MAX_CONNECTIONS", 100))
+VERIFICATION_KEEPALIVE_EXPIRY = float(os.getenv("VERIFICATION_KEEPALIVE_EXPIRY", 30))
+VERIFICATION_CONNECT_TIMEOUT = float(os.getenv("VERIFICATION_CONNECT_TIMEOUT", 2))
+VERIFICATION_TIMEOUT = float(os.getenv("VERIFICATION_TIMEOUT", 5))
+VERIFICATION_MAX_RETRIES = int(os.getenv("VERIFICATION_MAX_RETRIES", 2))
+# Retries may add at most this fraction of request volume, plus a small floor per second
+VERIFICATION_RETRY_RATIO = float(os.getenv("VERIFICATION_RETRY_RATIO", 0.1))
+VERIFICATION_RETRY_FLOOR = float(os.getenv("VERIFICATION_RETRY_FLOOR", 1))
+# Provider calls per second per worker (0 = unlimited), to stay inside the aggregator's quota
+VERIFICATION_RATE_LIMIT = float(os.getenv("VERIFICATION_RATE_LIMIT", 0))
+VERIFICATION_RATE_BURST = float(os.getenv("VERIFICATION_RATE_BURST", 10))
+
+class VerificationUnavailable(Exception):
+    """Raised when a provider cannot give an answer (as opposed to answering "not found")"""
+
+class RetryBudget:
+    """
+    Token bucket shared by all calls to one upstream: each request deposits `ratio`
+    tokens, time adds `floor` per second, and each retry spends one.
+    """
+
+    def __init__(self, ratio: float, floor: float, capacity: float = 10.0):
+        self.ratio = ratio
+        self.floor = floor
+        self.capacity = capacity
+        self._balance = capacity
+        self._updated = time.monotonic()
+        self.retries = 0
+        self.exhausted = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._balance = min(self.capacity, self._balance + (now - self._updated) * self.floor)
+        self._updated = now
+
+    def deposit(self):
+        self._refill()
+        self._balance = min(self.capacity, self._balance + self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self._balance >= 1:
+            self._balance -= 1
+            self.retries += 1
+            return True
+        self.exhausted += 1
+        return False
+
+    def stats(self) -> dict:
+        self._refill()
+        return {"balance": round(self._balance, 2), "retries": self.retries, "exhausted": self.exhausted}
+
+class RateLimiter:
+    """Async token bucket: at most `rate` acquisitions per second, in bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self.waits = 0
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            self.waits += 1
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def stats(self) -> dict:
+        return {"rate_per_second": self.rate, "burst": self.burst, "waits": self.waits}
+
+verification_rate_limiter = RateLimiter(VERIFICATION_RATE_LIMIT, VERIFICATION_RATE_BURST)
+
+class VerificationProvider:
+    """Interface for GST/PAN verification backends; results use the lookup_*_record shape"""
+
+    name = "base"
+
+    async def verify_gst(self, gst_number: str) -> dict:
+        raise NotImplementedError
+
+    async def verify_pan(self, pan_number: str) -> dict:
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"provider": self.name}
+
+class MockVerificationProvider(VerificationProvider):
+    """In-process demo records - Mock for MVP"""
+
+    name = "mock"
+
+    async def verify_gst(self, gst_number: str) -> dict:
+        return lookup_gst_record(gst_number)
+
+    async def verify_pan(self, pan_number: str) -> dict:
+        return lookup_pan_record(pan_number)
+
+class HTTPVerificationProvider(VerificationProvider):
+    """
+    Aggregator API over one pooled httpx client: GET {base_url}/gst/{gstin} and
+    /pan/{pan} return the registration as JSON, 404 means not found.
+    """
+
+    name = "http"
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None):
+        self.base_url = base_url.rstrip("/")
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else None,
+            limits=httpx.Limits(
+                max_connections=VERIFICATION_MAX_CONNECTIONS,
+                max_keepalive_connections=VERIFICATION_MAX_CONNECTIONS,
+                keepalive_expiry=VERIFICATION_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(VERIFICATION_TIMEOUT, connect=VERIFICATION_CONNECT_TIMEOUT),
+        )
+        self.retry_budget = RetryBudget(VERIFICATION_RETRY_RATIO, VERIFICATION_RETRY_FLOOR)
+        self.requests = 0
+        self.failures = 0
+
+    async def _get(self, path: str) -> Optional[dict]:
+        """JSON body of a GET, None for 404; retries transient failures within the budget"""
+        self.requests += 1
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.get(path)
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code == 404:
+                    return None
+                if response.status_code not in self.RETRY_STATUSES:
+                    # Anything else (a bad API key, a rejected request, a malformed body) won't fix itself
+                    if response.is_success:
+                        try:
+                            return response.json()
+                        except ValueError as e:
+                            error = f"invalid JSON: {e}"
+                    else:
+                        error = f"HTTP {response.status_code}"
+                    self.failures += 1
+                    raise VerificationUnavailable(f"{self.name} provider failed: {error}")
+                error = f"HTTP {response.status_code}"
+            attempt += 1
+            if attempt > VERIFICATION_MAX_RETRIES or not self.retry_budget.try_spend():
+                self.failures += 1
+                raise VerificationUnavailable(f"{self.name} provider failed after {attempt} attempt(s): {error}")
+            await asyncio.sleep(min(0.05 * 2 ** attempt, 1.0))
+
+    async def verify_gst(self, gst_number: str) -> dict:
+        record = await self._get(f"/gst/{gst_number}")
+        if record is None:
+            return {
+                "gst_number": gst_number,
+                "verified": False,
+                "error": "GST number not found",
+                "verification_date": datetime.now().isoformat()
+            }
+        return {
+            **record,
+            "gst_number": gst_number,
+            "verified": True,
+            "verification_date": datetime.now().isoformat(),
+            "verification_method": self.name
+        }
+
+    async def verify_pan(self, pan_number: str) -> dict:
+        record = await self._get(f"/pan/{pan_number}")
+        if record is None:
+            return {
+                "pan_number": pan_number,
+                "verified": False,
+                "error": "PAN not found",
+                "verification_date": datetime.now().isoformat()
+            }
+        return {
+            **record,
+            "pan_number": pan_number,
+            "verified": True,
+            "verification_date": datetime.now().isoformat(),
+            "verification_method": self.name
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.name,
+            "base_url": self.base_url,
+            "requests": self.requests,
+            "failures": self.failures,
+            "retry_budget": self.retry_budget.stats(),
+        }
+
+VERIFICATION_PROVIDERS = {
+    "mock": MockVerificationProvider,
+    "http": lambda: HTTPVerificationProvider(VERIFICATION_PROVIDER_URL, VERIFICATION_API_KEY),
+}
+
+_verification_provider: Optional[VerificationProvider] = None
+
+def get_verification_provider() -> VerificationProvider:
+    """The configured provider, created on first use (inside the worker's event loop)"""
+    global _verification_provider
+    if _verification_provider is None:
+        if VERIFICATION_PROVIDER not in VERIFICATION_PROVIDERS:
+            raise ValueError(f"Unknown VERIFICATION_PROVIDER: {VERIFICATION_PROVIDER}")
+        _verification_provider = VERIFICATION_PROVIDERS[VERIFICATION_PROVIDER]()
+    return _verification_provider
+
+async def close_verification_provider():
+    global _verification_provider
+    if _verification_provider is not None:
+        await _verification_provider.aclose()
+        _verification_provider = None
+
+# Verification results change rarely: verified IDs are cached for a day, "not found"
+# briefly (the ID may be registered soon), and an expired entry is still served for
+# the stale window while a single background refresh replaces it
+VERIFICATION_CACHE_MAX_SIZE = int(os.getenv("VERIFICATION_CACHE_MAX_SIZE", 100000))
+VERIFICATION_CACHE_TTL = float(os.getenv("VERIFICATION_CACHE_TTL", 86400))
+VERIFICATION_CACHE_NEGATIVE_TTL = float(os.getenv("VERIFICATION_CACHE_NEGATIVE_TTL", 600))
+VERIFICATION_CACHE_STALE_TTL = float(os.getenv("VERIFICATION_CACHE_STALE_TTL", 3600))
+
+class VerificationCache:
+    """
+    Bounded LRU cache of verification results with separate positive/negative TTLs,
+    stale-while-revalidate, and one shared provider call per ID in flight.
+    Provider failures are never cached.
+    """
+
+    def __init__(self, max_size: int, ttl: float, negative_ttl: float, stale_ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self._data = OrderedDict()  # key -> (fetched_at, expires_at, value)
+        self._flights = SingleFlight()
+        self._refreshes = set()  # background refresh tasks, referenced until done
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refresh_failures = 0
+
+    def _store(self, key, value: dict):
+        if self.max_size <= 0:
+            return
+        now = time.monotonic()
+        ttl = self.ttl if value.get("verified") else self.negative_ttl
+        self._data[key] = (now, now + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def _fetch(self, key, fetch) -> dict:
+        async def fetch_and_store():
+            value = await fetch()
+            self._store(key, value)
+            return value
+        return await self._flights.do(":".join(key), key[0], fetch_and_store)
+
+    def _revalidate(self, key, fetch):
+        async def refresh():
+            try:
+                await self._fetch(key, fetch)
+            except Exception as e:
+                self.refresh_failures += 1
+                print(f"Verification cache refresh failed for {key[0]} {key[1]}: {type(e).__name__}: {e}", file=sys.stderr)
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    async def get(self, kind: str, identifier: str, fetch) -> dict:
+        """Cached result for (kind, identifier), calling fetch() on a miss; annotated with cached/cache_age_seconds"""
+        key = (kind, identifier)
+        entry = self._data.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            fetched_at, expires_at, value = entry
+            if now < expires_at + self.stale_ttl:
+                self._data.move_to_end(key)
+                if now < expires_at:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    if not self._flights.in_flight(":".join(key)):
+                        self._revalidate(key, fetch)
+                return {**value, "cached": True, "cache_age_seconds": round(now - fetched_at, 3)}
+            del self._data[key]
+
+        self.misses += 1
+        value = await self._fetch(key, fetch)
+        return {**value, "cached": False, "cache_age_seconds": 0.0}
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "negative_ttl_seconds": self.negative_ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "refreshing": len(self._refreshes),
+            "refresh_failures": self.refresh_failures,
+            "provider_calls": self._flights.calls_total,
+            "coalesced": self._flights.coalesced_total,
+        }
+
+verification_cache = VerificationCache(
+    VERIFICATION_CACHE_MAX_SIZE, VERIFICATION_CACHE_TTL, VERIFICATION_CACHE_NEGATIVE_TTL, VERIFICATION_CACHE_STALE_TTL
+)
+
+# ============================================================================
+# ELIGIBILITY SCORING
+# ============================================================================
+# Scoring policy lives in a versioned decision table (eligibility_rules.json, or
+# YAML), compiled into a generated Python function for single assessments and
+# NumPy masks for batches. The table is hot-reloaded: each assessment reads the
+# current EligibilityRules once, so a reload never affects a request mid-flight.
+
+ELIGIBILITY_RULES_PATH = os.getenv(
+    "ELIGIBILITY_RULES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "eligibility_rules.json"),
+)
+ELIGIBILITY_RULES_POLL_INTERVAL = float(os.getenv("ELIGIBILITY_RULES_POLL_INTERVAL", 10))
+
+# Variables a decision rule may reference
+RULE_VARIABLES = ("annual_turnover", "existing_debt", "loan_amount", "credit_score", "dti_ratio", "max_eligible")
+# Comparison operators and their NumPy ufuncs for the vectorized path
+RULE_OPERATORS = {">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal, "==": np.equal, "!=": np.not_equal}
+
+ELIGIBILITY_FIELDS = ("annual_turnover", "existing_debt", "loan_amount", "credit_score_numeric")
+ELIGIBILITY_RESULT_FIELDS = (
+    "decision", "reason", "approved_amount", "max_eligible", "risk_rating",
+    "approval_probability", "dti_ratio", "credit_score",
+)
+NUMERIC_TYPES = {int, float, bool}
+
+class RulesError(ValueError):
+    """Raised when a decision table is malformed"""
+
+def _rule_number(value, where: str) -> float:
+    if type(value) not in (int, float):
+        raise RulesError(f"{where}: expected a number, got {value!r}")
+    return float(value)
+
+class EligibilityPolicy:
+    """
+    One compiled decision table.
+    Risk tiers are checked best first; decisions are checked in order and the
+    first matching rule wins, so the table must end with an unconditional rule.
+    """
+
+    def __init__(self, table: dict, version: str, name: str = "default"):
+        self.version = version
+        self.name = name
+        self.max_eligible_ratio = _rule_number(table.get("max_eligible_turnover_ratio"), "max_eligible_turnover_ratio")
+        self.default_credit_score = table.get("default_credit_score", 750)
+        _rule_number(self.default_credit_score, "default_credit_score")
+
+        # Tiers: (min score or None for the catch-all, rating, probability)
+        self.tiers = []
+        for i, tier in enumerate(table.get("risk_tiers") or []):
+            floor = tier.get("min_credit_score")
+            self.tiers.append((
+                None if floor is None else _rule_number(floor, f"risk_tiers[{i}].min_credit_score"),
+                str(tier["risk_rating"]),
+                _rule_number(tier["approval_probability"], f"risk_tiers[{i}].approval_probability"),
+            ))
+        if not self.tiers or self.tiers[-1][0] is not None or any(t[0] is None for t in self.tiers[:-1]):
+            raise RulesError("risk_tiers must end with exactly one tier without min_credit_score")
+
+        # Decisions: (conditions, decision, reason template); conditions are (variable, op, operand)
+        self.rules = []
+        for i, rule in enumerate(table.get("decisions") or []):
+            conditions = []
+            for variable, checks in (rule.get("when") or {}).items():
+                if variable not in RULE_VARIABLES:
+                    raise RulesError(f"decisions[{i}]: unknown variable {variable!r}")
+                for op, operand in checks.items():
+                    if op not in RULE_OPERATORS:
+                        raise RulesError(f"decisions[{i}]: unknown operator {op!r}")
+                    if isinstance(operand, str):
+                        if operand not in RULE_VARIABLES:
+                            raise RulesError(f"decisions[{i}]: unknown variable {operand!r}")
+                    else:
+                        operand = _rule_number(operand, f"decisions[{i}].when.{variable}")
+                    conditions.append((variable, op, operand))
+            reason = str(rule.get("reason", ""))
+            try:
+                reason.format(**{v: 0.0 for v in RULE_VARIABLES})
+            except (KeyError, ValueError, IndexError) as e:
+                raise RulesError(f"decisions[{i}]: bad reason template: {e}")
+            self.rules.append((conditions, str(rule["decision"]), reason))
+        if not self.rules or self.rules[-1][0] or any(not r[0] for r in self.rules[:-1]):
+            raise RulesError("decisions must end with exactly one rule without conditions")
+
+        self.reason_needs_format = [("{" in reason) for _, _, reason in self.rules]
+        self._classify = self._compile_scalar()
+
+    def _compile_scalar(self):
+        """Generate `classify(...) -> (tier index, rule index)` as straight-line comparisons"""
+        def operand_src(operand):
+            return operand if isinstance(operand, str) else repr(operand)
+
+        lines = [f"def classify({', '.join(RULE_VARIABLES)}):"]
+        lines.append("    tier = %d" % (len(self.tiers) - 1))
+        for index, (floor, _, _) in enumerate(self.tiers[:-1]):
+            keyword = "if" if index == 0 else "elif"
+            lines.append(f"    {keyword} credit_score >= {floor!r}:")
+            lines.append(f"        tier = {index}")
+        for index, (conditions, _, _) in enumerate(self.rules[:-1]):
+            test = " and ".join(
+                f"{variable} {op} {operand_src(operand)}"
+                for variable, op, operand in conditions
+            )
+            lines.append(f"    if {test}:")
+            lines.append(f"        return tier, {index}")
+        lines.append(f"    return tier, {len(self.rules) - 1}")
+
+        namespace = {}
+        exec(compile("\n".join(lines), f"<eligibility rules {self.version}/{self.name}>", "exec"), namespace)
+        return namespace["classify"]
+
+    def _reason(self, index: int, env: dict) -> str:
+        reason = self.rules[index][2]
+        return reason.format(**env) if self.reason_needs_format[index] else reason
+
+    def evaluate(self, business_data: dict, assessed_at: Optional[str] = None) -> dict:
+        """Eligibility decision for one business"""
+        annual_turnover = business_data.get("annual_turnover", 0)
+        existing_debt = business_data.get("existing_debt", 0)
+        requested_amount = business_data.get("loan_amount", 0)
+        credit_score = business_data.get("credit_score_numeric", self.default_credit_score)
+
+        # DTI and eligibility calculations
+        dti_ratio = existing_debt / annual_turnover if annual_turnover > 0 else 1.0
+        max_eligible = annual_turnover * self.max_eligible_ratio
+
+        tier, rule = self._classify(
+            annual_turnover, existing_debt, requested_amount, credit_score, dti_ratio, max_eligible
+        )
+        _, risk_rating, approval_probability = self.tiers[tier]
+        decision = self.rules[rule][1]
+        reason = self._reason(rule, {
+            "annual_turnover": annual_turnover, "existing_debt": existing_debt,
+            "loan_amount": requested_amount, "credit_score": credit_score,
+            "dti_ratio": dti_ratio, "max_eligible": max_eligible,
+        })
+
+        return {
+            "decision": decision,
+            "reason": reason,
+            "approved_amount": min(requested_amount, max_eligible) if decision != "DECLINED" else 0,
+            "max_eligible": max_eligible,
+            "risk_rating": risk_rating,
+            "approval_probability": approval_probability,
+            "dti_ratio": round(dti_ratio, 3),
+            "credit_score": credit_score,
+            "rules_version": self.version,
+            "assessed_at": assessed_at or datetime.now().isoformat()
+        }
+
+    def evaluate_columns(self, columns: list) -> dict:
+        """Vectorized evaluate: input columns (original Python values) -> result columns"""
+        requested_values, score_values = columns[2], columns[3]
+        turnover, debt, requested, score = (np.array(c, dtype=np.float64) for c in columns)
+
+        dti = np.divide(debt, turnover, out=np.ones_like(turnover), where=turnover > 0)
+        max_eligible = turnover * self.max_eligible_ratio
+        env = {
+            "annual_turnover": turnover, "existing_debt": debt, "loan_amount": requested,
+            "credit_score": score, "dti_ratio": dti, "max_eligible": max_eligible,
+        }
+
+        tier = np.select(
+            [score >= floor for floor, _, _ in self.tiers[:-1]],
+            list(range(len(self.tiers) - 1)),
+            default=len(self.tiers) - 1,
+        )
+        masks = []
+        for conditions, _, _ in self.rules[:-1]:
+            mask = np.ones(len(turnover), dtype=bool)
+            for variable, op, operand in conditions:
+                right = env[operand] if isinstance(operand, str) else operand
+                mask &= RULE_OPERATORS[op](env[variable], right)
+            masks.append(mask)
+        rule = np.select(masks, list(range(len(self.rules) - 1)), default=len(self.rules) - 1)
+
+        max_values = max_eligible.tolist()
+        decisions = np.array([r[1] for r in self.rules], dtype=object)[rule].tolist()
+        reasons = np.array([r[2] for r in self.rules], dtype=object)[rule].tolist()
+        # min(requested, max_eligible) keeps the requested value (and its type) unless it is capped
+        approved = list(requested_values)
+        capped = np.flatnonzero(requested > max_eligible).tolist()
+        for i in capped:
+            approved[i] = max_values[i]
+        for index, needs_format in enumerate(self.reason_needs_format):
+            if not needs_format:
+                continue
+            for i in np.flatnonzero(rule == index).tolist():
+                reasons[i] = self._reason(index, {
+                    "annual_turnover": columns[0][i], "existing_debt": columns[1][i],
+                    "loan_amount": requested_values[i], "credit_score": score_values[i],
+                    "dti_ratio": dti[i].item(), "max_eligible": max_values[i],
+                })
+        for i, decision in enumerate(decisions):
+            if decision == "DECLINED":
+                approved[i] = 0
+
+        tier_labels = np.array([t[1] for t in self.tiers], dtype=object)
+        tier_probabilities = np.array([t[2] for t in self.tiers], dtype=object)
+        return {
+            "decision": decisions,
+            "reason": reasons,
+            "approved_amount": approved,
+            "max_eligible": max_values,
+            "risk_rating": tier_labels[tier].tolist(),
+            "approval_probability": tier_probabilities[tier].tolist(),
+            # Python's round (not np.round) so results match evaluate() exactly
+            "dti_ratio": [round(x, 3) for x in dti.tolist()],
+            "credit_score": list(score_values),
+        }
+
+class EligibilityRules:
+    """A loaded decision-table document: the default policy plus per-lender overrides"""
+
+    def __init__(self, document: dict, source: str):
+        if not isinstance(document, dict) or not document.get("version"):
+            raise RulesError("decision table must be an object with a version")
+        self.version = str(document["version"])
+        self.source = source
+        self.document = document
+        self.loaded_at = datetime.now()
+        base = {k: v for k, v in document.items() if k not in ("version", "lenders")}
+        self.default = EligibilityPolicy(base, self.version)
+        # Lender entries override top-level keys wholesale (e.g. a lender's own risk_tiers)
+        self.lenders = {
+            name: EligibilityPolicy({**base, **overrides}, self.version, name)
+            for name, overrides in (document.get("lenders") or {}).items()
+        }
+
+    def policy(self, lender: Optional[str] = None) -> EligibilityPolicy:
+        return self.lenders.get(lender, self.default) if lender else self.default
+
+def load_eligibility_rules(path: str) -> EligibilityRules:
+    """Read and compile a JSON or YAML decision table"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if path.endswith((".yaml", ".yml")):
+        import yaml  # optional, only needed for YAML tables
+        document = yaml.safe_load(raw)
+    else:
+        document = loads_json(raw)
+    return EligibilityRules(document, path)
+
+class EligibilityRulesStore:
+    """Holds the active EligibilityRules and swaps in a new version when the file changes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.current = load_eligibility_rules(path)
+        self._mtime = os.path.getmtime(path)
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def reload(self, force: bool = False) -> bool:
+        """Recompile the table if it changed; a bad table is reported and the old one kept"""
+        try:
+            mtime = os.path.getmtime(self.path)
+            if not force and mtime == self._mtime:
+                return False
+            rules = load_eligibility_rules(self.path)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Eligibility rules reload failed, keeping {self.current.version}: {self.last_error}", file=sys.stderr)
+            return False
+        # Single reference swap: requests already running keep the version they started with
+        self.current = rules
+        self._mtime = mtime
+        self.reloads += 1
+        self.last_error = None
+        return True
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(ELIGIBILITY_RULES_POLL_INTERVAL)
+            self.reload()
+
+    def start(self):
+        if self._task is None and ELIGIBILITY_RULES_POLL_INTERVAL > 0:
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "version": self.current.version,
+            "source": self.current.source,
+            "loaded_at": self.current.loaded_at.isoformat(),
+            "lenders": sorted(self.current.lenders),
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+        }
+
+eligibility_rules = EligibilityRulesStore(ELIGIBILITY_RULES_PATH)
+
+def assess_eligibility(business_data: dict, assessed_at: Optional[str] = None, lender: Optional[str] = None) -> dict:
+    """Eligibility decision for one business under the current (optionally lender-specific) policy"""
+    return eligibility_rules.current.policy(lender).evaluate(business_data, assessed_at)
+
+def _eligibility_inputs(rows: list, default_credit_score):
+    """
+    Input columns (original Python values) plus per-row validation errors.
+    Type checks run as C-level passes; only a batch with bad rows takes the per-row path.
+    """
+    errors = {}
+    if set(map(type, rows)) != {dict} or not all(rows):
+        for i, row in enumerate(rows):
+            if not isinstance(row, dict) or not row:
+                errors[i] = "business_data must be a non-empty object"
+        rows = [row if i not in errors else {} for i, row in enumerate(rows)]
+
+    defaults = (0, 0, 0, default_credit_score)
+    columns = [[row.get(field, default) for row in rows] for field, default in zip(ELIGIBILITY_FIELDS, defaults)]
+    if not set().union(*(map(type, column) for column in columns)) <= NUMERIC_TYPES:
+        for i in range(len(rows)):
+            if i not in errors and not all(type(column[i]) in NUMERIC_TYPES for column in columns):
+                errors[i] = "annual_turnover, existing_debt, loan_amount and credit_score_numeric must be numbers"
+        for column in columns:
+            for i in errors:
+                column[i] = 0
+    return columns, errors
+
+def assess_eligibility_batch(rows: list, assessed_at: Optional[str] = None, lender: Optional[str] = None) -> list:
+    """
+    Vectorized assess_eligibility over many businesses; row i of the result equals
+    assess_eligibility(rows[i]), or is {"index": i, "error": ...} for invalid rows.
+    """
+    assessed_at = assessed_at or datetime.now().isoformat()
+    policy = eligibility_rules.current.policy(lender)
+    columns, errors = _eligibility_inputs(rows, policy.default_credit_score)
+    scored = policy.evaluate_columns(columns)
+
+    results = [
+        {
+            "decision": decision,
+            "reason": reason,
+            "approved_amount": approved_amount,
+            "max_eligible": max_eligible,
+            "risk_rating": risk_rating,
+            "approval_probability": approval_probability,
+            "dti_ratio": dti_ratio,
+            "credit_score": credit_score,
+            "rules_version": policy.version,
+            "assessed_at": assessed_at
+        }
+        for decision, reason, approved_amount, max_eligible, risk_rating, approval_probability, dti_ratio, credit_score
+        in zip(*(scored[field] for field in ELIGIBILITY_RESULT_FIELDS))
+    ]
+    for i, error in errors.items():
+        results[i] = {"index": i, "error": error}
+    return results
 
-# Database connection
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is required")
+def assess_eligibility_columns(data: dict, assessed_at: Optional[str] = None, lender: Optional[str] = None) -> dict:
+    """
+    Columnar variant for bulk callers: {"annual_turnover": [...], ...} in, one list per
+    result field out. Skips building a dict per row, which dominates the row-wise path.
+    """
+    policy = eligibility_rules.current.policy(lender)
+    n = max((len(v) for v in data.values() if isinstance(v, list)), default=0)
+    columns = []
+    for field, default in zip(ELIGIBILITY_FIELDS, (0, 0, 0, policy.default_credit_score)):
+        column = data.get(field)
+        if column is None:
+            column = [default] * n
+        if not isinstance(column, list) or len(column) != n:
+            raise ValueError(f"{field} must be a list of {n} numbers")
+        if not set(map(type, column)) <= NUMERIC_TYPES:
+            raise ValueError(f"{field} must contain only numbers")
+        columns.append(column)
 
-def get_db_connection():
-    """Get database connection"""
-    return psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+    result = policy.evaluate_columns(columns)
+    result["rules_version"] = policy.version
+    result["assessed_at"] = assessed_at or datetime.now().isoformat()
+    result["count"] = n
+    return result
 
 # ============================================================================
-# HEALTH CHECK
+# REST API ENDPOINTS WITH REAL CLAUDE
 # ============================================================================
+class LenderFilters(TypedDict, total=False):
+    min_amount: Annotated[float, Field(description="Requested loan amount in rupees; lenders whose minimum is above it are excluded")]
+    credit_score: Annotated[int, Field(description="Numeric credit score; lenders requiring more are excluded")]
+
+class BusinessData(TypedDict, total=False):
+    annual_turnover: Annotated[float, Field(description="Annual turnover in rupees")]
+    existing_debt: Annotated[float, Field(description="Outstanding debt in rupees")]
+    loan_amount: Annotated[float, Field(description="Requested loan amount in rupees")]
+    credit_score_numeric: Annotated[int, Field(description="Numeric credit score (defaults to the policy's default)")]
+
+class GSTReport(TypedDict, total=False):
+    business_name: str
+    gst_number: str
+    pan_number: str
+    annual_turnover: float
+    filing_compliance: float
+    credit_score: Annotated[str, Field(description="CMR rank, e.g. CMR-2")]
+    existing_loans: float
+    constitution: str
+    address: str
+
+class ServiceError(Exception):
+    """A failure the REST layer returns as {"error": message, **details} with status_code"""
+
+    def __init__(self, message: str, status_code: int = 500, **details):
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details
+
+    def response(self) -> JSONResponse:
+        return JSONResponse({"error": str(self), **self.details}, status_code=self.status_code)
 
 @mcp.tool()
-async def health_check() -> dict:
-    """Check server health and dependencies"""
+async def explain_decision(
+    assessment: Annotated[dict, Field(description="Eligibility assessment, as returned by calculate_eligibility")],
+    recommendation: Annotated[dict, Field(description="Recommended lender, as returned by get_lender_database")],
+) -> dict:
+    """Customer-facing explanation of an eligibility decision and lender recommendation"""
+    # Call Claude API for explanation; degrade to a templated one if unavailable
     try:
-        conn = get_db_connection()
-        conn.close()
-        db_status = "connected"
+        response = await call_claude(
+            "explain-decision",
+            model=CLAUDE_MODEL,
+            max_tokens=1000,
+            system=cached_system_prompt(EXPLAIN_DECISION_SYSTEM_PROMPT),
+            messages=[{
+                "role": "user",
+                "content": f"""Assessment: {dumps_json(assessment).decode()}
+Recommendation: {dumps_json(recommendation).decode()}"""
+            }]
+        )
     except Exception as e:
-        db_status = f"error: {str(e)}"
+        if not is_upstream_failure(e):
+            raise
+        return {
+            "explanation": template_explanation(assessment, recommendation),
+            "generated_at": datetime.now().isoformat(),
+            "degraded": True,
+            "degraded_reason": type(e).__name__
+        }
     
     return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "database": db_status,
-        "anthropic_key": "configured" if ANTHROPIC_API_KEY else "missing",
-        "version": "production-claude-api"
+        "explanation": response.content[0].text,
+        "generated_at": datetime.now().isoformat(),
+        "usage": usage_dict(response)
     }
 
-# ============================================================================
-# REST API ENDPOINTS WITH REAL CLAUDE
-# ============================================================================
 async def api_explain_decision(request: Request):
     """REST endpoint for explain_decision"""
     try:
@@ -65,33 +3006,89 @@ async def api_explain_decision(request: Request):
         assessment = body.get("assessment", {})
         recommendation = body.get("recommendation", {})
         
-        # Call Claude API for explanation
-        response = anthropic_client.messages.create(
-            model="claude-sonnet-4-20250514",
+        result = await explain_decision(assessment, recommendation)
+        
+        return JSONResponse(result)
+        
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@mcp.tool()
+async def extract_intent(message: Annotated[str, Field(description="Customer's free-text loan request")]) -> dict:
+    """
+    Loan intent from a customer message: intent cache, then the rule-based
+    extractor, then Claude (falling back to the rules if Claude is unavailable)
+    """
+    cache_key = intent_cache_key(message)
+    cached = intent_cache.get(cache_key)
+    if cached is not None:
+        return {
+            "extracted": True,
+            "intent": dict(cached),
+            "original_message": message,
+            "extracted_at": datetime.now().isoformat(),
+            "extraction_method": "cache"
+        }
+    
+    rules = extract_intent_rules(message)
+    if rules["confidence"] >= INTENT_RULES_CONFIDENCE_THRESHOLD:
+        return {
+            "extracted": True,
+            "intent": rules["intent"],
+            "original_message": message,
+            "extracted_at": datetime.now().isoformat(),
+            "extraction_method": "rules",
+            "confidence": rules["confidence"]
+        }
+    
+    # Call Claude API for intent extraction; degrade to the rule-based result if unavailable
+    try:
+        response = await call_claude(
+            "extract-intent",
+            model=CLAUDE_MODEL,
             max_tokens=1000,
+            system=cached_system_prompt(EXTRACT_INTENT_SYSTEM_PROMPT),
+            tools=[EXTRACT_INTENT_TOOL],
+            tool_choice={"type": "tool", "name": EXTRACT_INTENT_TOOL["name"]},
             messages=[{
                 "role": "user",
-                "content": f"""Generate a personalized loan approval explanation.
-
-Assessment: {json.dumps(assessment)}
-Recommendation: {json.dumps(recommendation)}
-
-Create a friendly, clear explanation covering:
-- Approval decision and amount
-- Why this lender was recommended
-- Next steps
-
-Keep it concise and customer-friendly."""
+                "content": f'Customer message: "{message}"'
             }]
         )
-        
-        return JSONResponse({
-            "explanation": response.content[0].text,
-            "generated_at": datetime.now().isoformat()
-        })
-        
     except Exception as e:
-        return JSONResponse({"error": str(e)}, status_code=500)
+        if not is_upstream_failure(e):
+            raise
+        return {
+            "extracted": True,
+            "intent": rules["intent"],
+            "original_message": message,
+            "extracted_at": datetime.now().isoformat(),
+            "extraction_method": "rules-fallback",
+            "confidence": rules["confidence"],
+            "degraded": True,
+            "degraded_reason": type(e).__name__
+        }
+    
+    # The forced tool call guarantees a schema-shaped object, no text parsing needed
+    intent = tool_input(response, EXTRACT_INTENT_TOOL["name"])
+    if intent is None:
+        raise ServiceError("Claude did not return a loan intent", stop_reason=response.stop_reason)
+    
+    missing = [f for f in EXTRACT_INTENT_TOOL["input_schema"]["required"] if f not in intent]
+    if missing:
+        raise ServiceError(f"Missing required field: {missing[0]}", claude_response=intent)
+    
+    intent_cache.set(cache_key, dict(intent))
+    
+    return {
+        "extracted": True,
+        "intent": intent,
+        "original_message": message,
+        "extracted_at": datetime.now().isoformat(),
+        "extraction_method": "claude-api",
+        "usage": usage_dict(response)
+    }
+
 async def api_extract_intent(request: Request):
     """
     REST endpoint for extract_intent - PRODUCTION VERSION WITH REAL CLAUDE
@@ -104,65 +3101,12 @@ async def api_extract_intent(request: Request):
         if not message:
             return JSONResponse({"error": "message field is required"}, status_code=400)
         
-        # Call Claude API for intent extraction
-        response = anthropic_client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1000,
-            messages=[{
-                "role": "user",
-                "content": f"""Extract loan intent from this customer message: "{message}"
-
-Analyze the message and return JSON with these fields:
-- loan_amount: number in rupees (convert "5 lakhs" to 500000, "2 crores" to 20000000)
-- loan_purpose: string (brief description like "vehicle purchase", "business expansion", "inventory", "equipment", "working capital")
-- urgency: string (low/medium/high based on words like "urgent", "asap", "planning", "future")
-- has_collateral: boolean (true if customer mentions collateral/security/property, false otherwise)
-
-Return ONLY valid JSON with these 4 fields, no other text or markdown.
-
-Examples:
-"I need 5 lakhs for a car" -> {{"loan_amount": 500000, "loan_purpose": "vehicle purchase", "urgency": "medium", "has_collateral": false}}
-"Urgent! Need 2 crores for expanding to 3 new cities" -> {{"loan_amount": 20000000, "loan_purpose": "business expansion", "urgency": "high", "has_collateral": false}}"""
-            }]
-        )
-        
-        # Parse Claude's response
-        result_text = response.content[0].text.strip()
+        result = await extract_intent(message)
         
-        # Handle potential markdown code blocks
-        if result_text.startswith("```"):
-            # Remove markdown code blocks
-            result_text = result_text.replace("```json", "").replace("```", "").strip()
-        
-        # Parse JSON
-        try:
-            intent = json.loads(result_text)
-        except json.JSONDecodeError as e:
-            # Fallback: try to extract JSON from text
-            import re
-            json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
-            if json_match:
-                intent = json.loads(json_match.group())
-            else:
-                raise ValueError(f"Claude response is not valid JSON: {result_text[:200]}")
-        
-        # Validate required fields
-        required_fields = ["loan_amount", "loan_purpose", "urgency", "has_collateral"]
-        for field in required_fields:
-            if field not in intent:
-                return JSONResponse(
-                    {"error": f"Missing required field: {field}", "claude_response": result_text}, 
-                    status_code=500
-                )
-        
-        return JSONResponse({
-            "extracted": True,
-            "intent": intent,
-            "original_message": message,
-            "extracted_at": datetime.now().isoformat(),
-            "extraction_method": "claude-api"
-        })
+        return JSONResponse(result)
         
+    except ServiceError as e:
+        return e.response()
     except json.JSONDecodeError as e:
         return JSONResponse({"error": f"Invalid JSON in request: {str(e)}"}, status_code=400)
     except Exception as e:
@@ -171,6 +3115,54 @@ Examples:
             status_code=500
         )
 
+def invalid_tax_id_result(field: str, value: str, error: str) -> dict:
+    """Verification result for an ID rejected by offline validation, without a provider call"""
+    return {
+        field: value,
+        "verified": False,
+        "error": error,
+        "invalid_format": True,
+        "verification_date": datetime.now().isoformat(),
+        "cached": False,
+        "cache_age_seconds": 0.0
+    }
+
+async def _verify_valid_id(kind: str, field: str, value: str) -> dict:
+    """Cached, rate-limited provider lookup of an already normalized and validated GSTIN or PAN"""
+    provider = get_verification_provider()
+    lookup = provider.verify_gst if kind == "gst" else provider.verify_pan
+
+    async def fetch():
+        await verification_rate_limiter.acquire()
+        return await lookup(value)
+
+    with tracer.start_as_current_span(f"verify.{kind}", attributes={"verification.provider": provider.name}) as span:
+        try:
+            result = await verification_cache.get(kind, value, fetch)
+        except VerificationUnavailable as e:
+            raise ServiceError(str(e), status_code=502, **{field: value})
+        span.set_attribute("verification.verified", bool(result.get("verified")))
+        span.set_attribute("verification.cached", result["cached"])
+        return result
+
+@mcp.tool()
+async def verify_gst(gst_number: Annotated[str, Field(description="15-character GSTIN")]) -> dict:
+    """Verify a GSTIN and return its registration details"""
+    gst_number = normalize_tax_id(gst_number)
+    invalid = validate_gstin(gst_number)
+    if invalid:
+        return invalid_tax_id_result("gst_number", gst_number, f"Invalid GSTIN: {invalid}")
+    return await _verify_valid_id("gst", "gst_number", gst_number)
+
+@mcp.tool()
+async def verify_pan(pan_number: Annotated[str, Field(description="10-character PAN")]) -> dict:
+    """Verify a PAN and return the holder's name and status"""
+    pan_number = normalize_tax_id(pan_number)
+    invalid = validate_pan(pan_number)
+    if invalid:
+        return invalid_tax_id_result("pan_number", pan_number, f"Invalid PAN: {invalid}")
+    return await _verify_valid_id("pan", "pan_number", pan_number)
+
 async def api_verify_gst(request: Request):
     """REST endpoint for verify_gst - Mock for MVP"""
     try:
@@ -180,34 +3172,12 @@ async def api_verify_gst(request: Request):
         if not gst_number:
             return JSONResponse({"error": "gst_number field is required"}, status_code=400)
         
-        # Mock GST data (from FameScore report)
-        if gst_number == "09AADCF8429L1Z4":
-            result = {
-                "gst_number": gst_number,
-                "business_name": "FINAGG TECHNOLOGIES PRIVATE LIMITED",
-                "trade_name": "FINAGG TECHNOLOGIES PRIVATE LIMITED",
-                "constitution": "Private Limited",
-                "address": "C 1,SECTOR 16,Noida,Uttar Pradesh-201301",
-                "date_of_registration": "2021-02-21",
-                "annual_turnover": 24148440.33,
-                "filing_compliance": 0.84,
-                "pan_number": "AADCF8429L",
-                "credit_score": "CMR-2",
-                "existing_loans": 2710443,
-                "verified": True,
-                "verification_date": datetime.now().isoformat(),
-                "verification_method": "mock-api"
-            }
-        else:
-            result = {
-                "gst_number": gst_number,
-                "verified": False,
-                "error": "GST number not found. Use 09AADCF8429L1Z4 for demo.",
-                "verification_date": datetime.now().isoformat()
-            }
+        result = await verify_gst(gst_number)
         
         return JSONResponse(result)
         
+    except ServiceError as e:
+        return e.response()
     except json.JSONDecodeError:
         return JSONResponse({"error": "Invalid JSON"}, status_code=400)
     except Exception as e:
@@ -222,30 +3192,175 @@ async def api_verify_pan(request: Request):
         if not pan_number:
             return JSONResponse({"error": "pan_number field is required"}, status_code=400)
         
-        # Mock PAN data
-        if pan_number == "AADCF8429L":
-            result = {
-                "pan_number": pan_number,
-                "name": "FINAGG TECHNOLOGIES PRIVATE LIMITED",
-                "verified": True,
-                "status": "Active",
-                "verification_date": datetime.now().isoformat()
-            }
-        else:
-            result = {
-                "pan_number": pan_number,
-                "verified": False,
-                "error": "PAN not found. Use AADCF8429L for demo.",
-                "verification_date": datetime.now().isoformat()
-            }
+        result = await verify_pan(pan_number)
         
         return JSONResponse(result)
         
+    except ServiceError as e:
+        return e.response()
     except json.JSONDecodeError:
         return JSONResponse({"error": "Invalid JSON"}, status_code=400)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
+def _field_or_value(item, field: str):
+    """A streamed line may be the bare value or an object holding it under `field`"""
+    return item.get(field) if isinstance(item, dict) else item
+
+async def _verify_gst_item(item) -> dict:
+    gst_number = _field_or_value(item, "gst_number")
+    if not gst_number or not isinstance(gst_number, str):
+        raise ValueError("gst_number field is required")
+    return await verify_gst(gst_number)
+
+async def _verify_pan_item(item) -> dict:
+    pan_number = _field_or_value(item, "pan_number")
+    if not pan_number or not isinstance(pan_number, str):
+        raise ValueError("pan_number field is required")
+    return await verify_pan(pan_number)
+
+async def api_verify_gst_stream(request: Request):
+    """Streaming verify_gst: NDJSON of GSTINs (or {"gst_number": ...}) in, NDJSON results out"""
+    return stream_ndjson(request, per_item(_verify_gst_item))
+
+async def api_verify_pan_stream(request: Request):
+    """Streaming verify_pan: NDJSON of PANs (or {"pan_number": ...}) in, NDJSON results out"""
+    return stream_ndjson(request, per_item(_verify_pan_item))
+
+# Concurrent provider lookups per bulk request; the rate limiter still caps calls per second
+VERIFICATION_BULK_CONCURRENCY = int(os.getenv("VERIFICATION_BULK_CONCURRENCY", 32))
+VERIFICATION_BULK_MAX_ITEMS = int(os.getenv("VERIFICATION_BULK_MAX_ITEMS", 100000))
+
+async def iter_gst_bulk_verification(gst_numbers: list, concurrency: int = VERIFICATION_BULK_CONCURRENCY):
+    """
+    Verify many GSTINs, yielding lists of results as they complete (cached and invalid
+    ones first) and finally {"summary": ...}. Inputs are normalized and deduplicated;
+    each result lists the input positions it answers and a progress counter.
+    """
+    started = time.perf_counter()
+    errors = validate_gstin_batch(gst_numbers)
+    positions = {}  # normalized GSTIN -> input indexes, in first-seen order
+    invalid = {}    # key -> (value as reported, reason)
+    for i, (value, error) in enumerate(zip(gst_numbers, errors)):
+        # Non-strings (numbers, null, objects) are never deduplicated, not even with their string form
+        key = normalize_tax_id(value) if isinstance(value, str) else i
+        positions.setdefault(key, []).append(i)
+        if error:
+            invalid[key] = (key if isinstance(value, str) else value, error)
+
+    total = len(positions)
+    counts = {"verified": 0, "not_found": 0, "invalid": 0, "failed": 0, "cached": 0}
+    completed = 0
+
+    def finish(gst_number: str, result: dict) -> dict:
+        nonlocal completed
+        completed += 1
+        if result.get("invalid_format"):
+            counts["invalid"] += 1
+        elif "verified" not in result:
+            counts["failed"] += 1
+        else:
+            counts["verified" if result["verified"] else "not_found"] += 1
+            counts["cached"] += bool(result.get("cached"))
+        return {**result, "input_indexes": positions[gst_number], "progress": {"completed": completed, "total": total}}
+
+    if invalid:
+        yield [
+            finish(key, invalid_tax_id_result("gst_number", value, f"Invalid GSTIN: {error}"))
+            for key, (value, error) in invalid.items()
+        ]
+
+    pending = asyncio.Queue()
+    for key in positions:
+        if key not in invalid:
+            pending.put_nowait(key)
+    done = asyncio.Queue()
+
+    async def worker():
+        while True:
+            try:
+                gst_number = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                result = await _verify_valid_id("gst", "gst_number", gst_number)
+            except Exception as e:
+                # Every GSTIN must reach `done`, or the consumer below waits forever
+                if not isinstance(e, ServiceError):
+                    print(f"Bulk GST verification failed for {gst_number}: {type(e).__name__}: {e}", file=sys.stderr)
+                result = {"gst_number": gst_number, "error": str(e)}
+            done.put_nowait((gst_number, result))
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(max(concurrency, 1), pending.qsize()))]
+    try:
+        remaining = total - len(invalid)
+        while remaining:
+            # Emit whatever has completed since the last write as one chunk
+            batch = [await done.get()]
+            while not done.empty():
+                batch.append(done.get_nowait())
+            remaining -= len(batch)
+            yield [finish(gst_number, result) for gst_number, result in batch]
+    finally:
+        for task in workers:
+            task.cancel()
+
+    yield [{"summary": {
+        "inputs": len(gst_numbers),
+        "unique": total,
+        "duplicates": len(gst_numbers) - total,
+        **counts,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }}]
+
+@mcp.tool()
+async def verify_gst_bulk(
+    gst_numbers: Annotated[List[str], Field(description="GSTINs to verify; duplicates are looked up once")],
+    ctx: Context,
+) -> dict:
+    """Verify many GSTINs at once, with progress notifications; results are in completion order"""
+    if len(gst_numbers) > VERIFICATION_BULK_MAX_ITEMS:
+        raise ValueError(f"At most {VERIFICATION_BULK_MAX_ITEMS} GSTINs per call")
+    results = []
+    summary = None
+    async for batch in iter_gst_bulk_verification(gst_numbers):
+        for row in batch:
+            if "summary" in row:
+                summary = row["summary"]
+            else:
+                results.append(row)
+        if results:
+            await ctx.report_progress(results[-1]["progress"]["completed"], results[-1]["progress"]["total"])
+    return {"results": results, "summary": summary}
+
+async def api_verify_gst_bulk(request: Request):
+    """
+    Bulk verify_gst for onboarding partner books: a JSON array / {"gst_numbers": [...]}
+    or NDJSON in, NDJSON out as lookups complete, ending with a {"summary": ...} line
+    """
+    try:
+        body = await request.body()
+        if is_ndjson(request):
+            rows = ndjson_rows(body)
+        else:
+            rows = json_rows(loads_json(body), "gst_numbers")
+        gst_numbers = [_field_or_value(row, "gst_number") for row in rows]
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid request: {str(e)}"}, status_code=400)
+    if len(gst_numbers) > VERIFICATION_BULK_MAX_ITEMS:
+        return JSONResponse({"error": f"At most {VERIFICATION_BULK_MAX_ITEMS} GSTINs per request"}, status_code=413)
+
+    async def generate():
+        async for batch in iter_gst_bulk_verification(gst_numbers):
+            yield b"".join(dumps_json(row) + b"\n" for row in batch)
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+@mcp.tool(name="parse_gst_report")
+async def parse_gst_report_tool(report: GSTReport) -> dict:
+    """Normalize a GST/credit report into the fields calculate_eligibility uses"""
+    return parse_gst_report(report)
+
 async def api_parse_gst_report(request: Request):
     """REST endpoint for parse_gst_report"""
     try:
@@ -255,28 +3370,7 @@ async def api_parse_gst_report(request: Request):
         if not report:
             return JSONResponse({"error": "report field is required"}, status_code=400)
         
-        # Credit score mapping
-        credit_score_map = {
-            "CMR-1": 850,
-            "CMR-2": 750,
-            "CMR-3": 650,
-            "CMR-4": 550,
-            "CMR-5": 450
-        }
-        
-        result = {
-            "business_name": report.get("business_name", ""),
-            "gst_number": report.get("gst_number", ""),
-            "pan_number": report.get("pan_number", ""),
-            "annual_turnover": report.get("annual_turnover", 0),
-            "filing_compliance": report.get("filing_compliance", 0),
-            "credit_score_text": report.get("credit_score", "CMR-2"),
-            "credit_score_numeric": credit_score_map.get(report.get("credit_score", "CMR-2"), 750),
-            "existing_debt": report.get("existing_loans", 0),
-            "constitution": report.get("constitution", ""),
-            "address": report.get("address", ""),
-            "parsed_at": datetime.now().isoformat()
-        }
+        result = parse_gst_report(report)
         
         return JSONResponse(result)
         
@@ -285,6 +3379,34 @@ async def api_parse_gst_report(request: Request):
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
+def _parse_gst_report_item(item) -> dict:
+    report = item.get("report", item) if isinstance(item, dict) else None
+    if not report or not isinstance(report, dict):
+        raise ValueError("report field is required")
+    return parse_gst_report(report)
+
+async def api_parse_gst_report_stream(request: Request):
+    """Streaming parse_gst_report: NDJSON of reports (or {"report": ...}) in, NDJSON results out"""
+    return stream_ndjson(request, per_item(_parse_gst_report_item))
+
+@mcp.tool()
+async def calculate_eligibility(
+    business_data: BusinessData,
+    lender: Annotated[Optional[str], Field(description="Lender whose eligibility policy applies; the default policy otherwise")] = None,
+) -> dict:
+    """Assess loan eligibility: decision, approved amount, risk rating and approval probability"""
+    return assess_eligibility(business_data, lender=lender)
+
+@mcp.tool()
+async def calculate_eligibility_bulk(
+    business_data: List[BusinessData],
+    lender: Annotated[Optional[str], Field(description="Lender whose eligibility policy applies; the default policy otherwise")] = None,
+) -> dict:
+    """Assess many businesses at once (vectorized); invalid rows come back as {"index", "error"}"""
+    results = await asyncio.to_thread(assess_eligibility_batch, business_data, None, lender)
+    errors = sum(1 for r in results if "error" in r)
+    return {"results": results, "count": len(results), "errors": errors}
+
 async def api_calculate_eligibility(request: Request):
     """REST endpoint for calculate_eligibility"""
     try:
@@ -294,54 +3416,7 @@ async def api_calculate_eligibility(request: Request):
         if not business_data:
             return JSONResponse({"error": "business_data field is required"}, status_code=400)
         
-        annual_turnover = business_data.get("annual_turnover", 0)
-        existing_debt = business_data.get("existing_debt", 0)
-        requested_amount = business_data.get("loan_amount", 0)
-        credit_score = business_data.get("credit_score_numeric", 750)
-        
-        # DTI and eligibility calculations
-        dti_ratio = existing_debt / annual_turnover if annual_turnover > 0 else 1.0
-        max_eligible = annual_turnover * 0.3
-        
-        # Risk assessment
-        if credit_score >= 750:
-            risk_rating = "LOW"
-            approval_probability = 0.90
-        elif credit_score >= 650:
-            risk_rating = "LOW-MEDIUM"
-            approval_probability = 0.75
-        elif credit_score >= 550:
-            risk_rating = "MEDIUM"
-            approval_probability = 0.60
-        else:
-            risk_rating = "HIGH"
-            approval_probability = 0.30
-        
-        # Decision logic
-        if dti_ratio > 0.4:
-            decision = "DECLINED"
-            reason = "Debt-to-income ratio too high"
-        elif requested_amount > max_eligible:
-            decision = "CONDITIONAL"
-            reason = f"Requested amount exceeds maximum eligible of ₹{max_eligible:,.0f}"
-        elif credit_score < 550:
-            decision = "DECLINED"
-            reason = "Credit score too low"
-        else:
-            decision = "APPROVED"
-            reason = "All eligibility criteria met"
-        
-        result = {
-            "decision": decision,
-            "reason": reason,
-            "approved_amount": min(requested_amount, max_eligible) if decision != "DECLINED" else 0,
-            "max_eligible": max_eligible,
-            "risk_rating": risk_rating,
-            "approval_probability": approval_probability,
-            "dti_ratio": round(dti_ratio, 3),
-            "credit_score": credit_score,
-            "assessed_at": datetime.now().isoformat()
-        }
+        result = await calculate_eligibility(business_data, lender=body.get("lender"))
         
         return JSONResponse(result)
         
@@ -350,43 +3425,257 @@ async def api_calculate_eligibility(request: Request):
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
+async def api_calculate_eligibility_bulk(request: Request):
+    """
+    Bulk calculate_eligibility for portfolio re-scoring.
+    Accepts a JSON array / {"business_data": [...]} or NDJSON, and answers in the same format;
+    {"columns": {"annual_turnover": [...], ...}} is scored and answered column-wise.
+    A lender-specific policy is selected with "lender" in the JSON body or ?lender=.
+    """
+    lender = request.query_params.get("lender")
+    try:
+        body = await request.body()
+        if is_ndjson(request):
+            rows = ndjson_rows(body)
+        else:
+            data = loads_json(body)
+            if isinstance(data, dict):
+                lender = data.get("lender", lender)
+            if isinstance(data, dict) and isinstance(data.get("columns"), dict):
+                result = await asyncio.to_thread(assess_eligibility_columns, data["columns"], None, lender)
+                return JSONResponse(result)
+            rows = json_rows(data, "business_data")
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid request: {str(e)}"}, status_code=400)
+
+    try:
+        result = await calculate_eligibility_bulk(rows, lender)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+    if is_ndjson(request):
+        return NDJSONResponse(result["results"])
+    return JSONResponse(result)
+
+def _eligibility_stream_batch(lender: Optional[str] = None):
+    async def process(items: list) -> list:
+        rows = [item.get("business_data", item) if isinstance(item, dict) else item for item in items]
+        results = assess_eligibility_batch(rows, lender=lender)
+        return [ValueError(r["error"]) if "error" in r else r for r in results]
+    return process
+
+async def api_calculate_eligibility_stream(request: Request):
+    """Streaming calculate_eligibility: NDJSON of business_data in, NDJSON results out, scored in vectorized batches"""
+    return stream_ndjson(
+        request, _eligibility_stream_batch(request.query_params.get("lender")), batch_size=NDJSON_STREAM_BATCH_SIZE
+    )
+
+async def api_eligibility_rules(request: Request):
+    """Active eligibility decision table and its version"""
+    rules = eligibility_rules.current
+    return JSONResponse({**eligibility_rules.stats(), "rules": rules.document})
+
+async def api_reload_eligibility_rules(request: Request):
+    """Recompile the decision table from disk now instead of waiting for the next poll"""
+    reloaded = eligibility_rules.reload(force=True)
+    status_code = 200 if reloaded else 422
+    return JSONResponse({"reloaded": reloaded, **eligibility_rules.stats()}, status_code=status_code)
+
+@mcp.tool()
+async def get_lender_database(filters: Optional[LenderFilters] = None) -> dict:
+    """Active lenders matching the filters (at most 3, one product per lender)"""
+    lenders = await fetch_lenders(filters)
+    return {"lenders": lenders}
+
 async def api_get_lenders(request: Request):
     """REST endpoint for get_lender_database"""
     try:
         body = await request.json()
         filters = body.get("filters", None)
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT DISTINCT ON (name) 
-                id, name, product_name, interest_rate_min, interest_rate_max,
-                commission_structure, approval_rate_avg, active
-            FROM lenders
-            WHERE active = true
-        """
+        result = await get_lender_database(filters)
         
-        params = []
-        
-        if filters:
-            if filters.get("min_amount"):
-                query += " AND loan_amount_min <= %s"
-                params.append(filters["min_amount"])
-            
-            if filters.get("credit_score"):
-                query += " AND min_credit_score <= %s"
-                params.append(filters["credit_score"])
+        return JSONResponse(result)
         
-        query += " ORDER BY name, id LIMIT 3"
+    except json.JSONDecodeError:
+        return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+# ============================================================================
+# APPLICATION PIPELINE
+# ============================================================================
+# One request runs the whole origination flow in-process. Stages form a
+# dependency graph and each starts as soon as its inputs are ready, so intent
+# extraction, GST and PAN verification and the lender catalog load overlap and
+# end-to-end latency is roughly the slowest Claude call plus the explanation.
+
+class StageSkipped(Exception):
+    """Raised by a stage that cannot run because an upstream result rules it out"""
+
+async def run_stage_graph(stages: dict) -> tuple:
+    """
+    Run {name: (dependencies, async fn(results)[, optional_dependencies])} concurrently
+    in dependency order. Returns (results, timings); a stage whose dependency failed or
+    was skipped is skipped. An optional dependency is waited for but never blocks the
+    stage; its result is in `results` only if it completed, and the stage decides what
+    a missing one means.
+    """
+    results = {}
+    timings = {}
+    tasks = {}
+    origin = time.perf_counter()
+
+    async def run(name: str):
+        dependencies, fn, *optional = stages[name]
+        optional = optional[0] if optional else ()
+        outcomes = await asyncio.gather(*(tasks[d] for d in dependencies))
+        await asyncio.gather(*(tasks[d] for d in optional))
+        blocked = [d for d, status in zip(dependencies, outcomes) if status != "ok"]
+        started = time.perf_counter()
+        timing = {"started_ms": round((started - origin) * 1000, 2)}
+        timings[name] = timing
+        if blocked:
+            timing.update(status="skipped", reason=f"{', '.join(blocked)} did not complete")
+            return "skipped"
+        try:
+            with tracer.start_as_current_span(f"stage {name}"):
+                results[name] = await fn(results)
+            timing["status"] = "ok"
+        except StageSkipped as e:
+            timing.update(status="skipped", reason=str(e))
+        except Exception as e:
+            timing.update(status="error", error=f"{type(e).__name__}: {e}")
+        timing["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return timing["status"]
+
+    # Tasks are created before any runs, so every dependency lookup finds its task
+    for name in stages:
+        tasks[name] = asyncio.ensure_future(run(name))
+    await asyncio.gather(*tasks.values())
+    return results, timings
+
+@mcp.tool()
+async def process_application(
+    message: str,
+    gst_number: str,
+    pan_number: Optional[str] = None,
+    loan_amount: Optional[float] = None,
+    lender: Optional[str] = None,
+) -> dict:
+    """
+    Run the full loan origination flow for one application: extract intent, verify
+    GST and PAN, parse the GST report, assess eligibility, match lenders and explain
+    the decision. pan_number defaults to the PAN on the GST registration (without
+    either, eligibility is assessed on the GST data alone) and loan_amount to the
+    amount in the message; lender selects a lender-specific eligibility policy.
+    """
+    started = time.perf_counter()
+
+    async def intent_stage(results):
+        return await extract_intent(message)
+
+    async def gst_stage(results):
+        return await verify_gst(gst_number)
+
+    async def pan_stage(results):
+        # Given a PAN this runs alongside GST verification; otherwise it waits for the registration
+        pan = pan_number or (results.get("gst") or {}).get("pan_number")
+        if not pan:
+            raise StageSkipped("no pan_number given or found on the GST registration")
+        return await verify_pan(pan)
+
+    async def catalog_stage(results):
+        # Prefetch: the snapshot load overlaps the Claude call; filtering it later is in-memory
+        return await lender_catalog.get() if LENDER_CATALOG_ENABLED else None
+
+    async def report_stage(results):
+        gst = results["gst"]
+        if not gst.get("verified"):
+            raise StageSkipped(gst.get("error") or "GST number not verified")
+        return parse_gst_report(gst)
+
+    async def eligibility_stage(results):
+        # A PAN is checked when there is one; without any, eligibility runs on the GST data alone
+        if pan_number or results["gst"].get("pan_number"):
+            pan = results.get("pan")
+            if pan is None:
+                raise StageSkipped("PAN verification did not complete")
+            if not pan.get("verified"):
+                raise StageSkipped(pan.get("error") or "PAN not verified")
+        amount = loan_amount if loan_amount is not None else results["intent"]["intent"].get("loan_amount")
+        business_data = dict(results["report"], loan_amount=amount or 0)
+        return assess_eligibility(business_data, lender=lender)
+
+    async def lenders_stage(results):
+        filters = {
+            "min_amount": results["eligibility"]["approved_amount"] or None,
+            "credit_score": results["report"]["credit_score_numeric"],
+        }
+        snapshot = results.get("lender_catalog")
+        return snapshot.query(filters) if snapshot is not None else await query_lenders(filters)
+
+    async def explanation_stage(results):
+        lenders = results.get("lenders") or []
+        return await explain_decision(results["eligibility"], lenders[0] if lenders else {})
+
+    pan_dependencies = () if pan_number else ("gst",)
+    # Intent only supplies the amount; given one, a failed Claude call must not block scoring
+    if loan_amount is None:
+        eligibility_stage_spec = (("intent", "report"), eligibility_stage, ("pan",))
+    else:
+        eligibility_stage_spec = (("report",), eligibility_stage, ("pan", "intent"))
+    stages = {
+        "intent": ((), intent_stage),
+        "gst": ((), gst_stage),
+        "pan": (pan_dependencies, pan_stage),
+        "lender_catalog": ((), catalog_stage),
+        "report": (("gst",), report_stage),
+        "eligibility": eligibility_stage_spec,
+        "lenders": (("eligibility", "lender_catalog"), lenders_stage),
+        # Without matched lenders (none, or the lookup failed) the decision is still explained
+        "explanation": (("eligibility",), explanation_stage, ("lenders",)),
+    }
+    if not LENDER_CATALOG_ENABLED:
+        # Nothing to prefetch: lenders_stage queries the database once the filters are known
+        del stages["lender_catalog"]
+        stages["lenders"] = (("eligibility",), lenders_stage)
+
+    results, timings = await run_stage_graph(stages)
+
+    return {
+        "status": "completed" if all(t["status"] == "ok" for t in timings.values()) else "incomplete",
+        "intent": results.get("intent"),
+        "gst_verification": results.get("gst"),
+        "pan_verification": results.get("pan"),
+        "business_data": results.get("report"),
+        "eligibility": results.get("eligibility"),
+        "lenders": results.get("lenders"),
+        "explanation": results.get("explanation"),
+        "timings": timings,
+        "total_ms": round((time.perf_counter() - started) * 1000, 2),
+        "processed_at": datetime.now().isoformat()
+    }
+
+async def api_process_application(request: Request):
+    """REST endpoint for process_application"""
+    try:
+        body = await request.json()
+        message = body.get("message", "")
+        gst_number = body.get("gst_number", "")
         
-        cursor.execute(query, params)
-        lenders = cursor.fetchall()
+        if not message or not gst_number:
+            return JSONResponse({"error": "message and gst_number fields are required"}, status_code=400)
         
-        cursor.close()
-        conn.close()
+        result = await process_application(
+            message,
+            gst_number,
+            pan_number=body.get("pan_number"),
+            loan_amount=body.get("loan_amount"),
+            lender=body.get("lender"),
+        )
         
-        return JSONResponse({"lenders": [dict(l) for l in lenders]})
+        return JSONResponse(result)
         
     except json.JSONDecodeError:
         return JSONResponse({"error": "Invalid JSON"}, status_code=400)
@@ -397,11 +3686,17 @@ async def api_get_lenders(request: Request):
 # MAIN APPLICATION - STARLETTE ROUTE REGISTRATION
 # ============================================================================
 
-import sys
 import uvicorn
 from starlette.applications import Starlette
+from starlette.middleware import Middleware
 from starlette.routing import Route
 
+# MCP over streamable HTTP (or legacy SSE) is served by the same app as the REST API.
+# Stateless by default: with several workers, a session's requests may land on any of them.
+MCP_HTTP_PATH = os.getenv("MCP_HTTP_PATH", "/mcp")
+MCP_HTTP_TRANSPORT = os.getenv("MCP_HTTP_TRANSPORT", "http")
+MCP_STATELESS_HTTP = os.getenv("MCP_STATELESS_HTTP", "true").lower() == "true"
+
 async def root_endpoint(request: Request):
     """Root endpoint - service info"""
     return JSONResponse({
@@ -410,12 +3705,19 @@ async def root_endpoint(request: Request):
         "status": "running",
         "endpoints": {
             "health": "/health",
+            "metrics": "/metrics",
             "extract_intent": "/api/extract-intent (POST)",
             "verify_gst": "/api/verify-gst (POST)",
             "verify_pan": "/api/verify-pan (POST)",
             "parse_gst_report": "/api/parse-gst-report (POST)",
             "calculate_eligibility": "/api/calculate-eligibility (POST)",
-            "get_lenders": "/api/get-lenders (POST)"
+            "calculate_eligibility_bulk": "/api/calculate-eligibility/bulk (POST, JSON array or NDJSON)",
+            "eligibility_rules": "/api/eligibility-rules (GET), /api/eligibility-rules/reload (POST)",
+            "streaming": "/api/{calculate-eligibility,parse-gst-report,verify-gst,verify-pan}/stream (POST, NDJSON)",
+            "verify_gst_bulk": "/api/verify-gst/bulk (POST, JSON array or NDJSON in, NDJSON out)",
+            "get_lenders": "/api/get-lenders (POST)",
+            "process_application": "/api/process-application (POST)",
+            "mcp": f"{MCP_HTTP_PATH} (MCP {MCP_HTTP_TRANSPORT} transport)"
         }
     })
 
@@ -424,31 +3726,103 @@ async def health_endpoint(request: Request):
     result = await health_check()
     return JSONResponse(result)
 
+def mcp_routes(mcp_app: Starlette) -> list:
+    """
+    Routes for exactly the MCP transport's paths, each handing the request to the MCP
+    app unchanged; anything else keeps Starlette's 404/405 and its own metrics label
+    """
+    return [
+        Route(route.path if isinstance(route, Route) else route.path.rstrip("/") + "/{path:path}", endpoint=mcp_app)
+        for route in mcp_app.routes
+    ]
+
+def create_app() -> Starlette:
+    """Build the ASGI app with all REST API routes and the MCP HTTP transport"""
+    mcp_app = mcp.http_app(
+        path=MCP_HTTP_PATH,
+        transport=MCP_HTTP_TRANSPORT,
+        stateless_http=MCP_STATELESS_HTTP if MCP_HTTP_TRANSPORT != "sse" else None,
+    )
+
+    @asynccontextmanager
+    async def lifespan(app):
+        """Tracing and metrics around the MCP app's lifespan, which runs service_lifespan"""
+        configure_tracing()
+        # The MCP session manager needs its own task group for the life of the app
+        async with mcp_app.lifespan(mcp_app):
+            yield
+        if PROMETHEUS_MULTIPROC_DIR:
+            multiprocess.mark_process_dead(os.getpid())
+        shutdown_tracing()
+
+    routes = [
+        Route("/api/explain-decision", api_explain_decision, methods=["POST"]),
+        Route("/", root_endpoint),
+        Route("/health", health_endpoint),
+        Route("/metrics", metrics_endpoint),
+        Route("/api/extract-intent", api_extract_intent, methods=["POST"]),
+        Route("/api/verify-gst", api_verify_gst, methods=["POST"]),
+        Route("/api/verify-pan", api_verify_pan, methods=["POST"]),
+        Route("/api/parse-gst-report", api_parse_gst_report, methods=["POST"]),
+        Route("/api/calculate-eligibility", api_calculate_eligibility, methods=["POST"]),
+        Route("/api/calculate-eligibility/bulk", api_calculate_eligibility_bulk, methods=["POST"]),
+        Route("/api/calculate-eligibility/stream", api_calculate_eligibility_stream, methods=["POST"]),
+        Route("/api/eligibility-rules", api_eligibility_rules, methods=["GET"]),
+        Route("/api/eligibility-rules/reload", api_reload_eligibility_rules, methods=["POST"]),
+        Route("/api/parse-gst-report/stream", api_parse_gst_report_stream, methods=["POST"]),
+        Route("/api/verify-gst/stream", api_verify_gst_stream, methods=["POST"]),
+        Route("/api/verify-gst/bulk", api_verify_gst_bulk, methods=["POST"]),
+        Route("/api/verify-pan/stream", api_verify_pan_stream, methods=["POST"]),
+        Route("/api/get-lenders", api_get_lenders, methods=["POST"]),
+        Route("/api/process-application", api_process_application, methods=["POST"]),
+        *mcp_routes(mcp_app),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan, middleware=[Middleware(MetricsMiddleware), Middleware(TracingMiddleware)])
+
+# Module-level app for `uvicorn server:app` and multi-worker process managers
+app = create_app()
+
+def run_http_server(port: int):
+    """
+    Production runtime profile: WEB_CONCURRENCY uvicorn worker processes (default 2,
+    not the core count, which in a container is the host's), uvloop/httptools when
+    installed. Pools and caches are per worker: each holds up to DB_POOL_MAX_SIZE
+    connections plus one LISTEN connection for the lender catalog, so keep
+    WEB_CONCURRENCY * (DB_POOL_MAX_SIZE + 1) under the database's connection limit.
+    """
+    workers = int(os.getenv("WEB_CONCURRENCY", 2))
+    if PROMETHEUS_MULTIPROC_DIR:
+        # Metric files from a previous run would be summed into this one's
+        os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+        for name in os.listdir(PROMETHEUS_MULTIPROC_DIR):
+            if name.endswith(".db"):
+                os.remove(os.path.join(PROMETHEUS_MULTIPROC_DIR, name))
+    print(f"Starting HTTP server on port {port} with {workers} worker(s)...")
+    uvicorn.run(
+        "server:app",
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=port,
+        workers=workers,
+        loop=os.getenv("UVICORN_LOOP", "auto"),
+        http=os.getenv("UVICORN_HTTP", "auto"),
+        backlog=int(os.getenv("UVICORN_BACKLOG", 2048)),
+        timeout_keep_alive=int(os.getenv("UVICORN_TIMEOUT_KEEP_ALIVE", 5)),
+        # Worker imports (fastmcp, anthropic) take several seconds on small instances
+        timeout_worker_healthcheck=int(os.getenv("UVICORN_WORKER_HEALTHCHECK_TIMEOUT", 30)),
+        # X-Forwarded-* is trusted from FORWARDED_ALLOW_IPS only (uvicorn's default: 127.0.0.1)
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS"),
+        access_log=os.getenv("UVICORN_ACCESS_LOG", "false").lower() == "true",
+    )
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 10000))
     
-    # Check if running in HTTP mode (Render/production) or MCP stdio mode
+    # HTTP mode (Render/production) serves REST and MCP together; stdio is for local MCP clients
     if "--http" in sys.argv or os.getenv("RENDER"):
-        print(f"Starting HTTP server on port {port}...")
-        
-        # Register all REST API routes
-        routes = [
-            Route("/api/explain-decision", api_explain_decision, methods=["POST"]),
-            Route("/", root_endpoint),
-            Route("/health", health_endpoint),
-            Route("/api/extract-intent", api_extract_intent, methods=["POST"]),
-            Route("/api/verify-gst", api_verify_gst, methods=["POST"]),
-            Route("/api/verify-pan", api_verify_pan, methods=["POST"]),
-            Route("/api/parse-gst-report", api_parse_gst_report, methods=["POST"]),
-            Route("/api/calculate-eligibility", api_calculate_eligibility, methods=["POST"]),
-            Route("/api/get-lenders", api_get_lenders, methods=["POST"]),
-        ]
-        
-        # Create Starlette app with routes
-        app = Starlette(routes=routes)
-        
-        # Run with uvicorn
-        uvicorn.run(app, host="0.0.0.0", port=port)
+        run_http_server(port)
     else:
-        print("Starting MCP server in stdio mode...")
+        print("Starting MCP server in stdio mode...", file=sys.stderr)
+        configure_tracing()
         mcp.run(transport="stdio")
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# server.py reads these at import time; nothing here connects to them
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/test")
+os.environ.setdefault("ANTHROPIC_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
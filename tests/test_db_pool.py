@@ -0,0 +1,272 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import server
+
+
+class FakeConnection:
+    def __init__(self, age: float = 0, idle: float = 0, ping_fails: bool = False):
+        now = time.monotonic()
+        self.opened_at = now - age
+        self.released_at = now - idle
+        self.ping_fails = ping_fails
+        self.pings = 0
+        self.terminated = False
+
+    def is_closed(self):
+        return self.terminated
+
+    def terminate(self):
+        self.terminated = True
+
+    def mark_released(self):
+        self.released_at = time.monotonic()
+
+    async def execute(self, query, timeout=None):
+        self.pings += 1
+        if self.ping_fails:
+            raise ConnectionError("server closed the connection")
+
+
+class FakePool:
+    def __init__(self, *connections):
+        self.available = list(connections)
+        self.released = []
+
+    async def acquire(self, timeout=None):
+        return self.available.pop(0)
+
+    async def release(self, conn):
+        self.released.append(conn)
+
+
+def checkout(monkeypatch, pool):
+    async def get_pool():
+        return pool
+
+    monkeypatch.setattr(server, "get_async_db_pool", get_pool)
+
+    async def run():
+        async with server.get_async_db_connection() as conn:
+            return conn
+
+    return asyncio.run(run())
+
+
+def test_old_connection_is_recycled(monkeypatch):
+    old, fresh = FakeConnection(age=server.DB_POOL_MAX_LIFETIME + 1), FakeConnection()
+    pool = FakePool(old, fresh)
+    assert checkout(monkeypatch, pool) is fresh
+    assert old.terminated and not fresh.terminated
+    assert pool.released == [old, fresh]
+
+
+def test_idle_connection_is_pinged(monkeypatch):
+    idle = FakeConnection(idle=server.DB_POOL_HEALTH_CHECK_IDLE + 1)
+    assert checkout(monkeypatch, FakePool(idle)) is idle
+    assert idle.pings == 1
+
+
+def test_recently_used_connection_is_not_pinged(monkeypatch):
+    recent = FakeConnection()
+    assert checkout(monkeypatch, FakePool(recent)) is recent
+    assert recent.pings == 0
+
+
+def test_failed_ping_discards_connection(monkeypatch):
+    broken = FakeConnection(idle=server.DB_POOL_HEALTH_CHECK_IDLE + 1, ping_fails=True)
+    fresh = FakeConnection()
+    assert checkout(monkeypatch, FakePool(broken, fresh)) is fresh
+    assert broken.terminated
+
+
+# ---------------------------------------------------------------- psycopg2 ConnectionPool
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.ping_fails:
+            raise server.psycopg2.OperationalError("server closed the connection")
+        self.conn.executed.append(query)
+
+    def fetchall(self):
+        return [{"id": 1, "name": "Lender"}]
+
+
+class FakePsycopgConnection:
+    def __init__(self, ping_fails=False):
+        self.closed = 0
+        self.ping_fails = ping_fails
+        self.in_transaction = False
+        self.rollback_fails = False
+        self.rollbacks = 0
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if self.rollback_fails:
+            raise server.psycopg2.InterfaceError("connection already closed")
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def get_transaction_status(self):
+        return server.extensions.TRANSACTION_STATUS_INTRANS if self.in_transaction else server.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(monkeypatch, **kwargs) -> server.ConnectionPool:
+    opened = []
+
+    def connect(dsn, cursor_factory=None):
+        opened.append(FakePsycopgConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(server.psycopg2, "connect", connect)
+    options = dict(min_size=0, max_size=2, timeout=1.0, max_lifetime=60, health_check_idle=30)
+    options.update(kwargs)
+    pool = server.ConnectionPool("postgresql://test", **options)
+    pool.opened = opened
+    return pool
+
+
+def age_idle(pool, created: float = 0, returned: float = 0):
+    """Move idle entries' timestamps back instead of faking the clock"""
+    pool._idle = type(pool._idle)((c, created_at - created, returned_at - returned) for c, created_at, returned_at in pool._idle)
+
+
+def test_pool_checkout_times_out_when_exhausted(monkeypatch):
+    pool = make_pool(monkeypatch, max_size=1)
+    conn = pool.getconn()
+    started = time.monotonic()
+    with pytest.raises(server.PoolTimeout, match="max_size=1"):
+        pool.getconn(timeout=0.05)
+    assert time.monotonic() - started >= 0.05
+    assert pool.stats()["waiting"] == 0
+    pool.putconn(conn)
+    assert pool.getconn(timeout=0.05) is conn
+
+
+def test_pool_reuses_returned_connections(monkeypatch):
+    pool = make_pool(monkeypatch)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert pool.stats()["opened_total"] == 1
+
+
+def test_pool_recycles_connections_past_max_lifetime(monkeypatch):
+    pool = make_pool(monkeypatch, max_lifetime=60)
+    old = pool.getconn()
+    pool.putconn(old)
+    age_idle(pool, created=61)
+    fresh = pool.getconn()
+    assert fresh is not old and old.closed
+    assert pool.stats()["recycled_total"] == 1 and pool.stats()["size"] == 1
+
+
+def test_pool_pings_idle_connections_and_drops_dead_ones(monkeypatch):
+    pool = make_pool(monkeypatch, health_check_idle=30)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    age_idle(pool, returned=31)
+    assert pool.getconn() is conn
+    assert conn.executed == ["SELECT 1"]
+
+    pool.putconn(conn)
+    age_idle(pool, returned=31)
+    conn.ping_fails = True
+    fresh = pool.getconn()
+    assert fresh is not conn and conn.closed
+    assert pool.stats()["failed_health_checks"] == 1
+
+
+def test_putconn_rolls_back_open_transactions(monkeypatch):
+    pool = make_pool(monkeypatch)
+    conn = pool.getconn()
+    conn.in_transaction = True
+    pool.putconn(conn)
+    assert conn.rollbacks == 1 and not conn.closed
+    assert pool.stats()["idle"] == 1
+
+
+def test_putconn_discards_when_rollback_fails(monkeypatch):
+    pool = make_pool(monkeypatch)
+    conn = pool.getconn()
+    conn.in_transaction = True
+    conn.rollback_fails = True
+    pool.putconn(conn)
+    assert conn.closed
+    assert pool.stats()["size"] == 0 and pool.stats()["idle"] == 0
+
+
+def test_putconn_discard_and_closed_connections(monkeypatch):
+    pool = make_pool(monkeypatch)
+    first, second = pool.getconn(), pool.getconn()
+    pool.putconn(first, discard=True)
+    second.close()
+    pool.putconn(second)
+    assert first.closed
+    assert pool.stats()["size"] == 0
+    pool.putconn(FakePsycopgConnection())  # not from this pool: ignored
+    assert pool.stats()["size"] == 0
+
+
+def test_connection_context_discards_on_operational_error(monkeypatch):
+    pool = make_pool(monkeypatch)
+    with pytest.raises(server.psycopg2.OperationalError):
+        with pool.connection() as conn:
+            raise server.psycopg2.OperationalError("lost")
+    assert conn.closed and pool.stats()["size"] == 0
+
+    with pool.connection() as conn:
+        pass
+    assert not conn.closed and pool.stats()["idle"] == 1
+
+
+def test_closed_pool_rejects_checkouts(monkeypatch):
+    pool = make_pool(monkeypatch, min_size=1)
+    idle = pool.opened[0]
+    pool.close()
+    assert idle.closed
+    with pytest.raises(server.PoolTimeout, match="closed"):
+        pool.getconn(timeout=0)
+
+
+def test_psycopg2_checkouts_run_off_the_event_loop(monkeypatch):
+    pool = make_pool(monkeypatch)
+    monkeypatch.setattr(server, "_db_pool", pool)
+    monkeypatch.setattr(server, "DB_DRIVER", "psycopg2")
+    checkout_threads = []
+    getconn = pool.getconn
+
+    def recording_getconn(*args, **kwargs):
+        checkout_threads.append(threading.get_ident())
+        return getconn(*args, **kwargs)
+
+    monkeypatch.setattr(pool, "getconn", recording_getconn)
+
+    async def run():
+        rows = await server.query_lenders({"min_amount": 100000})
+        health = await server.health_check()
+        return rows, health
+
+    rows, health = asyncio.run(run())
+    assert rows == [{"id": 1, "name": "Lender"}]
+    assert health["database"] == "connected"
+    assert len(checkout_threads) == 2
+    assert threading.get_ident() not in checkout_threads
@@ -0,0 +1,106 @@
+import random
+
+import pytest
+
+from server import ELIGIBILITY_FIELDS, assess_eligibility, assess_eligibility_batch, assess_eligibility_columns
+
+ASSESSED_AT = "2024-06-01T00:00:00"
+
+EDGE_ROWS = [
+    {"annual_turnover": 10_000_000, "existing_debt": 1_000_000, "loan_amount": 1_000_000, "credit_score_numeric": 750},
+    {"annual_turnover": 0, "existing_debt": 1_000_000, "loan_amount": 1_000_000, "credit_score_numeric": 750},
+    {"annual_turnover": -5_000_000, "existing_debt": 0, "loan_amount": 1_000_000, "credit_score_numeric": 800},
+    {"annual_turnover": 10_000_000},
+    {"loan_amount": 500_000},
+    {"annual_turnover": 10_000_000, "existing_debt": 0, "loan_amount": True, "credit_score_numeric": 750},
+    {"annual_turnover": True, "existing_debt": False, "loan_amount": 1, "credit_score_numeric": 700},
+    {"annual_turnover": 12_345_678.9, "existing_debt": 4_938_271.56, "loan_amount": 3_703_703.67, "credit_score_numeric": 649.5},
+    {"annual_turnover": 10_000_000, "existing_debt": 4_000_000, "loan_amount": 1_000_000, "credit_score_numeric": 550},
+    {"annual_turnover": 10_000_000, "existing_debt": 1_000_000, "loan_amount": 5_000_000, "credit_score_numeric": 549},
+]
+
+
+def random_rows(n: int, seed: int) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        row = {
+            "annual_turnover": rng.choice([0, -1, rng.randint(1, 10**8), rng.uniform(0, 1e8)]),
+            "existing_debt": rng.choice([0, rng.randint(0, 5 * 10**7), rng.uniform(0, 5e7)]),
+            "loan_amount": rng.choice([0, rng.randint(1, 3 * 10**7)]),
+            "credit_score_numeric": rng.randint(300, 900),
+        }
+        for field in ELIGIBILITY_FIELDS:
+            if rng.random() < 0.05:
+                del row[field]
+        rows.append(row or {"loan_amount": 1})
+    return rows
+
+
+def row_by_row(rows: list) -> list:
+    return [assess_eligibility(row, ASSESSED_AT) for row in rows]
+
+
+def columns_of(rows: list) -> dict:
+    return {field: [row[field] for row in rows] for field in ELIGIBILITY_FIELDS if all(field in row for row in rows)}
+
+
+def column_row(result: dict, i: int) -> dict:
+    return {field: value[i] if isinstance(value, list) else value for field, value in result.items() if field != "count"}
+
+
+def test_batch_matches_row_by_row_on_edge_cases():
+    assert assess_eligibility_batch(EDGE_ROWS, ASSESSED_AT) == row_by_row(EDGE_ROWS)
+
+
+def test_batch_matches_row_by_row_on_random_rows():
+    rows = random_rows(5_000, seed=13)
+    assert assess_eligibility_batch(rows, ASSESSED_AT) == row_by_row(rows)
+
+
+def test_columns_match_row_by_row():
+    # Every row carries every field; a column is either given for all rows or defaulted
+    defaults = dict(zip(ELIGIBILITY_FIELDS, (0, 0, 0, 650)))
+    rows = [dict(defaults, **row) for row in random_rows(5_000, seed=31) + EDGE_ROWS]
+    result = assess_eligibility_columns(columns_of(rows), ASSESSED_AT)
+    assert result["count"] == len(rows)
+    assert [column_row(result, i) for i in range(len(rows))] == row_by_row(rows)
+
+
+def test_missing_columns_take_defaults():
+    rows = [{"annual_turnover": 10_000_000, "loan_amount": 500_000}, {"annual_turnover": 0, "loan_amount": 0}]
+    result = assess_eligibility_columns(columns_of(rows), ASSESSED_AT)
+    assert [column_row(result, i) for i in range(len(rows))] == row_by_row(rows)
+
+
+def test_invalid_rows_are_reported_without_affecting_neighbours():
+    rows = [
+        EDGE_ROWS[0],
+        {},
+        "not a row",
+        {"annual_turnover": "10,00,000", "loan_amount": 1},
+        {"annual_turnover": None},
+        EDGE_ROWS[1],
+    ]
+    results = assess_eligibility_batch(rows, ASSESSED_AT)
+    assert results[0] == assess_eligibility(EDGE_ROWS[0], ASSESSED_AT)
+    assert results[5] == assess_eligibility(EDGE_ROWS[1], ASSESSED_AT)
+    assert [results[i]["index"] for i in range(1, 5)] == [1, 2, 3, 4]
+    assert results[1]["error"] == results[2]["error"] == "business_data must be a non-empty object"
+    assert "must be numbers" in results[3]["error"] and "must be numbers" in results[4]["error"]
+
+
+def test_empty_inputs():
+    assert assess_eligibility_batch([], ASSESSED_AT) == []
+    assert assess_eligibility_columns({}, ASSESSED_AT)["count"] == 0
+
+
+@pytest.mark.parametrize("data, message", [
+    ({"annual_turnover": [1, 2], "loan_amount": [1]}, "loan_amount must be a list of 2"),
+    ({"annual_turnover": [1, "2"]}, "annual_turnover must contain only numbers"),
+    ({"annual_turnover": [1, None]}, "annual_turnover must contain only numbers"),
+    ({"annual_turnover": [1], "existing_debt": 0}, "existing_debt must be a list of 1"),
+])
+def test_invalid_columns_are_rejected(data, message):
+    with pytest.raises(ValueError, match=message):
+        assess_eligibility_columns(data, ASSESSED_AT)
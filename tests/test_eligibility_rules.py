@@ -0,0 +1,184 @@
+import copy
+import json
+import os
+import random
+
+import pytest
+
+import server
+from server import EligibilityPolicy, EligibilityRules, EligibilityRulesStore, RulesError
+
+with open(server.ELIGIBILITY_RULES_PATH) as f:
+    TABLE = json.load(f)
+
+
+def policy(**overrides) -> EligibilityPolicy:
+    table = {k: v for k, v in copy.deepcopy(TABLE).items() if k not in ("version", "lenders")}
+    table.update(overrides)
+    return EligibilityPolicy(table, "test")
+
+
+def business(turnover=10_000_000, debt=1_000_000, amount=1_000_000, score=750) -> dict:
+    return {"annual_turnover": turnover, "existing_debt": debt, "loan_amount": amount, "credit_score_numeric": score}
+
+
+# ---------------------------------------------------------------- decisions
+
+@pytest.mark.parametrize("data, decision, rating", [
+    (business(), "APPROVED", "LOW"),
+    (business(debt=5_000_000), "DECLINED", "LOW"),
+    (business(amount=5_000_000), "CONDITIONAL", "LOW"),
+    (business(score=500), "DECLINED", "HIGH"),
+    (business(score=650), "APPROVED", "LOW-MEDIUM"),
+    (business(turnover=0), "DECLINED", "LOW"),
+])
+def test_default_table_decisions(data, decision, rating):
+    result = policy().evaluate(data)
+    assert (result["decision"], result["risk_rating"]) == (decision, rating)
+
+
+def test_conditional_caps_amount_and_formats_reason():
+    result = policy().evaluate(business(amount=5_000_000))
+    assert result["approved_amount"] == 3_000_000
+    assert result["reason"] == "Requested amount exceeds maximum eligible of ₹3,000,000"
+
+
+def test_declined_approves_nothing():
+    assert policy().evaluate(business(debt=5_000_000))["approved_amount"] == 0
+
+
+# ---------------------------------------------------------------- validation
+
+def bad(path: str, value):
+    """The default table with one key (dotted path, list indexes as ints) replaced"""
+    table = copy.deepcopy(TABLE)
+    *parents, last = path.split(".")
+    node = table
+    for key in parents:
+        node = node[int(key)] if isinstance(node, list) else node[key]
+    if isinstance(node, list):
+        node[int(last)] = value
+    else:
+        node[last] = value
+    return table
+
+
+@pytest.mark.parametrize("table, message", [
+    (bad("max_eligible_turnover_ratio", "0.3"), "expected a number"),
+    (bad("max_eligible_turnover_ratio", True), "expected a number"),
+    (bad("risk_tiers.3", {"min_credit_score": 0, "risk_rating": "HIGH", "approval_probability": 0.3}), "risk_tiers"),
+    (bad("risk_tiers.0", {"risk_rating": "LOW", "approval_probability": 0.9}), "risk_tiers"),
+    (bad("decisions.0.when", {"revenue": {">": 1}}), "unknown variable 'revenue'"),
+    (bad("decisions.0.when", {"dti_ratio": {"=>": 1}}), "unknown operator"),
+    (bad("decisions.0.when", {"loan_amount": {">": "ceiling"}}), "unknown variable 'ceiling'"),
+    (bad("decisions.0.when", {"dti_ratio": {">": [1]}}), "expected a number"),
+    (bad("decisions.0.reason", "Too high: {dti}"), "bad reason template"),
+    (bad("decisions.3", {"when": {"dti_ratio": {">": 0}}, "decision": "APPROVED"}), "decisions must end"),
+    (bad("decisions.1", {"decision": "APPROVED"}), "decisions must end"),
+    (bad("version", ""), "version"),
+])
+def test_malformed_tables_are_rejected(table, message):
+    with pytest.raises(RulesError, match=message):
+        EligibilityRules(table, "test")
+
+
+def test_generated_code_only_sees_declared_variables():
+    # Operands are either known variable names or numbers, so nothing else reaches exec()
+    table = bad("decisions.0.when", {"dti_ratio": {">": "__import__('os')"}})
+    with pytest.raises(RulesError):
+        EligibilityRules(table, "test")
+
+
+# ---------------------------------------------------------------- lenders
+
+def test_lender_overrides_replace_top_level_keys():
+    table = copy.deepcopy(TABLE)
+    table["lenders"] = {
+        "Cautious Bank": {
+            "max_eligible_turnover_ratio": 0.1,
+            "decisions": [
+                {"when": {"credit_score": {"<": 700}}, "decision": "DECLINED", "reason": "Below 700"},
+                {"decision": "APPROVED", "reason": "OK"},
+            ],
+        },
+    }
+    rules = EligibilityRules(table, "test")
+    data = business(score=680)
+    assert rules.policy("Cautious Bank").evaluate(data)["decision"] == "DECLINED"
+    assert rules.policy("Cautious Bank").evaluate(business())["max_eligible"] == 1_000_000
+    assert rules.policy().evaluate(data)["decision"] == "APPROVED"
+    assert rules.policy("Unknown Bank") is rules.default
+    # Keys the lender does not override come from the top level
+    assert rules.policy("Cautious Bank").tiers == rules.default.tiers
+
+
+def test_invalid_lender_override_rejects_the_document():
+    table = copy.deepcopy(TABLE)
+    table["lenders"] = {"Broken Bank": {"risk_tiers": []}}
+    with pytest.raises(RulesError):
+        EligibilityRules(table, "test")
+
+
+# ---------------------------------------------------------------- reload
+
+def write_table(path, version: str, mtime: int, table=None):
+    table = dict(table or TABLE, version=version)
+    path.write_text(json.dumps(table))
+    os.utime(path, (mtime, mtime))
+
+
+def test_reload_swaps_valid_tables_and_keeps_the_old_one_on_errors(tmp_path):
+    path = tmp_path / "rules.json"
+    write_table(path, "v1", 1_000)
+    store = EligibilityRulesStore(str(path))
+    assert store.current.version == "v1"
+    assert not store.reload()  # unchanged mtime
+
+    write_table(path, "v2", 2_000)
+    assert store.reload()
+    assert store.current.version == "v2" and store.reloads == 1
+
+    write_table(path, "v3", 3_000, bad("decisions.0.when", {"revenue": {">": 1}}))
+    assert not store.reload()
+    assert store.current.version == "v2"
+    assert "unknown variable" in store.last_error
+
+    path.write_text("{not json")
+    os.utime(path, (4_000, 4_000))
+    assert not store.reload()
+    assert store.current.version == "v2"
+
+    write_table(path, "v4", 5_000)
+    assert store.reload()
+    assert store.current.version == "v4" and store.last_error is None
+
+
+def test_yaml_tables_load(tmp_path):
+    yaml = pytest.importorskip("yaml")
+    path = tmp_path / "rules.yaml"
+    path.write_text(yaml.safe_dump(dict(TABLE, version="yaml-1"), allow_unicode=True))
+    assert server.load_eligibility_rules(str(path)).version == "yaml-1"
+
+
+# ---------------------------------------------------------------- scalar vs columns
+
+VARIABLE_OPERAND_TABLE = bad("decisions.0.when", {"dti_ratio": {">=": 0.4}, "loan_amount": {">": "existing_debt"}})
+
+
+@pytest.mark.parametrize("table", [TABLE, VARIABLE_OPERAND_TABLE], ids=["default", "variable-operands"])
+def test_scalar_and_columnar_evaluation_agree(table):
+    rng = random.Random(15)
+    rules = EligibilityRules(copy.deepcopy(table), "parity")
+    rows = []
+    for _ in range(20_000):
+        rows.append((
+            rng.choice([0, -1, rng.randint(1, 10**8), rng.uniform(0, 1e8)]),
+            rng.choice([0, rng.randint(0, 5 * 10**7), rng.uniform(0, 5e7)]),
+            rng.choice([0, rng.randint(1, 3 * 10**7), rng.uniform(0, 3e7)]),
+            rng.choice([rng.randint(300, 900), rng.choice([450, 550, 650, 750, 850]), 549.5]),
+        ))
+    columns = [list(c) for c in zip(*rows)]
+    batch = rules.default.evaluate_columns(columns)
+    for i, (turnover, debt, amount, score) in enumerate(rows):
+        scalar = rules.default.evaluate(business(turnover, debt, amount, score))
+        assert {field: batch[field][i] for field in batch} == {field: scalar[field] for field in batch}, rows[i]
@@ -0,0 +1,110 @@
+import json
+import os
+
+import server
+from server import FixtureStore
+
+ROWS = [
+    {"gst_number": "27ABCPE0001F1ZC", "pan_number": "ABCPE0001F", "business_name": "FIRST", "annual_turnover": 1000.5},
+    {"gst_number": "29ABCPE0001F1Z8", "pan_number": "ABCPE0001F", "business_name": "SECOND BRANCH"},
+    {"gst_number": "27ABCPE0001F1ZC", "business_name": "DUPLICATE"},
+    {"pan_number": "XYZPQ1234R", "name": "HOLDER ONLY", "pan_status": "Inactive"},
+]
+
+
+def write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(path)
+
+
+def test_jsonl_lookups_first_row_wins(tmp_path):
+    store = FixtureStore(write_jsonl(tmp_path / "fixtures.jsonl", ROWS))
+    assert store.gst("27ABCPE0001F1ZC")["business_name"] == "FIRST"
+    assert store.gst("29ABCPE0001F1Z8")["business_name"] == "SECOND BRANCH"
+    assert store.pan("ABCPE0001F") == {"name": "FIRST", "status": "Active"}
+    assert store.pan("XYZPQ1234R") == {"name": "HOLDER ONLY", "status": "Inactive"}
+    assert store.gst("XYZPQ1234R") is None
+    assert store.gst("27ABCPE0001F1ZCX") is None  # longer than any indexed key
+    assert store.stats()["gst_records"] == 2
+
+
+def test_demo_records_are_the_fallback(tmp_path):
+    store = FixtureStore(write_jsonl(tmp_path / "fixtures.jsonl", ROWS), server.DEMO_GST_RECORDS, server.DEMO_PAN_RECORDS)
+    assert store.gst("09AADCF8429L1Z4")["business_name"] == "FINAGG TECHNOLOGIES PRIVATE LIMITED"
+    assert store.pan("AADCF8429L")["status"] == "Active"
+
+
+def test_csv_rows_are_typed(tmp_path):
+    path = tmp_path / "fixtures.csv"
+    path.write_text(
+        "gst_number,pan_number,business_name,annual_turnover,existing_loans\r\n"
+        "27ABCPE0001F1ZC,ABCPE0001F,\"FIRST, LTD\",1000.5,42\r\n"
+    )
+    store = FixtureStore(str(path))
+    assert store.gst("27ABCPE0001F1ZC") == {
+        "pan_number": "ABCPE0001F", "business_name": "FIRST, LTD", "annual_turnover": 1000.5, "existing_loans": 42,
+    }
+
+
+def test_index_is_reused_and_rebuilt_when_dataset_changes(tmp_path):
+    path = write_jsonl(tmp_path / "fixtures.jsonl", ROWS)
+    first = FixtureStore(path)
+    first.load()
+    assert first.stats()["index_built"]
+
+    second = FixtureStore(path)
+    second.load()
+    assert not second.stats()["index_built"]
+    assert second.gst("27ABCPE0001F1ZC")["business_name"] == "FIRST"
+
+    write_jsonl(tmp_path / "fixtures.jsonl", ROWS[1:2])
+    os.utime(path, ns=(0, 1))
+    third = FixtureStore(path)
+    assert third.gst("27ABCPE0001F1ZC") is None
+    assert third.stats()["index_built"]
+
+
+def test_no_path_serves_demo_records_only():
+    store = FixtureStore("", server.DEMO_GST_RECORDS)
+    assert store.gst("09AADCF8429L1Z4") is not None
+    assert store.stats()["gst_records"] == 1
+
+
+def read_only(monkeypatch, *directories):
+    """Make open() for writing fail under the given directories, as on a read-only mount"""
+    real_open = open
+
+    def guarded_open(file, mode="r", *args, **kwargs):
+        if any(m in mode for m in "wax+") and any(str(file).startswith(str(d)) for d in directories):
+            raise PermissionError(30, "Read-only file system", str(file))
+        return real_open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", guarded_open)
+
+
+def test_read_only_dataset_directory_uses_the_index_dir(tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    data.mkdir()
+    path = write_jsonl(data / "fixtures.jsonl", ROWS)
+    monkeypatch.setattr(server, "VERIFICATION_FIXTURES_INDEX_DIR", str(tmp_path / "cache"))
+    read_only(monkeypatch, data)
+
+    store = FixtureStore(path)
+    assert store.gst("27ABCPE0001F1ZC")["business_name"] == "FIRST"
+    assert store.stats()["index_path"].startswith(str(tmp_path / "cache"))
+    assert os.listdir(data) == ["fixtures.jsonl"]
+
+    again = FixtureStore(path)
+    again.load()
+    assert not again.stats()["index_built"]
+
+
+def test_no_writable_directory_keeps_the_index_in_memory(tmp_path, monkeypatch):
+    path = write_jsonl(tmp_path / "fixtures.jsonl", ROWS)
+    monkeypatch.setattr(server, "VERIFICATION_FIXTURES_INDEX_DIR", str(tmp_path / "cache"))
+    read_only(monkeypatch, tmp_path)
+
+    store = FixtureStore(path)
+    assert store.pan("XYZPQ1234R") == {"name": "HOLDER ONLY", "status": "Inactive"}
+    assert store.stats()["index_path"] == "memory"
+    assert store.stats()["index_built"]
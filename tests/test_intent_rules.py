@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+import server
+from server import INTENT_RULES_CONFIDENCE_THRESHOLD, MIN_BARE_AMOUNT, extract_intent_rules, parse_amounts
+
+
+@pytest.mark.parametrize("message, amounts", [
+    ("Need 5 lakhs", [500_000]),
+    ("need 5 lakh", [500_000]),
+    ("5L for stock", [500_000]),
+    ("2.5 lacs please", [250_000]),
+    ("2.5 cr for machinery", [25_000_000]),
+    ("1 Crore", [10_000_000]),
+    ("50k for rent", [50_000]),
+    ("1.5 million", [1_500_000]),
+    ("₹5,00,000 for inventory", [500_000]),
+    ("Rs. 75,000", [75_000]),
+    ("INR 12,50,000", [1_250_000]),
+    ("₹ 500", [500]),
+    ("rs 1.255 lakh", [125_500]),
+    ("1.234567 lakh", [123_456.7]),
+])
+def test_indian_notation(message, amounts):
+    assert parse_amounts(message) == amounts
+
+
+def test_indian_and_western_grouping_agree():
+    assert parse_amounts("₹1,00,00,000") == parse_amounts("₹10,000,000") == [10_000_000]
+
+
+def test_bare_numbers_below_minimum_are_ignored():
+    assert parse_amounts("Open 3 new cities with 12 staff in 2 years") == []
+    assert parse_amounts(f"{MIN_BARE_AMOUNT - 1} and {MIN_BARE_AMOUNT}") == [MIN_BARE_AMOUNT]
+    assert parse_amounts("3 trucks for 6 lakhs") == [600_000]
+
+
+def test_every_amount_is_returned_in_order():
+    assert parse_amounts("5 lakhs now and 2 cr next year") == [500_000, 20_000_000]
+
+
+@pytest.mark.parametrize("message, has_collateral", [
+    ("I can offer my property as collateral", True),
+    ("secured against gold", True),
+    ("I have a fixed deposit", True),
+    ("No collateral available", False),
+    ("without any security", False),
+    ("I don't have property", False),
+    ("looking for an unsecured loan", False),
+    ("need 5 lakhs for stock", False),
+])
+def test_collateral(message, has_collateral):
+    assert extract_intent_rules(message)["intent"]["has_collateral"] is has_collateral
+
+
+@pytest.mark.parametrize("message, urgency", [
+    ("need it urgently", "high"),
+    ("by tomorrow please", "high"),
+    ("planning to expand next year", "low"),
+    ("need 5 lakhs", "medium"),
+])
+def test_urgency(message, urgency):
+    assert extract_intent_rules(message)["intent"]["urgency"] == urgency
+
+
+def test_one_amount_and_purpose_clears_the_threshold():
+    result = extract_intent_rules("Need 5 lakhs urgently to buy 2 trucks")
+    assert result["intent"] == {
+        "loan_amount": 500_000, "loan_purpose": "vehicle purchase", "urgency": "high", "has_collateral": False,
+    }
+    assert result["confidence"] >= INTENT_RULES_CONFIDENCE_THRESHOLD
+
+
+def test_repeated_amount_counts_as_one():
+    assert extract_intent_rules("5 lakhs for stock, yes 5 lakhs")["confidence"] >= INTENT_RULES_CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize("message", [
+    "Need 5 lakhs or maybe 10 lakhs for stock",
+    "Need 5 lakhs for stock and new machines",
+    "Need a loan for stock",
+    "Need 5 lakhs",
+    "Hello",
+])
+def test_ambiguous_messages_fall_below_the_threshold(message):
+    assert extract_intent_rules(message)["confidence"] < INTENT_RULES_CONFIDENCE_THRESHOLD
+
+
+def test_ambiguous_intent_keeps_the_first_match():
+    intent = extract_intent_rules("Need 5 lakhs or maybe 10 lakhs for stock and new machines")["intent"]
+    assert intent["loan_amount"] == 500_000 and intent["loan_purpose"] == "inventory"
+
+
+class ClaudeCalled(Exception):
+    pass
+
+
+@pytest.fixture
+def no_claude(monkeypatch):
+    async def call_claude(*args, **kwargs):
+        raise ClaudeCalled()
+
+    monkeypatch.setattr(server, "call_claude", call_claude)
+    monkeypatch.setattr(server, "intent_cache", server.TTLCache(16, 60))
+
+
+def test_confident_rules_skip_claude(no_claude):
+    result = asyncio.run(server.extract_intent("Need 5 lakhs for stock"))
+    assert result["extraction_method"] == "rules"
+
+
+def test_ambiguous_messages_go_to_claude(no_claude):
+    with pytest.raises(ClaudeCalled):
+        asyncio.run(server.extract_intent("Need 5 lakhs or 10 lakhs for stock"))
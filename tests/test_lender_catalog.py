@@ -0,0 +1,124 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from server import LenderSnapshot, build_lender_query
+
+COLUMNS = ("id", "name", "product_name", "interest_rate_min", "interest_rate_max",
+           "commission_structure", "approval_rate_avg", "active")
+
+
+def lender(id, name, loan_amount_min=None, min_credit_score=None, active=True) -> dict:
+    return {
+        "id": id, "name": name, "product_name": f"{name} product {id}",
+        "interest_rate_min": Decimal("10.5"), "interest_rate_max": Decimal("18.0"),
+        "commission_structure": "1%", "approval_rate_avg": Decimal("0.7"), "active": active,
+        "loan_amount_min": loan_amount_min, "min_credit_score": min_credit_score,
+    }
+
+
+def snapshot(table: list) -> LenderSnapshot:
+    # What LENDER_CATALOG_QUERY returns
+    return LenderSnapshot("v1", sorted((row for row in table if row["active"]), key=lambda r: (r["name"], r["id"])))
+
+
+def sql(table: list, filters) -> list:
+    """
+    build_lender_query evaluated the way Postgres does: WHERE (a NULL comparison is false),
+    then DISTINCT ON (name) keeping the first row in ORDER BY name, id, then LIMIT 3
+    """
+    filters = filters or {}
+    # Parameters are cast with ::numeric
+    numeric = {k: Decimal(str(v)) for k, v in filters.items() if v}
+    rows = [row for row in table if row["active"]]
+    if filters.get("min_amount"):
+        rows = [r for r in rows if r["loan_amount_min"] is not None and r["loan_amount_min"] <= numeric["min_amount"]]
+    if filters.get("credit_score"):
+        rows = [r for r in rows if r["min_credit_score"] is not None and r["min_credit_score"] <= numeric["credit_score"]]
+    first = {}
+    for row in sorted(rows, key=lambda r: (r["name"], r["id"])):
+        first.setdefault(row["name"], row)
+    return [{k: row[k] for k in COLUMNS} for row in list(first.values())[:3]]
+
+
+TABLE = [
+    lender(1, "Bajaj", 100_000, 650),
+    lender(2, "Bajaj", 50_000, 600),
+    lender(3, "Axis", None, 700),
+    lender(4, "Axis", 200_000, None),
+    lender(5, "Axis", 500_000, 750),
+    lender(6, "Canara", 1_000_000, 800, active=False),
+    lender(7, "Canara", 300_000, 680),
+    lender(8, "Dena", Decimal("25000.50"), 550),
+    lender(9, "Edelweiss", 0, 0),
+]
+
+
+@pytest.mark.parametrize("filters", [
+    None,
+    {},
+    {"min_amount": 0, "credit_score": 0},
+    {"min_amount": 100_000},
+    {"min_amount": 60_000},
+    {"min_amount": 25_000.5},
+    {"credit_score": 650},
+    {"credit_score": 700, "min_amount": 300_000},
+    {"credit_score": 500},
+    {"min_amount": "200000"},
+])
+def test_query_matches_sql(filters):
+    assert snapshot(TABLE).query(filters) == sql(TABLE, filters)
+
+
+def test_distinct_on_keeps_first_matching_row_per_name():
+    # Bajaj id 1 needs 650; the credit filter skips it and DISTINCT ON falls through to id 2
+    results = snapshot(TABLE).query({"credit_score": 620})
+    assert [(r["name"], r["id"]) for r in results] == [("Bajaj", 2), ("Dena", 8), ("Edelweiss", 9)]
+
+
+def test_null_thresholds_never_match_a_filter():
+    # Axis id 3 has no minimum amount and id 4 no minimum score: each is excluded by that filter
+    assert [r["id"] for r in snapshot(TABLE).query({"min_amount": 10_000_000})][:1] == [4]
+    assert [r["id"] for r in snapshot(TABLE).query({"credit_score": 900})][:1] == [3]
+    assert [r["id"] for r in snapshot(TABLE).query(None)][:1] == [3]
+
+
+def test_limit_and_public_fields():
+    results = snapshot(TABLE).query(None)
+    assert len(results) == 3
+    assert all(tuple(r) == COLUMNS for r in results)
+
+
+def test_results_are_copies():
+    snap = snapshot(TABLE)
+    snap.query(None)[0]["name"] = "changed"
+    assert snap.query(None)[0]["name"] == "Axis"
+
+
+def test_query_matches_sql_on_random_tables():
+    rng = random.Random(4)
+    for _ in range(300):
+        table = [
+            lender(
+                i, rng.choice("ABCDEF"),
+                rng.choice([None, 0, 50_000, 100_000, 500_000, Decimal("250000.25")]),
+                rng.choice([None, 0, 600, 650, 700, 750]),
+                active=rng.random() > 0.2,
+            )
+            for i in rng.sample(range(1, 100), rng.randint(0, 15))
+        ]
+        filters = rng.choice([None, {}, {"min_amount": rng.choice([0, 60_000, 250_000.25, 1e6])},
+                              {"credit_score": rng.choice([0, 620, 700, 900])},
+                              {"min_amount": rng.choice([100_000, 600_000]), "credit_score": rng.choice([650, 800])}])
+        assert snapshot(table).query(filters) == sql(table, filters), (table, filters)
+
+
+@pytest.mark.parametrize("paramstyle, amount, score", [("format", "%s", "%s"), ("numeric", "$1::numeric", "$2::numeric")])
+def test_build_lender_query(paramstyle, amount, score):
+    query, params = build_lender_query({"min_amount": 100_000, "credit_score": 700}, paramstyle=paramstyle)
+    assert "SELECT DISTINCT ON (name)" in query and "WHERE active = true" in query
+    assert f"AND loan_amount_min <= {amount} AND min_credit_score <= {score}" in query
+    assert query.rstrip().endswith("ORDER BY name, id LIMIT 3")
+    assert params == [100_000, 700]
+    assert build_lender_query({"min_amount": 0}, paramstyle)[1] == []
@@ -0,0 +1,37 @@
+import asyncio
+
+from fastmcp import Client
+
+import server
+
+
+def test_mcp_session_runs_background_state():
+    """stdio clients never go through create_app, so the MCP lifespan must start the refresh tasks"""
+    async def run():
+        async with Client(server.mcp) as client:
+            tools = {tool.name for tool in await client.list_tools()}
+            running = server.eligibility_rules._task is not None and (
+                not server.LENDER_CATALOG_ENABLED or server.lender_catalog._task is not None
+            )
+        return tools, running
+
+    tools, running = asyncio.run(run())
+    assert {"verify_gst", "get_lender_database", "calculate_eligibility"} <= tools
+    assert running
+    assert server.eligibility_rules._task is None
+    assert server.lender_catalog._task is None
+
+
+def test_mcp_mount_does_not_swallow_rest_routes():
+    from starlette.testclient import TestClient
+
+    with TestClient(server.create_app()) as client:
+        assert client.get("/api/calculate-eligibility").status_code == 405
+        assert client.get("/no-such-route").status_code == 404
+        response = client.post(
+            server.MCP_HTTP_PATH,
+            json={"jsonrpc": "2.0", "id": 1, "method": "tools/list"},
+            headers={"accept": "application/json, text/event-stream"},
+        )
+        assert response.status_code == 200
+        assert "verify_gst" in response.text
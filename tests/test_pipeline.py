@@ -0,0 +1,127 @@
+import asyncio
+
+import server
+from server import StageSkipped, run_stage_graph
+
+
+async def ok(results):
+    return "ok"
+
+
+async def skip(results):
+    raise StageSkipped("nothing to do")
+
+
+async def fail(results):
+    raise RuntimeError("boom")
+
+
+def run(stages: dict):
+    return asyncio.run(run_stage_graph(stages))
+
+
+def test_stage_skipped_when_required_dependency_skipped():
+    results, timings = run({"a": ((), skip), "b": (("a",), ok)})
+    assert timings["b"]["status"] == "skipped"
+    assert "b" not in results
+
+
+def test_optional_dependency_skipped_does_not_block():
+    seen = {}
+
+    async def check(results):
+        seen.update(results)
+        return "ran"
+
+    results, timings = run({"pan": ((), skip), "report": ((), ok), "eligibility": (("report",), check, ("pan",))})
+    assert timings["eligibility"]["status"] == "ok"
+    assert "pan" not in seen and seen["report"] == "ok"
+
+
+def test_optional_dependency_result_is_available():
+    async def check(results):
+        return results["pan"]
+
+    results, _ = run({"pan": ((), ok), "eligibility": ((), check, ("pan",))})
+    assert results["eligibility"] == "ok"
+
+
+def test_optional_dependency_failure_does_not_block():
+    seen = {}
+
+    async def check(results):
+        seen.update(results)
+        return "ran"
+
+    _, timings = run({"lenders": ((), fail), "explanation": ((), check, ("lenders",))})
+    assert timings["lenders"]["status"] == "error"
+    assert timings["explanation"]["status"] == "ok"
+    assert "lenders" not in seen
+
+
+FINAGG_GSTIN = "09AADCF8429L1Z4"
+
+
+def process(monkeypatch, **kwargs):
+    """process_application with Claude and the lender lookup stubbed, overridable per test"""
+    async def intent(message):
+        return {"intent": {"loan_amount": 500000}}
+
+    async def explain(eligibility, lender):
+        return {"lender": lender.get("name")}
+
+    async def lenders(filters):
+        return [{"name": "Test Bank"}]
+
+    stubs = {"extract_intent": intent, "explain_decision": explain, "query_lenders": lenders}
+    stubs.update(kwargs.pop("stubs", {}))
+    for name, fn in stubs.items():
+        monkeypatch.setattr(server, name, fn)
+    monkeypatch.setattr(server, "LENDER_CATALOG_ENABLED", False)
+    monkeypatch.setattr(server, "verification_cache", server.VerificationCache(10, 60, 60, 0))
+    result = asyncio.run(server.process_application("need a loan", FINAGG_GSTIN, **kwargs))
+    return result, {name: t["status"] for name, t in result["timings"].items()}
+
+
+def test_pipeline_completes(monkeypatch):
+    result, statuses = process(monkeypatch)
+    assert result["status"] == "completed"
+    assert result["explanation"] == {"lender": "Test Bank"}
+
+
+def test_explanation_runs_when_lender_lookup_fails(monkeypatch):
+    async def unreachable(filters):
+        raise ConnectionRefusedError("database down")
+
+    result, statuses = process(monkeypatch, stubs={"query_lenders": unreachable})
+    assert statuses["lenders"] == "error"
+    assert statuses["explanation"] == "ok"
+    assert result["explanation"] == {"lender": None}
+
+
+def test_given_amount_does_not_wait_on_claude(monkeypatch):
+    async def claude_down(message):
+        raise server.CircuitOpenError("open")
+
+    result, statuses = process(monkeypatch, stubs={"extract_intent": claude_down}, loan_amount=100000)
+    assert statuses["intent"] == "error"
+    assert statuses["eligibility"] == "ok"
+    assert result["eligibility"]["approved_amount"] == 100000
+
+
+def test_intent_required_without_given_amount(monkeypatch):
+    async def claude_down(message):
+        raise server.CircuitOpenError("open")
+
+    _, statuses = process(monkeypatch, stubs={"extract_intent": claude_down})
+    assert statuses["eligibility"] == "skipped"
+
+
+def test_failed_pan_lookup_stops_eligibility(monkeypatch):
+    async def provider_down(pan_number):
+        raise server.ServiceError("provider unavailable", status_code=502)
+
+    result, statuses = process(monkeypatch, stubs={"verify_pan": provider_down})
+    assert statuses["pan"] == "error"
+    assert statuses["eligibility"] == "skipped"
+    assert "PAN verification did not complete" in result["timings"]["eligibility"]["reason"]
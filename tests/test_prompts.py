@@ -0,0 +1,58 @@
+import asyncio
+import json
+import re
+from types import SimpleNamespace
+
+import pytest
+
+import server
+
+# Prompts shorter than this are silently not cached (Sonnet's minimum cacheable prefix)
+MIN_CACHEABLE_TOKENS = 1024
+
+
+def estimated_tokens(text: str) -> int:
+    """Words plus punctuation marks: a lower bound on what the tokenizer produces for English"""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def cached_prefix(kwargs: dict) -> str:
+    """Tools and system blocks up to the last cache breakpoint, the part Anthropic caches"""
+    assert kwargs["system"][-1]["cache_control"] == {"type": "ephemeral"}
+    return "".join(json.dumps(tool) for tool in kwargs.get("tools", ())) + "".join(b["text"] for b in kwargs["system"])
+
+
+def response(content: list):
+    usage = SimpleNamespace(input_tokens=30, output_tokens=20, cache_read_input_tokens=1300, cache_creation_input_tokens=None)
+    return SimpleNamespace(content=content, usage=usage, stop_reason="tool_use")
+
+
+@pytest.fixture
+def claude(monkeypatch):
+    calls = []
+
+    async def call_claude(endpoint, **kwargs):
+        calls.append(kwargs)
+        if endpoint == "extract-intent":
+            intent = {"loan_amount": 500000, "loan_purpose": "inventory", "urgency": "medium", "has_collateral": False}
+            return response([SimpleNamespace(type="tool_use", name="record_loan_intent", input=intent)])
+        return response([SimpleNamespace(type="text", text="Approved.")])
+
+    monkeypatch.setattr(server, "call_claude", call_claude)
+    monkeypatch.setattr(server, "intent_cache", server.TTLCache(16, 60))
+    return calls
+
+
+def test_extract_intent_prefix_is_cacheable(claude):
+    result = asyncio.run(server.extract_intent("Need 5 lakhs or 10 lakhs for stock"))
+    assert estimated_tokens(cached_prefix(claude[0])) >= MIN_CACHEABLE_TOKENS
+    assert "5 lakhs or 10 lakhs" not in cached_prefix(claude[0])
+    assert result["usage"] == {
+        "input_tokens": 30, "output_tokens": 20, "cache_read_input_tokens": 1300, "cache_creation_input_tokens": 0,
+    }
+
+
+def test_explain_decision_prefix_is_cacheable(claude):
+    asyncio.run(server.explain_decision({"decision": "APPROVED", "approved_amount": 500000}, {"name": "Lender"}))
+    assert estimated_tokens(cached_prefix(claude[0])) >= MIN_CACHEABLE_TOKENS
+    assert "Lender" in claude[0]["messages"][0]["content"]
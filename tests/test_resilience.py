@@ -0,0 +1,127 @@
+import asyncio
+
+import anthropic
+import httpx
+import pytest
+
+import server
+from server import CircuitBreaker, CircuitOpenError
+
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    options = dict(slow_call_seconds=1.0, window=4, min_calls=4, error_rate=0.5, slow_call_rate=0.5, cooldown=10)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(4):
+        assert breaker.allow()
+        breaker.record(False, 0.1)
+    assert breaker.state == "open"
+
+
+def end_cooldown(breaker: CircuitBreaker):
+    breaker._opened_at -= breaker.cooldown
+
+
+# ---------------------------------------------------------------- CircuitBreaker
+
+def test_breaker_stays_closed_below_min_calls():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(False, 0.1)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_breaker_opens_on_error_rate_and_rejects():
+    breaker = make_breaker()
+    open_breaker(breaker)
+    assert not breaker.allow()
+    assert breaker.stats()["rejected_total"] == 1
+    assert breaker.opened_total == 1
+
+
+def test_breaker_opens_on_slow_calls():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(True, 2.0)
+    assert breaker.state == "open"
+
+
+def test_breaker_half_open_allows_one_trial():
+    breaker = make_breaker()
+    open_breaker(breaker)
+    end_cooldown(breaker)
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_success_closes():
+    breaker = make_breaker()
+    open_breaker(breaker)
+    end_cooldown(breaker)
+    assert breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+@pytest.mark.parametrize("ok, latency", [(False, 0.1), (True, 2.0)])
+def test_breaker_half_open_failure_or_slow_reopens(ok, latency):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    end_cooldown(breaker)
+    assert breaker.allow()
+    breaker.record(ok, latency)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_release_frees_trial():
+    breaker = make_breaker()
+    open_breaker(breaker)
+    end_cooldown(breaker)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def bad_request() -> anthropic.BadRequestError:
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    return anthropic.BadRequestError("bad request", response=httpx.Response(400, request=request), body=None)
+
+
+def test_call_claude_settles_trial_on_non_upstream_error(monkeypatch):
+    breaker = make_breaker()
+    monkeypatch.setitem(server.claude_breakers, "explain-decision", breaker)
+    breaker.state = "half_open"
+
+    async def rejected(**kwargs):
+        raise bad_request()
+
+    monkeypatch.setattr(server, "create_message", rejected)
+    with pytest.raises(anthropic.BadRequestError):
+        asyncio.run(server.call_claude("explain-decision", messages=[]))
+    # The API answered, so the trial counts as healthy and the circuit closes
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_call_claude_reopens_on_upstream_failure(monkeypatch):
+    breaker = make_breaker()
+    monkeypatch.setitem(server.claude_breakers, "explain-decision", breaker)
+    breaker.state = "half_open"
+
+    async def unavailable(**kwargs):
+        raise asyncio.TimeoutError()
+
+    monkeypatch.setattr(server, "create_message", unavailable)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(server.call_claude("explain-decision", messages=[]))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(server.call_claude("explain-decision", messages=[]))
@@ -0,0 +1,87 @@
+import asyncio
+
+import server
+from server import SingleFlight
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flights = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def run():
+        return await asyncio.gather(*(flights.do("key", "test", fetch) for _ in range(10)))
+
+    assert asyncio.run(run()) == [1] * 10
+    assert calls == 1
+    assert flights.coalesced_total == 9
+    assert not flights.in_flight("key")
+
+
+def test_single_flight_shares_exceptions_and_forgets_key():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(*(flights.do("key", "test", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_single_flight_survives_cancelled_waiter():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flights.do("key", "test", fetch))
+        second = asyncio.ensure_future(flights.do("key", "test", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def sample(name: str, operation: str) -> float:
+    return server.METRICS_REGISTRY.get_sample_value(name, {"operation": operation}) or 0
+
+
+def test_single_flight_metrics():
+    flights = SingleFlight()
+    before = {name: sample(name, "metrics-test") for name in ("single_flight_calls_total", "single_flight_coalesced_total")}
+    observed = {}
+    release = None
+
+    async def fetch():
+        await release.wait()
+        return "done"
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        waiters = [asyncio.ensure_future(flights.do("key", "metrics-test", fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        observed["in_flight"] = sample("single_flight_in_flight_keys", "metrics-test")
+        observed["waiters"] = sample("single_flight_waiters", "metrics-test")
+        release.set()
+        await asyncio.gather(*waiters)
+
+    asyncio.run(run())
+    assert observed == {"in_flight": 1, "waiters": 3}
+    assert sample("single_flight_in_flight_keys", "metrics-test") == 0
+    assert sample("single_flight_waiters", "metrics-test") == 0
+    assert sample("single_flight_calls_total", "metrics-test") - before["single_flight_calls_total"] == 1
+    assert sample("single_flight_coalesced_total", "metrics-test") - before["single_flight_coalesced_total"] == 2
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+import server
+
+
+class FakeRequest:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    async def stream(self):
+        yield self.body
+
+
+def chunks(response) -> list:
+    async def run():
+        return [chunk async for chunk in response.body_iterator]
+    return asyncio.run(run())
+
+
+def test_per_item_stream_writes_each_result_as_produced():
+    body = b"".join(b'{"n": %d}\n' % i for i in range(5))
+    response = server.stream_ndjson(FakeRequest(body), server.per_item(lambda item: {"n": item["n"] * 2}))
+    out = chunks(response)
+    assert len(out) == 5
+    assert [server.loads_json(c)["n"] for c in out] == [0, 2, 4, 6, 8]
+
+
+def test_batched_stream_groups_results_and_reports_bad_lines():
+    body = b'{"n": 1}\nnot json\n{"n": 2}\n'
+    response = server.stream_ndjson(FakeRequest(body), server.per_item(lambda item: item), batch_size=10)
+    out = chunks(response)
+    assert len(out) == 1
+    rows = [server.loads_json(line) for line in out[0].splitlines()]
+    assert rows[0] == {"n": 1} and rows[2] == {"n": 2}
+    assert rows[1]["line"] == 2 and "Invalid JSON" in rows[1]["error"]
+
+
+async def respond(spec_version: str, send):
+    async def body():
+        yield b"{}\n"
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    scope = {"type": "http", "asgi": {"spec_version": spec_version}}
+    await server.DuplexStreamingResponse(body(), media_type=server.NDJSON_MEDIA_TYPE)(scope, receive, send)
+
+
+def test_duplex_response_leaves_receive_to_the_handler():
+    sent = []
+
+    async def send(message):
+        sent.append(message["type"])
+
+    # A disconnect listener would end the stream as soon as receive() reports the disconnect
+    asyncio.run(respond("2.3", send))
+    assert sent == ["http.response.start", "http.response.body", "http.response.body"]
+
+
+def test_duplex_response_keeps_starlette_handling_on_spec_2_4():
+    async def send(message):
+        raise OSError("client went away")
+
+    with pytest.raises(ClientDisconnect):
+        asyncio.run(respond("2.4", send))
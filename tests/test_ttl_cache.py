@@ -0,0 +1,26 @@
+from server import TTLCache
+
+
+def age(cache, key, seconds: float):
+    """Move an entry's timestamps back instead of faking the clock the event loop also reads"""
+    *times, value = cache._data[key]
+    cache._data[key] = (*(t - seconds for t in times), value)
+
+
+def test_ttl_cache_expires_and_evicts():
+    cache = TTLCache(max_size=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts b, the least recently used
+    assert cache.get("b") is None
+    assert cache.evictions == 1
+    age(cache, "a", 11)
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+
+
+def test_ttl_cache_disabled_with_zero_size():
+    cache = TTLCache(max_size=0, ttl=10)
+    cache.set("a", 1)
+    assert cache.get("a") is None
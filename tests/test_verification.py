@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+import server
+
+FINAGG_GSTIN = "09AADCF8429L1Z4"
+
+
+def collect_bulk(gst_numbers, **kwargs) -> list:
+    async def run():
+        rows = []
+        async for batch in server.iter_gst_bulk_verification(gst_numbers, **kwargs):
+            rows.extend(batch)
+        return rows
+    return asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_bulk_dedupes_and_reports_invalid(monkeypatch):
+    monkeypatch.setattr(server, "verification_cache", server.VerificationCache(10, 60, 60, 0))
+    rows = collect_bulk([FINAGG_GSTIN, " 09aadcf8429l1z4", "bad"])
+    results, summary = rows[:-1], rows[-1]["summary"]
+    assert summary["unique"] == 2 and summary["duplicates"] == 1
+    assert summary["verified"] == 1 and summary["invalid"] == 1
+    assert sorted(i for r in results for i in r["input_indexes"]) == [0, 1, 2]
+    assert results[-1]["progress"] == {"completed": 2, "total": 2}
+
+
+def test_bulk_counts_unexpected_errors_as_failed(monkeypatch):
+    async def broken(kind, field, value):
+        raise RuntimeError("provider bug")
+
+    monkeypatch.setattr(server, "_verify_valid_id", broken)
+    rows = collect_bulk([FINAGG_GSTIN])
+    assert rows[0]["error"] == "provider bug"
+    assert rows[-1]["summary"]["failed"] == 1
+
+
+@pytest.mark.parametrize("concurrency", [0, -1])
+def test_bulk_runs_with_non_positive_concurrency(monkeypatch, concurrency):
+    monkeypatch.setattr(server, "verification_cache", server.VerificationCache(10, 60, 60, 0))
+    rows = collect_bulk([FINAGG_GSTIN], concurrency=concurrency)
+    assert rows[-1]["summary"]["verified"] == 1
+
+
+def http_provider(statuses: list):
+    """HTTPVerificationProvider whose upstream answers with `statuses` in turn; returns it and the call log"""
+    calls = []
+
+    def handler(request):
+        status = statuses[min(len(calls), len(statuses) - 1)]
+        calls.append(request.url.path)
+        return server.httpx.Response(status, json={"business_name": "X"} if status == 200 else {"error": "e"})
+
+    provider = server.HTTPVerificationProvider("http://provider.test")
+    provider.client = server.httpx.AsyncClient(base_url=provider.base_url, transport=server.httpx.MockTransport(handler))
+    return provider, calls
+
+
+@pytest.mark.parametrize("status", [400, 401, 403, 422])
+def test_http_provider_does_not_retry_client_errors(status):
+    provider, calls = http_provider([status])
+    with pytest.raises(server.VerificationUnavailable):
+        asyncio.run(provider.verify_gst(FINAGG_GSTIN))
+    assert len(calls) == 1
+    assert provider.stats()["failures"] == 1
+
+
+def test_http_provider_retries_transient_statuses():
+    provider, calls = http_provider([503, 200])
+    result = asyncio.run(provider.verify_gst(FINAGG_GSTIN))
+    assert result["verified"] is True
+    assert len(calls) == 2
+
+
+def test_http_provider_not_found():
+    provider, calls = http_provider([404])
+    assert asyncio.run(provider.verify_gst(FINAGG_GSTIN))["verified"] is False
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("verify, field", [(server.verify_gst, "gst_number"), (server.verify_pan, "pan_number")])
+@pytest.mark.parametrize("value", [123, 1.5, ["09AADCF8429L1Z4"], {"id": 1}])
+def test_non_string_ids_are_invalid_format(verify, field, value):
+    result = asyncio.run(verify(value))
+    assert result[field] == value
+    assert result["invalid_format"] is True and result["verified"] is False
+
+
+def test_scalar_and_batch_validation_agree_on_non_strings():
+    values = [123, None, " 09aadcf8429l1z4", "bad"]
+    assert server.validate_gstin_batch(values) == [
+        server.validate_gstin(server.normalize_tax_id(v)) for v in values
+    ]
+
+
+def test_bulk_keeps_non_string_inputs_apart():
+    rows = collect_bulk([123, "123", None, {"a": 1}, 123])
+    results, summary = rows[:-1], rows[-1]["summary"]
+    assert summary["unique"] == 5 and summary["duplicates"] == 0 and summary["invalid"] == 5
+    by_index = {r["input_indexes"][0]: r["gst_number"] for r in results}
+    assert by_index == {0: 123, 1: "123", 2: None, 3: {"a": 1}, 4: 123}
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+import server
+from server import VerificationCache
+
+
+def age(cache, key, seconds: float):
+    """Move an entry's timestamps back instead of faking the clock the event loop also reads"""
+    *times, value = cache._data[key]
+    cache._data[key] = (*(t - seconds for t in times), value)
+
+
+def counting_fetch(result: dict):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.001)
+        return dict(result)
+
+    return fetch, calls
+
+
+def test_verification_cache_hit_and_dedup():
+    cache = VerificationCache(max_size=10, ttl=100, negative_ttl=1, stale_ttl=0)
+    fetch, calls = counting_fetch({"verified": True})
+
+    async def run():
+        first = await asyncio.gather(*(cache.get("gst", "X", fetch) for _ in range(5)))
+        return first, await cache.get("gst", "X", fetch)
+
+    first, again = asyncio.run(run())
+    assert len(calls) == 1
+    assert [r["cached"] for r in first] == [False] * 5
+    assert again["cached"] is True
+
+
+def test_verification_cache_negative_ttl():
+    cache = VerificationCache(max_size=10, ttl=100, negative_ttl=5, stale_ttl=0)
+    fetch, calls = counting_fetch({"verified": False})
+    asyncio.run(cache.get("gst", "X", fetch))
+    age(cache, ("gst", "X"), 6)
+    result = asyncio.run(cache.get("gst", "X", fetch))
+    assert len(calls) == 2
+    assert result["cached"] is False
+
+
+def test_verification_cache_serves_stale_and_revalidates():
+    cache = VerificationCache(max_size=10, ttl=10, negative_ttl=1, stale_ttl=60)
+    fetch, calls = counting_fetch({"verified": True})
+
+    async def run():
+        await cache.get("gst", "X", fetch)
+        age(cache, ("gst", "X"), 20)
+        stale = await cache.get("gst", "X", fetch)
+        await asyncio.gather(*cache._refreshes)
+        return stale
+
+    stale = asyncio.run(run())
+    assert stale["cached"] is True
+    assert cache.stale_hits == 1
+    assert len(calls) == 2
+
+
+def test_verification_cache_does_not_store_failures():
+    cache = VerificationCache(max_size=10, ttl=100, negative_ttl=1, stale_ttl=0)
+
+    async def fail():
+        raise server.VerificationUnavailable("down")
+
+    with pytest.raises(server.VerificationUnavailable):
+        asyncio.run(cache.get("gst", "X", fail))
+    assert cache.stats()["size"] == 0
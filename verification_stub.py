@@ -0,0 +1,100 @@
+"""
+Local stand-in for a GST/PAN verification aggregator, for tests and load runs
+
+Serves the API HTTPVerificationProvider expects:
+    GET /gst/{gstin}  -> registration JSON, 404 if unknown
+    GET /pan/{pan}    -> PAN holder JSON, 404 if unknown
+
+Usage:
+    python verification_stub.py --port 8081 [--latency-ms 80] [--error-rate 0.05] [--synthetic]
+    VERIFICATION_PROVIDER=http VERIFICATION_PROVIDER_URL=http://localhost:8081 python server.py --http
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+# Same demo business as the server's mock records (from the FameScore report)
+GST_RECORDS = {
+    "09AADCF8429L1Z4": {
+        "business_name": "FINAGG TECHNOLOGIES PRIVATE LIMITED",
+        "trade_name": "FINAGG TECHNOLOGIES PRIVATE LIMITED",
+        "constitution": "Private Limited",
+        "address": "C 1,SECTOR 16,Noida,Uttar Pradesh-201301",
+        "date_of_registration": "2021-02-21",
+        "annual_turnover": 24148440.33,
+        "filing_compliance": 0.84,
+        "pan_number": "AADCF8429L",
+        "credit_score": "CMR-2",
+        "existing_loans": 2710443,
+    },
+}
+PAN_RECORDS = {
+    "AADCF8429L": {"name": "FINAGG TECHNOLOGIES PRIVATE LIMITED", "status": "Active"},
+}
+
+
+def synthetic_gst(gst_number: str) -> dict:
+    """Deterministic fake registration, so any GSTIN resolves during load tests"""
+    rng = random.Random(hashlib.sha256(gst_number.encode()).digest())
+    return {
+        "business_name": f"SYNTHETIC BUSINESS {gst_number[2:7]}",
+        "trade_name": f"SYNTHETIC BUSINESS {gst_number[2:7]}",
+        "constitution": rng.choice(["Proprietorship", "Partnership", "Private Limited"]),
+        "address": "Synthetic address",
+        "date_of_registration": f"20{rng.randint(10, 23)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        "annual_turnover": round(rng.uniform(1e6, 1e8), 2),
+        "filing_compliance": round(rng.uniform(0.5, 1.0), 2),
+        "pan_number": gst_number[2:12],
+        "credit_score": f"CMR-{rng.randint(1, 5)}",
+        "existing_loans": rng.randint(0, 10**7),
+    }
+
+
+def create_stub_app(latency_ms: float = 0, error_rate: float = 0, synthetic: bool = False) -> Starlette:
+    async def lookup(records: dict, key: str, make_synthetic=None):
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if error_rate and random.random() < error_rate:
+            return JSONResponse({"error": "injected failure"}, status_code=503)
+        record = records.get(key)
+        if record is None and synthetic and make_synthetic is not None:
+            record = make_synthetic(key)
+        if record is None:
+            return JSONResponse({"error": "not found"}, status_code=404)
+        return JSONResponse(record)
+
+    async def gst(request):
+        return await lookup(GST_RECORDS, request.path_params["gst_number"], synthetic_gst)
+
+    async def pan(request):
+        pan_number = request.path_params["pan_number"]
+        return await lookup(PAN_RECORDS, pan_number, lambda p: {"name": f"SYNTHETIC HOLDER {p}", "status": "Active"})
+
+    return Starlette(routes=[
+        Route("/gst/{gst_number}", gst),
+        Route("/pan/{pan_number}", pan),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0, help="added to every lookup")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of lookups answered with 503")
+    parser.add_argument("--synthetic", action="store_true", help="answer unknown IDs with generated records")
+    args = parser.parse_args()
+
+    app = create_stub_app(args.latency_ms, args.error_rate, args.synthetic)
+    uvicorn.run(app, host=args.host, port=args.port, access_log=False)
+
+
+if __name__ == "__main__":
+    main()